@@ -12,6 +12,7 @@ from enduseroptimizer import (
     HeatStorage,
     Producer,
     Storage,
+    TimeSeriesStore,
     config,
     plot_enduser,
 )
@@ -22,22 +23,6 @@ import logging
 if __name__ == "__main__":
 
     logging.basicConfig(level=logging.DEBUG)
-    def get_array(sorted_time_list, measurement_name, field_columns, delta_t=15/60):
-        ret = reader.read(
-            int(datetime.timestamp(sorted_time_list[0])),
-            int(datetime.timestamp(sorted_time_list[-1]) + delta_t * 60 * 60 / 2), # add half a step to the end time to get the last value
-            measurement_name,
-            field_columns,
-        )[field_columns[0]]
-        if len(ret) != len(sorted_time_list):
-            print(
-                f"Warning: Different data points available for {measurement_name} {field_columns}, interpolating."
-            )
-            ret = ret.reindex(pd.DatetimeIndex(sorted_time_list)).interpolate(
-                method="linear"
-            )
-        return ret.values
-
     config_path = ((Path(__file__).parent / "../../config/config.ini").resolve(),)
     reader = DfReader(
         "hist",
@@ -59,6 +44,20 @@ if __name__ == "__main__":
         for i in range(300)
     ]
     comp_start = datetime.now()
+
+    # read all profiles of the study once, windows are views of the store
+    profiles = TimeSeriesStore()
+    profiles.from_frame(
+        reader.read(
+            int(datetime.timestamp(start_times[0])),
+            int(datetime.timestamp(start_times[-1] + timedelta(hours=horizon * delta_t))),
+            "power_kW",
+            ["PV", "Hydro", "House_34", "House_36", "House_38", "Ladestation_Total"],
+        ),
+        start_time=start_times[0],
+        stop_time=start_times[-1] + timedelta(hours=horizon * delta_t),
+    )
+
     for i, start_time in enumerate(start_times):
         print(f"Step {i+1} of {len(start_times)}")
         print(f"Start time: {start_time}")
@@ -79,12 +78,12 @@ if __name__ == "__main__":
 
         pv_anlage = Producer()
         pv_anlage.power_curtailment_factor_max = 0.0
-        pv_anlage.power_actual_k = get_array(ts_list, "power_kW", ["PV"], delta_t)
+        pv_anlage.power_actual_k = profiles.get("PV", start_time)
         mdl.producers.append(pv_anlage)
 
         hydro_anlage = Producer()
         hydro_anlage.power_curtailment_factor_max = 0.0
-        hydro_anlage.power_actual_k = get_array(ts_list, "power_kW", ["Hydro"], delta_t)
+        hydro_anlage.power_actual_k = profiles.get("Hydro", start_time)
         mdl.producers.append(hydro_anlage)
 
         batterie1 = Storage()
@@ -127,30 +126,28 @@ if __name__ == "__main__":
         house34.energy_deficit_k = 0 * np.ones(horizon)
         house34.power_min = 0.0
         house34.power_max = 100
-        house34.power_desired_k = get_array(ts_list, "power_kW", ["House_34"], delta_t)
+        house34.power_desired_k = profiles.get("House_34", start_time)
         mdl.consumers.append(house34)
 
         house36 = Consumer()
         house36.energy_deficit_k = 0 * np.ones(horizon)
         house36.power_min = 0.0
         house36.power_max = 100
-        house36.power_desired_k = get_array(ts_list, "power_kW", ["House_36"], delta_t)
+        house36.power_desired_k = profiles.get("House_36", start_time)
         mdl.consumers.append(house36)
 
         house38 = Consumer()
         house38.energy_deficit_k = 0 * np.ones(horizon)
         house38.power_min = 0.0
         house38.power_max = 100
-        house38.power_desired_k = get_array(ts_list, "power_kW", ["House_38"], delta_t)
+        house38.power_desired_k = profiles.get("House_38", start_time)
         mdl.consumers.append(house38)
 
         ladestation = Consumer()
         ladestation.energy_deficit_k = 0 * np.ones(horizon)
         ladestation.power_min = 0.0
         ladestation.power_max = 100
-        ladestation.power_desired_k = get_array(
-            ts_list, "power_kW", ["Ladestation_Total"], delta_t
-        )
+        ladestation.power_desired_k = profiles.get("Ladestation_Total", start_time)
         mdl.consumers.append(ladestation)
 
         mdl.optimize()
@@ -11,7 +11,29 @@ from enduseroptimizer.heatstorage import HeatStorage
 from enduseroptimizer.heatnode import HeatNode
 from enduseroptimizer.producer import Producer
 from enduseroptimizer.storage import Storage
+from enduseroptimizer.results import Results
 from enduseroptimizer.enduser import EndUser
+from enduseroptimizer.dispatch import HeuristicDispatch
+from enduseroptimizer.dynamic import StorageDP
+from enduseroptimizer.network import NetworkFlow
+from enduseroptimizer.clustering import RepresentativeDays
+from enduseroptimizer.timeseries import TimeSeriesStore
+from enduseroptimizer.profiles import ProfileStore
+from enduseroptimizer.backtest import (
+    Backtest,
+    Checkpoint,
+    MemorySink,
+    MemorySource,
+    ParquetSink,
+    Sink,
+    Source,
+)
+from enduseroptimizer.resultstore import ResultStore
+from enduseroptimizer.scenarios import ScenarioSweep
+from enduseroptimizer.stochastic import StochasticOptimizer
+from enduseroptimizer.portfolio import Portfolio
+from enduseroptimizer.resources import ResourceManager
+from enduseroptimizer.modelcache import ModelCache
 
 # for plotting only
 try:
@@ -0,0 +1,468 @@
+import copy
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+import pandas as pd
+
+from enduseroptimizer import EndUser, config
+from enduseroptimizer.enduser import SOLVED
+from enduseroptimizer.timeseries import TimeSeriesStore
+
+
+def results_frames(enduser: EndUser) -> dict:
+    """Returns the results of an optimized enduser as frames indexed by its
+    timestamps, one per measurement:
+        "power_kW": grid exchange (import - export), delivered producer power,
+            storage power (charging - discharging), consumer and heat producer
+            power
+        "energy_kWh": storage energy and consumer energy deficit
+    """
+    index = pd.DatetimeIndex(enduser.get_timestamps())
+    power = {"grid": enduser.grid.power_import_k - enduser.grid.power_export_k}
+    energy = {}
+    for key, asset in enduser.iter_assets():
+        if key.startswith("producers"):
+            power[key] = asset.power_actual_k * (1 - asset.power_curtailment_factor_k)
+        elif key.startswith("storages"):
+            power[key] = asset.power_charging_k - asset.power_discharging_k
+            energy[key] = asset.energy_k
+        elif key.startswith("consumers"):
+            power[key] = asset.power_actual_k
+            energy[key] = asset.energy_deficit_k
+        elif ".heatproducers" in key:
+            power[key] = asset.power_k
+    return {
+        "power_kW": pd.DataFrame(power, index=index),
+        "energy_kWh": pd.DataFrame(energy, index=index),
+    }
+
+
+class Source:
+    """Interface of the inputs of a backtest"""
+
+    def read(self, start_time: datetime) -> dict:
+        """Returns the inputs of the window starting at start_time, as
+        {name: array}
+        """
+        raise NotImplementedError
+
+
+class Sink:
+    """Interface of the outputs of a backtest"""
+
+    def write(self, measurement: str, frame: pd.DataFrame) -> None:
+        """Writes a batch of results of one measurement"""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Called once all the results are written"""
+
+
+class MemorySource(Source):
+    def __init__(self, frame: pd.DataFrame) -> None:
+        """In-memory stand-in for the database: profiles indexed by timestamps,
+        resampled to config.delta_t
+
+        Editable attributes:
+            store (TimeSeriesStore): profiles of the backtest
+        """
+        self.store = TimeSeriesStore()
+        self.store.from_frame(frame)
+
+    def read(self, start_time: datetime) -> dict:
+        return self.store.window(start_time)
+
+
+class MemorySink(Sink):
+    def __init__(self) -> None:
+        """Keeps the results in memory
+
+        Written attributes:
+            frames (dict[str, list[pd.DataFrame]]): written batches per
+                measurement
+        """
+        self.frames: dict[str, list[pd.DataFrame]] = {}
+
+    def write(self, measurement: str, frame: pd.DataFrame) -> None:
+        self.frames.setdefault(measurement, []).append(frame)
+
+    def get(self, measurement: str) -> pd.DataFrame:
+        """Returns all the written results of a measurement"""
+        return pd.concat(self.frames[measurement])
+
+
+class ParquetSink(Sink):
+    def __init__(self, root: Path = None) -> None:
+        """Writes the results to local Parquet files, one directory per
+        measurement and one file per batch:
+            <root>/<measurement>/part-<n>.parquet
+
+        Editable attributes:
+            root (Path): directory of the results, defaults to
+                config.default_result_path / "backtest"
+        """
+        self.root = (
+            Path(root) if root is not None else config.default_result_path / "backtest"
+        )
+        self._parts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def write(self, measurement: str, frame: pd.DataFrame) -> None:
+        path = self.root / measurement
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            part = self._parts.get(measurement, len(list(path.glob("part-*"))))
+            self._parts[measurement] = part + 1
+        frame.to_parquet(path / f"part-{part:05d}.parquet")
+
+    def read(self, measurement: str) -> pd.DataFrame:
+        """Returns all the written results of a measurement"""
+        return pd.read_parquet(self.root / measurement).sort_index()
+
+
+class Checkpoint:
+    def __init__(self, path: Path) -> None:
+        """Append-only record of the windows of a backtest, one JSON line per
+        window: its start time, status, the reason of a failure and the final
+        state of its storages (see EndUser.get_final_state). A window is
+        recorded once its results are written to the sink.
+
+        Editable attributes:
+            path (Path): file of the checkpoint
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        """Returns the recorded windows as {start time: record}, the last
+        record of a window overriding the previous ones
+        """
+        records = {}
+        if self.path.exists():
+            with open(self.path) as in_file:
+                for line in in_file:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:  # line cut by a crash
+                        continue
+                    start_time = datetime.fromisoformat(record["start_time"])
+                    records[start_time] = record
+        return records
+
+    def record(self, records: list[dict]) -> None:
+        """Appends records and flushes them to disk"""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a") as out_file:
+                for record in records:
+                    out_file.write(json.dumps(record, separators=(",", ":")) + "\n")
+                out_file.flush()
+                os.fsync(out_file.fileno())
+
+    def completed(self) -> list[datetime]:
+        """Returns the start times of the solved windows (see enduser.SOLVED)"""
+        return sorted(
+            start_time
+            for start_time, record in self.load().items()
+            if record["status"] in SOLVED
+        )
+
+    def failed(self) -> dict:
+        """Returns the failed windows, as {start time: reason}"""
+        return {
+            start_time: record["reason"]
+            for start_time, record in sorted(self.load().items())
+            if record["status"] not in SOLVED
+        }
+
+    def get_state(self, before: datetime = None) -> dict:
+        """Returns the final state of the last solved window
+        (starting before a given time), None if there is none
+        """
+        state = None
+        for start_time, record in sorted(self.load().items()):
+            if before is not None and start_time >= before:
+                break
+            if record["status"] in SOLVED:
+                state = record["state"]
+        return state
+
+    def merge(self, checkpoints: list) -> None:
+        """Appends the records of other checkpoints, e.g. of day ranges run in
+        parallel
+        """
+        records = {}
+        for checkpoint in checkpoints:
+            records.update(checkpoint.load())
+        self.record([records[start_time] for start_time in sorted(records)])
+
+
+class Backtest:
+    def __init__(
+        self,
+        source: Source,
+        sink: Sink,
+        build: Callable[[datetime, dict], EndUser],
+        extract: Callable[[EndUser], dict] = results_frames,
+    ) -> None:
+        """Pipelined backtest over consecutive windows: the inputs of the next
+        windows are read and the results of the previous windows are written
+        while the current window is solved. The stages are connected by
+        bounded queues, and results are written in batches of windows.
+
+        With a checkpoint, windows already recorded are not run again, so that
+        an interrupted backtest resumes where it stopped. Windows failing
+        (source errors, solver errors or non optimal status) are retried, then
+        skipped and recorded with the reason of the failure.
+
+        Editable attributes:
+            source (Source): inputs of the windows
+            sink (Sink): destination of the results
+            build (callable): returns the enduser of a window, from its start
+                time and the inputs read from the source
+            extract (callable): returns the results of an optimized enduser, as
+                {measurement: pd.DataFrame}
+            queue_size (int): number of windows buffered between the stages
+            batch_size (int): number of windows written to the sink at once
+            checkpoint (Checkpoint): record of the windows, None to disable
+            retries (int): number of retries of a failing window
+            rerun_failed (bool): when true, windows recorded as failed in the
+                checkpoint are run again
+            carry_state (bool): when true, each window starts from the final
+                state of the storages of the previous optimal window
+
+        Written attributes:
+            timings (dict[str, float]): "total" duration of the last run and
+                time spent in "solve" (build and optimize) [s]
+            statuses (dict[datetime, str]): optimization status of each window
+            failures (dict[datetime, str]): reason of each skipped window
+        """
+        self.source = source
+        self.sink = sink
+        self.build = build
+        self.extract = extract
+        self.queue_size: int = 4
+        self.batch_size: int = 32
+        self.checkpoint: Checkpoint = None
+        self.retries: int = 1
+        self.rerun_failed: bool = False
+        self.carry_state: bool = False
+
+        self.timings: dict[str, float] = {}
+        self.statuses: dict[datetime, str] = {}
+        self.failures: dict[datetime, str] = {}
+
+    def get_pending(self, start_times: list[datetime]) -> list[datetime]:
+        """Returns the windows that are not recorded in the checkpoint yet"""
+        if self.checkpoint is None:
+            return list(start_times)
+        records = self.checkpoint.load()
+        return [
+            start_time
+            for start_time in start_times
+            if start_time not in records
+            or (self.rerun_failed and records[start_time]["status"] not in SOLVED)
+        ]
+
+    def run(self, start_times: list[datetime], state: dict = None) -> None:
+        """Optimizes the windows starting at start_times and writes their
+        results to the sink
+
+        Args:
+            start_times (list[datetime]): start of the windows, in order
+            state (dict): initial state of the storages when carry_state is
+                true, defaults to the last state recorded in the checkpoint
+        """
+        start_times = self.get_pending(start_times)
+        if (
+            state is None
+            and self.carry_state
+            and self.checkpoint is not None
+            and start_times
+        ):
+            state = self.checkpoint.get_state(before=start_times[0])
+        if not self.carry_state:
+            state = None
+
+        inputs = queue.Queue(maxsize=self.queue_size)
+        outputs = queue.Queue(maxsize=self.queue_size)
+        errors = []
+        stop = threading.Event()
+
+        def put(q: queue.Queue, item) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def load() -> None:
+            for start_time in start_times:
+                data, reason = None, None
+                for _ in range(self.retries + 1):
+                    try:
+                        data, reason = self.source.read(start_time), None
+                        break
+                    except Exception as error:
+                        reason = f"source: {error!r}"
+                if not put(inputs, (start_time, data, reason)):
+                    return
+            put(inputs, None)
+
+        def flush(batch: dict, records: list) -> None:
+            for measurement, frames in batch.items():
+                self.sink.write(measurement, pd.concat(frames))
+            if self.checkpoint is not None and records:
+                self.checkpoint.record(records)
+
+        def write() -> None:
+            batch: dict[str, list[pd.DataFrame]] = {}
+            records = []
+            windows = 0
+            item = {}
+            try:
+                while True:
+                    item = outputs.get()
+                    if item is None or windows == self.batch_size:
+                        flush(batch, records)
+                        batch, records, windows = {}, [], 0
+                    if item is None:
+                        break
+                    record, frames = item
+                    records.append(record)
+                    for measurement, frame in frames.items():
+                        batch.setdefault(measurement, []).append(frame)
+                    windows += 1
+                self.sink.close()
+            except Exception as error:
+                errors.append(error)
+                stop.set()
+                while item is not None:
+                    item = outputs.get()
+
+        start = time.perf_counter()
+        solve = 0.0
+        loader = threading.Thread(target=load, daemon=True)
+        writer = threading.Thread(target=write, daemon=True)
+        loader.start()
+        writer.start()
+        try:
+            while True:
+                try:
+                    item = inputs.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        break
+                    continue
+                if item is None or stop.is_set():
+                    break
+                start_time, data, reason = item
+
+                solve_start = time.perf_counter()
+                enduser, status = None, "Error"
+                for _ in range(self.retries + 1 if reason is None else 0):
+                    try:
+                        enduser = self.build(start_time, data)
+                        if state is not None:
+                            enduser.set_initial_state(state)
+                        enduser.optimize()
+                        status = enduser.status
+                        reason = None if status in SOLVED else f"status {status}"
+                    except Exception as error:
+                        reason = f"optimize: {error!r}"
+                    if reason is None:
+                        break
+                solve += time.perf_counter() - solve_start
+
+                self.statuses[start_time] = status
+                record = {
+                    "start_time": start_time.isoformat(),
+                    "status": status,
+                    "reason": reason,
+                    "state": None,
+                }
+                if reason is None:
+                    record["state"] = enduser.get_final_state()
+                    if self.carry_state:
+                        state = record["state"]
+                    outputs.put((record, self.extract(enduser)))
+                else:
+                    self.failures[start_time] = reason
+                    outputs.put((record, {}))
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+        finally:
+            outputs.put(None)
+            writer.join()
+            stop.set()
+            loader.join()
+
+        self.timings = {"total": time.perf_counter() - start, "solve": solve}
+        if errors:
+            raise errors[0]
+
+    def run_ranges(self, ranges: list[list[datetime]], workers: int = None) -> None:
+        """Runs independent ranges of windows in parallel, sharing the source
+        and the sink. Each range has its own checkpoint (suffixed with the
+        index of the range), merged into the checkpoint of the backtest once
+        all ranges are done. Their solves share the cores of config.resources.
+        """
+        backtests, states = [], []
+        for n in range(len(ranges)):
+            backtest = copy.copy(self)
+            backtest.statuses, backtest.failures = {}, {}
+            if self.checkpoint is not None:
+                backtest.checkpoint = Checkpoint(
+                    self.checkpoint.path.with_suffix(f".{n}.jsonl")
+                )
+            backtests.append(backtest)
+
+        if self.checkpoint is not None:
+            # records of an interrupted parallel run
+            self._merge_ranges(backtests)
+            ranges = [self.get_pending(start_times) for start_times in ranges]
+            states = [
+                self.checkpoint.get_state(before=start_times[0])
+                if start_times
+                else None
+                for start_times in ranges
+            ]
+        else:
+            states = [None] * len(ranges)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers or len(ranges)) as executor:
+            list(executor.map(Backtest.run, backtests, ranges, states))
+
+        for backtest in backtests:
+            self.statuses.update(backtest.statuses)
+            self.failures.update(backtest.failures)
+        if self.checkpoint is not None:
+            self._merge_ranges(backtests)
+        self.timings = {
+            "total": time.perf_counter() - start,
+            "solve": sum(backtest.timings.get("solve", 0.0) for backtest in backtests),
+        }
+
+    def _merge_ranges(self, backtests: list) -> None:
+        checkpoints = [
+            backtest.checkpoint
+            for backtest in backtests
+            if backtest.checkpoint.path.exists()
+        ]
+        if checkpoints:
+            self.checkpoint.merge(checkpoints)
+        for checkpoint in checkpoints:
+            checkpoint.path.unlink()
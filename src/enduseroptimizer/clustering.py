@@ -0,0 +1,186 @@
+import copy
+
+import numpy as np
+from scipy.cluster.vq import kmeans2
+
+from enduseroptimizer import EndUser, HeatStorage, Storage
+from enduseroptimizer.enduser import SOLVED
+from enduseroptimizer.resolution import INPUTS_K, RESULTS_K
+
+
+class RepresentativeDays:
+    def __init__(self, endusers: list[EndUser], n_clusters: int = 12) -> None:
+        """Time aggregation of a long study (e.g. a year) into representative
+        days. The daily input profiles of all assets are clustered, only the
+        representative day of each cluster is optimized, and the results are
+        expanded back to every day of the study.
+
+        Editable attributes:
+            endusers (list[EndUser]): one enduser per day of the study, all
+                sharing the same assets
+            n_clusters (int): number of representative days
+            seed (int): seed of the clustering
+
+        Computed attributes:
+            labels (array[int]): cluster of each day, computed by cluster()
+            medoids (array[int]): index of the representative day of each
+                cluster, computed by cluster()
+            weights (array[int]): number of days represented by each cluster,
+                computed by cluster()
+            representatives (list[EndUser]): copies of the representative days,
+                optimized by optimize()
+            loss (float): estimate of the total loss of the study over the
+                days whose representative is solved, updated by optimize()
+            status (str): "Optimal" if every representative day is optimal,
+                else the status of the first one that is not, updated by
+                optimize()
+            failed (array[int]): days whose representative is not solved,
+                left out of loss, updated by optimize()
+        """
+        self.endusers = endusers
+        self.n_clusters = n_clusters
+        self.seed = 0
+
+        self.labels = np.array([], dtype=int)
+        self.medoids = np.array([], dtype=int)
+        self.weights = np.array([], dtype=int)
+        self.representatives: list[EndUser] = []
+        self.loss: float = 0.0
+        self.status = "Not Solved"
+        self.failed = np.array([], dtype=int)
+
+    def get_features(self) -> np.ndarray:
+        """Returns one row per day with the input profiles of all assets, each
+        profile scaled by its standard deviation over the study
+        """
+        blocks = []
+        assets = [list(enduser.iter_assets()) for enduser in self.endusers]
+        for n, (_, asset) in enumerate(assets[0]):
+            for attribute in INPUTS_K.get(type(asset), {}):
+                block = np.vstack(
+                    [getattr(day[n][1], attribute) for day in assets]
+                ).astype(float)
+                scale = block.std()
+                if scale > 0:
+                    blocks.append((block - block.mean()) / scale)
+        return np.hstack(blocks)
+
+    def cluster(self) -> None:
+        """Clusters the days (k-means on the scaled profiles) and picks the day
+        closest to each cluster centre as its representative
+        """
+        features = self.get_features()
+        n_clusters = min(self.n_clusters, len(self.endusers))
+        centroids, labels = kmeans2(
+            features, n_clusters, minit="++", seed=self.seed
+        )
+
+        # keep non-empty clusters only, renumbered
+        used = np.unique(labels)
+        labels = np.searchsorted(used, labels)
+        centroids = centroids[used]
+
+        distances = np.linalg.norm(features - centroids[labels], axis=1)
+        medoids = np.empty(len(used), dtype=int)
+        for c in range(len(used)):
+            members = np.flatnonzero(labels == c)
+            medoids[c] = members[np.argmin(distances[members])]
+
+        self.labels = labels
+        self.medoids = medoids
+        self.weights = np.bincount(labels, minlength=len(used))
+
+    def optimize(self, link_storage: bool = False) -> None:
+        """Optimizes the representative days
+
+        Args:
+            link_storage (bool): when true, the storages and heat storages of
+                each representative day end at the state they started from, so
+                that the days can be chained in any order over the study
+        """
+        if len(self.medoids) == 0:
+            self.cluster()
+
+        self.representatives = []
+        for medoid in self.medoids:
+            enduser = copy.deepcopy(self.endusers[medoid])
+            if link_storage:
+                for _, asset in enduser.iter_assets():
+                    if isinstance(asset, Storage):
+                        asset.state_of_charge_final_k[-1] = (
+                            asset.state_of_charge_initial_k[0]
+                        )
+                    elif isinstance(asset, HeatStorage):
+                        asset.temperature_final = asset.temperature_init
+            enduser.optimize()
+            self.representatives.append(enduser)
+
+        statuses = [enduser.status for enduser in self.representatives]
+        solved = np.array([status in SOLVED for status in statuses])
+        self.status = next(
+            (status for status in statuses if status != "Optimal"), "Optimal"
+        )
+        self.failed = np.flatnonzero(~solved[self.labels])
+        self.loss = float(
+            sum(
+                weight * enduser.loss
+                for weight, enduser, ok in zip(
+                    self.weights, self.representatives, solved
+                )
+                if ok
+            )
+        )
+
+    def expand(self) -> dict:
+        """Returns the results of the representative days expanded to every
+        day of the study, as {"<asset key>.<attribute>": array(days, horizon)}
+        """
+        series = {}
+        for key, asset in self.representatives[0].iter_assets():
+            for attribute in RESULTS_K.get(type(asset), {}):
+                series[f"{key}.{attribute}"] = np.vstack(
+                    [
+                        self._get_result(enduser, key, attribute)
+                        for enduser in self.representatives
+                    ]
+                )[self.labels]
+        return series
+
+    def compare(self) -> dict:
+        """Optimizes every day of the study and returns error metrics of the
+        representative days w.r.t. this full run
+
+        Returns:
+            dict: "loss_full" and "loss_estimate" (total loss of the study),
+                "loss_error" (relative error of the estimate), and for each
+                result series "<asset key>.<attribute>" its root mean square
+                error over all timesteps
+        """
+        for enduser in self.endusers:
+            if enduser.status == "Not Solved":
+                enduser.optimize()
+
+        loss_full = float(sum(enduser.loss for enduser in self.endusers))
+        metrics = {
+            "loss_full": loss_full,
+            "loss_estimate": self.loss,
+            "loss_error": (
+                abs(self.loss - loss_full) / abs(loss_full) if loss_full else 0.0
+            ),
+        }
+        for name, estimate in self.expand().items():
+            key, attribute = name.rsplit(".", 1)
+            full = np.vstack(
+                [
+                    self._get_result(enduser, key, attribute)
+                    for enduser in self.endusers
+                ]
+            )
+            metrics[name] = float(np.sqrt(np.nanmean((estimate - full) ** 2)))
+        return metrics
+
+    @staticmethod
+    def _get_result(enduser: EndUser, key: str, attribute: str) -> np.ndarray:
+        return np.asarray(
+            getattr(dict(enduser.iter_assets())[key], attribute), dtype=float
+        )
@@ -1,10 +1,27 @@
 from pathlib import Path
 
+import numpy as np
+
+from enduseroptimizer.resources import ResourceManager
+
 
 class Config:
     def __init__(self) -> None:
         self._horizon = int(24 * 60 / 15)  # number of discrete steps
         self._delta_t = 15 / 60  # length of steps [h]
+        self._resolution_schedule = None  # list of (delta_t, duration) [h]
+        self._precheck = True  # feasibility screen before solving
+        self._elastic_penalty = 1e6  # cost of a unit of slack (elastic mode)
+        self._scaling = True  # coefficient scaling of the problem
+        self._dynamic_programming = True  # single storage endusers solved by DP
+        self._soc_tolerance = 0.01  # state of charge step of the DP grid
+        self._network_flow = True  # endusers without heatnode solved as LP
+        self._lazy_exclusivity = False  # grid binaries added where violated
+        self._symmetry_breaking = True  # order interchangeable assets
+        self._portfolio = None  # solver configurations raced on each problem
+        self._resources = ResourceManager()  # core budget of the solvers
+        self._model_cache = None  # compiled models by enduser structure
+        self._cross_check = False  # compare DP results with the solver
         self._plotting = False  # plotting of results
         self._default_result_path = Path("results")  # default path for results
 
@@ -24,6 +41,168 @@ class Config:
     def delta_t(self, delta_t):
         self._delta_t = delta_t
 
+    @property
+    def resolution_schedule(self):
+        """Non-uniform step schedule of the optimization, as a list of
+        (delta_t, duration) tuples in hours, e.g. [(0.25, 4), (1, 20), (4, None)].
+        A duration of None (or a schedule ending before the horizon) extends the
+        last step length up to the end of the horizon. Every step length must be
+        a multiple of delta_t. None (default) optimizes every step of length
+        delta_t.
+        """
+        return self._resolution_schedule
+
+    @resolution_schedule.setter
+    def resolution_schedule(self, resolution_schedule):
+        self._resolution_schedule = resolution_schedule
+
+    @property
+    def precheck(self):
+        """When true (default), EndUser.optimize screens the inputs with
+        feasibility.check_feasibility and does not call the solver if a
+        necessary condition of the problem is violated
+        """
+        return self._precheck
+
+    @precheck.setter
+    def precheck(self, precheck):
+        self._precheck = precheck
+
+    @property
+    def elastic_penalty(self):
+        """Cost of one unit of slack in EndUser.optimize(elastic=True), large
+        enough to only relax constraints when the problem is infeasible
+        """
+        return self._elastic_penalty
+
+    @elastic_penalty.setter
+    def elastic_penalty(self, elastic_penalty):
+        self._elastic_penalty = elastic_penalty
+
+    @property
+    def scaling(self):
+        """When true (default), the rows, columns and objective of the problem
+        are rescaled before solving (see scaling.Scaling), so that the solver
+        does not depend on the units of the inputs
+        """
+        return self._scaling
+
+    @scaling.setter
+    def scaling(self, scaling):
+        self._scaling = scaling
+
+    @property
+    def dynamic_programming(self):
+        """When true (default), EndUser.optimize solves endusers with a single
+        storage and no heatnode or consumer deficit with dynamic.StorageDP
+        instead of the solver
+        """
+        return self._dynamic_programming
+
+    @dynamic_programming.setter
+    def dynamic_programming(self, dynamic_programming):
+        self._dynamic_programming = dynamic_programming
+
+    @property
+    def soc_tolerance(self):
+        """Step of the state of charge grid of dynamic.StorageDP, as a fraction
+        of the storage capacity. Smaller steps are closer to the optimum but
+        slower, the number of transitions growing with its inverse squared
+        """
+        return self._soc_tolerance
+
+    @soc_tolerance.setter
+    def soc_tolerance(self, soc_tolerance):
+        self._soc_tolerance = soc_tolerance
+
+    @property
+    def network_flow(self):
+        """When true (default), EndUser.optimize solves endusers without
+        heatnode with network.NetworkFlow, and falls back to the solver when
+        its solution needs the exclusivity binaries
+        """
+        return self._network_flow
+
+    @network_flow.setter
+    def network_flow(self, network_flow):
+        self._network_flow = network_flow
+
+    @property
+    def lazy_exclusivity(self):
+        """When true, the solver first solves the problem without the binaries
+        of the grid exclusivity (import / export, and export / discharge
+        unless Grid.discharge_to_grid), then adds them only for the steps
+        where the solution violates it, until it does not. Same optimum, with
+        far fewer binaries when the exclusivity rarely binds
+        """
+        return self._lazy_exclusivity
+
+    @lazy_exclusivity.setter
+    def lazy_exclusivity(self, lazy_exclusivity):
+        self._lazy_exclusivity = lazy_exclusivity
+
+    @property
+    def symmetry_breaking(self):
+        """When true (default), identical storages and identical heat producers
+        of a heatnode are ordered in the optimization problem (see
+        symmetry.get_symmetry_constraints), so that the solver does not
+        explore their equivalent permutations
+        """
+        return self._symmetry_breaking
+
+    @symmetry_breaking.setter
+    def symmetry_breaking(self, symmetry_breaking):
+        self._symmetry_breaking = symmetry_breaking
+
+    @property
+    def portfolio(self):
+        """portfolio.Portfolio racing its solver configurations on every
+        problem solved by EndUser.optimize, None (default) to solve with CBC
+        """
+        return self._portfolio
+
+    @portfolio.setter
+    def portfolio(self, portfolio):
+        self._portfolio = portfolio
+
+    @property
+    def resources(self):
+        """resources.ResourceManager holding the core budget shared by every
+        solve of the process: solver threads per problem and concurrent
+        solves of the parallel entry points (ScenarioSweep,
+        StochasticOptimizer, Backtest.run_ranges, Portfolio)
+        """
+        return self._resources
+
+    @resources.setter
+    def resources(self, resources):
+        self._resources = resources
+
+    @property
+    def model_cache(self):
+        """modelcache.ModelCache of the compiled models by enduser structure,
+        used by EndUser.optimize instead of building each problem, None
+        (default) to build and solve every problem with CBC
+        """
+        return self._model_cache
+
+    @model_cache.setter
+    def model_cache(self, model_cache):
+        self._model_cache = model_cache
+
+    @property
+    def cross_check(self):
+        """When true, endusers solved by dynamic.StorageDP,
+        network.NetworkFlow or EndUser.optimize(approximate=True) are also
+        solved by the exact solver, and both losses are compared in
+        EndUser.cross_check
+        """
+        return self._cross_check
+
+    @cross_check.setter
+    def cross_check(self, cross_check):
+        self._cross_check = cross_check
+
     @property
     def plotting(self):
         return self._plotting
@@ -39,3 +218,37 @@ class Config:
     @default_result_path.setter
     def default_result_path(self, default_result_path):
         self._default_result_path = default_result_path
+
+    def get_step_bounds(self) -> np.ndarray:
+        """Returns the bounds of the optimization steps, as indices of the
+        delta_t steps of the horizon: step k covers [bounds[k], bounds[k+1])
+        """
+        if self._resolution_schedule is None:
+            return np.arange(self._horizon + 1)
+
+        bounds = [0]
+        width = 1
+        for delta_t, duration in self._resolution_schedule:
+            width = int(round(delta_t / self._delta_t))
+            if width < 1 or not np.isclose(width * self._delta_t, delta_t):
+                raise ValueError(
+                    f"Step length {delta_t} h is not a multiple of delta_t "
+                    f"({self._delta_t} h)"
+                )
+            if duration is None:
+                stop = self._horizon
+            else:
+                stop = min(
+                    self._horizon, bounds[-1] + int(round(duration / self._delta_t))
+                )
+            while bounds[-1] < stop:
+                bounds.append(min(bounds[-1] + width, stop))
+
+        while bounds[-1] < self._horizon:
+            bounds.append(min(bounds[-1] + width, self._horizon))
+
+        return np.asarray(bounds, dtype=int)
+
+    def get_delta_t_k(self) -> np.ndarray:
+        """Returns the length of each optimization step [h]"""
+        return np.diff(self.get_step_bounds()) * self._delta_t
@@ -2,9 +2,14 @@ import numpy as np
 import numpy.typing as npt
 
 from enduseroptimizer import config
+from enduseroptimizer.encoding import LazyArray, decode_k, defer_k, encode_k
 
 
 class Consumer:
+    # result arrays, decoded on first access when read by from_dict
+    power_actual_k = LazyArray(dtype=float)
+    energy_deficit_k = LazyArray(dtype=float)
+
     def __init__(self, name: str = "Consumer") -> None:
         """Class defining an electrical energy consumer
 
@@ -38,18 +43,18 @@ class Consumer:
         self.power_actual_k = np.array([])  # kW
         self.energy_deficit_k = np.array([])  # kWh
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
         data["power_max_i"] = self.power_max
         data["power_min_i"] = self.power_min
 
-        data["available_k"] = self.available_k.tolist()
-        data["energy_deficit_max_k"] = self.energy_deficit_max_k.tolist()
-        data["power_desired_k"] = self.power_desired_k.tolist()
+        data["available_k"] = encode_k(self.available_k, compact)
+        data["energy_deficit_max_k"] = encode_k(self.energy_deficit_max_k, compact)
+        data["power_desired_k"] = encode_k(self.power_desired_k, compact)
 
         if include_results:
-            data["power_actual_k"] = self.power_actual_k.tolist()
-            data["energy_deficit_k"] = self.energy_deficit_k.tolist()
+            data["power_actual_k"] = encode_k(self.power_actual_k, compact)
+            data["energy_deficit_k"] = encode_k(self.energy_deficit_k, compact)
 
         return data
 
@@ -57,12 +62,10 @@ class Consumer:
         self.power_max = data["power_max_i"]
         self.power_min = data["power_min_i"]
 
-        self.available_k = np.asarray(data["available_k"], dtype=int)
-        self.energy_deficit_max_k = np.asarray(
-            data["energy_deficit_max_k"], dtype=float
-        )
-        self.power_desired_k = np.asarray(data["power_desired_k"], dtype=float)
+        self.available_k = decode_k(data["available_k"], dtype=int)
+        self.energy_deficit_max_k = decode_k(data["energy_deficit_max_k"], dtype=float)
+        self.power_desired_k = decode_k(data["power_desired_k"], dtype=float)
 
         if include_results:
-            self.power_actual_k = np.asarray(data["power_actual_k"], dtype=float)
-            self.energy_deficit_k = np.asarray(data["energy_deficit_k"], dtype=float)
+            defer_k(self, "power_actual_k", data["power_actual_k"])
+            defer_k(self, "energy_deficit_k", data["energy_deficit_k"])
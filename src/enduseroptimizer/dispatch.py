@@ -0,0 +1,518 @@
+import copy
+
+import numpy as np
+
+from enduseroptimizer import (
+    Consumer,
+    Grid,
+    HeatProducer,
+    HeatStorage,
+    Producer,
+    Storage,
+    config,
+)
+from enduseroptimizer.model import Model
+
+TOLERANCE = 1e-9
+
+# result attributes of each asset type, in the order of EndUser._build
+RESULT_ATTRIBUTES = {
+    Consumer: ["energy_deficit_k", "power_actual_k"],
+    Storage: ["energy_k", "power_charging_k", "power_discharging_k"],
+    Producer: ["power_curtailment_factor_k"],
+    HeatProducer: ["power_k", "running_k", "starting_k"],
+    HeatStorage: ["temperature_k", "energy_in_k", "energy_out_k"],
+    Grid: ["power_import_k", "power_export_k", "exporting_to_grid_k"],
+}
+
+
+class HeuristicDispatch:
+    def __init__(self, enduser, delta_t_k: np.ndarray = None) -> None:
+        """Rule-based dispatch of an enduser, without a solver. Fills the same
+        result attributes and loss as EndUser.optimize, in milliseconds, e.g.
+        for very large fleets, as a fallback or as a warm start. The bounds of
+        the assets are respected, the state of charge and temperature targets
+        where possible; the schedule is not optimal.
+
+        Rules, applied step by step to all the assets at once (the inputs,
+        price thresholds and reachable bounds are computed for all steps
+        beforehand):
+            heat producers: thermostat control of each heatnode, heating from
+                a low temperature (band above temperature_min) up to a high one
+                (two bands above) with the most efficient producer, the others
+                only keeping the low temperature, plus the surplus production
+                worth storing up to temperature_max, and the final temperature
+                reached at the last step
+            consumers: deferred while the import price is high, caught up
+                with surplus production or while the price is low, within the
+                deficit limit, and only as much as can be caught up by the end
+                of the horizon
+            storages: charged with surplus production (self-consumption)
+                when it is worth more than its export, discharged to cover the
+                demand while the price is high (or whenever surplus production
+                is stored) but not low, charged from the grid while the price
+                is low, and kept within reach of their final state of charge
+            producers: curtailed above the export limit, or while the export
+                tariff is negative
+
+        The price is the import tariff when minimizing the cost, and constant
+        otherwise (no price-driven decisions).
+
+        Editable attributes:
+            enduser (EndUser): enduser to dispatch, its results are overwritten
+            delta_t_k (array[float]): length of each step [h], defaults to
+                config.delta_t for every step of config.horizon
+            price_low (float): quantile of the price below which it is low
+            price_high (float): quantile of the price above which it is high
+            band (float): thermostat band, as a fraction of the temperature
+                range of each heat storage
+        """
+        self.enduser = enduser
+        self.delta_t_k = delta_t_k
+        self.price_low = 0.25
+        self.price_high = 0.75
+        self.band = 0.1
+
+    def run(self) -> None:
+        """Dispatches the enduser, setting its results, loss and status
+        ("Heuristic")
+        """
+        enduser = self.enduser
+        delta_t_k = self.delta_t_k
+        if delta_t_k is None:
+            delta_t_k = np.full(config.horizon, config.delta_t)
+        delta_t_k = np.asarray(delta_t_k, dtype=float)
+        horizon = len(delta_t_k)
+        flexibility = float(enduser.flexibility)
+        grid = enduser.grid
+
+        def array(values) -> np.ndarray:
+            return np.broadcast_to(np.asarray(values, dtype=float), (horizon,))
+
+        def stack(values: list) -> np.ndarray:
+            # (assets, steps), also for no asset
+            return np.array(values, dtype=float).reshape(len(values), horizon)
+
+        # prices
+        if grid.loss_f == "minimize_cost":
+            price = array(grid.import_tariff_k)
+        else:
+            price = np.ones(horizon)
+        low, high = np.quantile(price, [self.price_low, self.price_high])
+        efficiency = min(
+            (
+                storage.efficiency_charging * storage.efficiency_discharging
+                for storage in enduser.storages
+            ),
+            default=1.0,
+        )
+        # cheap steps, worth charging from the grid to discharge later
+        cheap = price <= low if low < high * efficiency else np.zeros(horizon, bool)
+        expensive = price >= high if low < high else np.zeros(horizon, bool)
+        # steps where storing surplus production is worth more than exporting
+        # it, always when minimizing the grid supply
+        if grid.loss_f == "minimize_cost":
+            store = array(grid.export_tariff_k) < efficiency * high
+        else:
+            store = np.ones(horizon, bool)
+        # steps where discharging is worth its recharge
+        discharge = ~cheap & (expensive | np.any(store))
+
+        # producers
+        production = stack([array(p.power_actual_k) for p in enduser.producers])
+        curtailment_max = np.array(
+            [p.power_curtailment_factor_max for p in enduser.producers]
+        )
+        curtailment = np.zeros_like(production)
+
+        # consumers, deficits must be caught up by the end of the horizon
+        desired = stack([array(c.power_desired_k) for c in enduser.consumers])
+        power_max = stack(
+            [array(c.available_k) * c.power_max for c in enduser.consumers]
+        )
+        power_min = np.array([c.power_min for c in enduser.consumers], dtype=float)
+        catch_up = _get_rest(np.maximum(power_max - desired, 0) * delta_t_k)
+        deficit_max = np.minimum(
+            stack([array(c.energy_deficit_max_k) for c in enduser.consumers])
+            * flexibility,
+            catch_up,
+        )
+        actual = np.zeros_like(desired)
+        deficit = np.zeros_like(desired)
+
+        # storages, energy kept within reach of the final state of charge of
+        # each connection
+        storages = enduser.storages
+        available = stack([array(s.available_k) > 0 for s in storages]) > 0
+        capacity = np.array([s.energy_capacity for s in storages])[:, None]
+        charging_max = (
+            available
+            * np.array([s.power_charge_max for s in storages])[:, None]
+            * flexibility
+        )
+        discharging_max = (
+            available
+            * np.array([s.power_discharge_max for s in storages])[:, None]
+            * flexibility
+        )
+        efficiency_charging = np.array([s.efficiency_charging for s in storages])
+        efficiency_discharging = np.array([s.efficiency_discharging for s in storages])
+        previous = np.concatenate(
+            (np.zeros((len(storages), 1), bool), available[:, :-1]), axis=1
+        )
+        following = np.concatenate(
+            (available[:, 1:], np.zeros((len(storages), 1), bool)), axis=1
+        )
+        connect = available & ~previous
+        end = _get_segment_end(available & ~following)
+        initial = capacity * stack(
+            [array(s.state_of_charge_initial_k) for s in storages]
+        )
+        final = capacity * stack([array(s.state_of_charge_final_k) for s in storages])
+        target = np.take_along_axis(final, end, axis=1)
+        rise = _get_rest(charging_max * efficiency_charging[:, None] * delta_t_k, end)
+        fall = _get_rest(
+            discharging_max / efficiency_discharging[:, None] * delta_t_k, end
+        )
+        soc_min = np.array([s.state_of_charge_min for s in storages])[:, None]
+        soc_max = np.array([s.state_of_charge_max for s in storages])[:, None]
+        energy_low = np.maximum(available * capacity * soc_min, target - rise)
+        energy_high = np.minimum(available * capacity * soc_max, target + fall)
+        energy_low = np.where(available, energy_low, 0.0)
+        energy_high = np.where(available, np.maximum(energy_high, energy_low), 0.0)
+        # charged only with what can be discharged on the steps discharging is
+        # worth it, before the end of the connection
+        useful = _get_rest(
+            discharging_max / efficiency_discharging[:, None] * delta_t_k * discharge,
+            end,
+        )
+        energy_fill = np.maximum(np.minimum(energy_high, target + useful), energy_low)
+        energy = np.zeros_like(energy_low)
+        charging = np.zeros_like(energy_low)
+        discharging = np.zeros_like(energy_low)
+
+        heat = [
+            _HeatNodeDispatch(heatnode, delta_t_k, flexibility, self.band)
+            for heatnode in enduser.heatnodes
+        ]
+
+        import_max = array(grid.power_import_max_k)
+        export_max = array(grid.power_export_max_k)
+        negative = (
+            array(grid.export_tariff_k) < 0
+            if grid.loss_f == "minimize_cost"
+            else np.zeros(horizon, bool)
+        )
+        grid_import = np.zeros(horizon)
+        grid_export = np.zeros(horizon)
+        stored = np.zeros(len(storages))
+        for k in range(horizon):
+            dt = delta_t_k[k]
+            surplus = np.sum(production[:, k]) - np.sum(desired[:, k])
+            heat_power = sum(
+                node.step(k, surplus if store[k] else 0.0) for node in heat
+            )
+            surplus -= heat_power
+
+            # consumers, within their deficit limits
+            carried = deficit[:, k - 1] if k else np.zeros(len(desired))
+            lower = np.maximum(
+                power_min, desired[:, k] - (deficit_max[:, k] - carried) / dt
+            )
+            upper = np.minimum(power_max[:, k], desired[:, k] + carried / dt)
+            upper = np.maximum(upper, lower)
+            power = np.clip(desired[:, k], lower, upper)
+            if cheap[k]:
+                power = upper
+            elif surplus > TOLERANCE:
+                power = power + (upper - power) * _share(upper - power, surplus)
+            elif expensive[k]:
+                power = lower
+            actual[:, k] = power
+            deficit[:, k] = carried + (desired[:, k] - power) * dt
+            net = np.sum(power) + heat_power - np.sum(production[:, k])
+
+            # storages, charged / discharged in proportion to their room
+            stored = np.where(connect[:, k], initial[:, k], stored)
+            room_charge = np.minimum(
+                charging_max[:, k],
+                np.maximum(energy_fill[:, k] - stored, 0) / (efficiency_charging * dt),
+            )
+            room_discharge = np.minimum(
+                discharging_max[:, k],
+                np.maximum(stored - energy_low[:, k], 0) * efficiency_discharging / dt,
+            )
+            forced_charge = np.minimum(
+                room_charge,
+                np.maximum(energy_low[:, k] - stored, 0) / (efficiency_charging * dt),
+            )
+            forced_discharge = np.minimum(
+                room_discharge,
+                np.maximum(stored - energy_high[:, k], 0) * efficiency_discharging / dt,
+            )
+            wanted_charge = max(-net, 0.0) if store[k] else 0.0
+            if cheap[k]:
+                wanted_charge += max(import_max[k] - max(net, 0.0), 0.0)
+            wanted_discharge = max(net, 0.0) if discharge[k] else 0.0
+            charging[:, k] = forced_charge + (room_charge - forced_charge) * _share(
+                room_charge - forced_charge, wanted_charge - np.sum(forced_charge)
+            )
+            discharging[:, k] = forced_discharge + (
+                room_discharge - forced_discharge
+            ) * _share(
+                room_discharge - forced_discharge,
+                wanted_discharge - np.sum(forced_discharge),
+            )
+            if not grid.discharge_to_grid:
+                # no export while discharging, at the expense of the targets
+                covered = max(net + np.sum(charging[:, k]), 0.0)
+                discharging[:, k] *= _share(discharging[:, k], covered)
+            stored = np.where(
+                available[:, k],
+                stored
+                + (
+                    efficiency_charging * charging[:, k]
+                    - discharging[:, k] / efficiency_discharging
+                )
+                * dt,
+                0.0,
+            )
+            energy[:, k] = stored
+            net += np.sum(charging[:, k]) - np.sum(discharging[:, k])
+
+            # producers, curtailed above the export limit
+            excess = -net if negative[k] else -net - export_max[k]
+            total = np.sum(production[:, k])
+            if excess > TOLERANCE and total > TOLERANCE:
+                curtailment[:, k] = np.minimum(curtailment_max, excess / total)
+                net += np.sum(production[:, k] * curtailment[:, k])
+            grid_import[k] = max(net, 0.0)
+            grid_export[k] = max(-net, 0.0)
+
+        grid.power_import_k = grid_import
+        grid.power_export_k = grid_export
+        grid.exporting_to_grid_k = (grid.power_export_k > TOLERANCE).astype(int)
+
+        for i, producer in enumerate(enduser.producers):
+            producer.power_curtailment_factor_k = curtailment[i]
+        for i, consumer in enumerate(enduser.consumers):
+            consumer.power_actual_k = actual[i]
+            consumer.energy_deficit_k = deficit[i]
+        for i, storage in enumerate(storages):
+            storage.event_connect_k = connect[i].astype(int)
+            storage.event_disconnect_k = (previous[i] & ~available[i]).astype(int)
+            storage.energy_k = energy[i]
+            storage.power_charging_k = charging[i]
+            storage.power_discharging_k = discharging[i]
+        for node in heat:
+            node.set_results()
+
+        enduser.loss = float(
+            np.sum(
+                delta_t_k
+                / config.delta_t
+                * grid.losses[grid.loss_f](grid, np.arange(horizon))
+            )
+        )
+        enduser.status = "Heuristic"
+        enduser.relaxations = []
+        enduser.solution = {}
+        enduser.include_results = True
+
+    def get_warm_start(self) -> dict:
+        """Returns the values of the variables of the optimization problem by
+        name for the heuristic schedule of the enduser (left unchanged), to
+        pass as optimize(warm_start=...)
+        """
+        enduser = copy.deepcopy(self.enduser)
+        delta_t_k = self.delta_t_k
+        if delta_t_k is None:
+            delta_t_k = np.full(config.horizon, config.delta_t)
+        dispatch = HeuristicDispatch(enduser, delta_t_k)
+        dispatch.price_low = self.price_low
+        dispatch.price_high = self.price_high
+        dispatch.band = self.band
+        dispatch.run()
+
+        values = {
+            (key, attribute): np.asarray(getattr(asset, attribute), dtype=float)
+            for key, asset in enduser.iter_assets()
+            for attribute in RESULT_ATTRIBUTES.get(type(asset), [])
+        }
+        model = Model(enduser, len(delta_t_k), delta_t_k)
+        solution = {}
+        for key, attribute in values:
+            for variable, value in zip(
+                model.get_variables(f"{key}.{attribute}"), values[key, attribute]
+            ):
+                solution[variable.name] = float(value)
+        return solution
+
+
+class _HeatNodeDispatch:
+    def __init__(
+        self, heatnode, delta_t_k: np.ndarray, flexibility: float, band: float
+    ) -> None:
+        """Thermostat control of one heatnode, one step at a time"""
+        self.heatnode = heatnode
+        self.delta_t_k = delta_t_k
+        horizon = len(delta_t_k)
+        storages = heatnode.heatstorages
+        producers = heatnode.heatproducers
+
+        self.demand = np.zeros(horizon)
+        for heatconsumer in heatnode.heatconsumers:
+            self.demand += np.asarray(heatconsumer.power_actual_k, dtype=float)
+        self.demand *= delta_t_k
+
+        # heat storages, the heat is shared in proportion to their capacity
+        self.capacity = np.array(
+            [s.volume * flexibility * s.density * s.specific_heat for s in storages],
+            dtype=float,
+        )
+        self.share = (
+            self.capacity / np.sum(self.capacity)
+            if np.sum(self.capacity) > 0
+            else np.full(len(storages), 1 / max(len(storages), 1))
+        )
+        self.loss = np.array([s.loss_factor for s in storages], dtype=float)
+        minimum = np.array([s.temperature_min for s in storages], dtype=float)
+        maximum = np.array([s.temperature_max for s in storages], dtype=float)
+        self.maximum = maximum
+        self.low = minimum + band * (maximum - minimum)
+        self.high = minimum + 2 * band * (maximum - minimum)
+        self.final = np.array([s.temperature_final for s in storages], dtype=float)
+        self.temperature = np.array([s.temperature_init for s in storages], dtype=float)
+
+        # heat producers, by decreasing efficiency
+        self.order = sorted(
+            range(len(producers)), key=lambda j: -producers[j].efficiency
+        )
+        heat_max = sum(p.power_max * p.efficiency for p in producers)
+        # temperature the producers can add over the following steps, net of
+        # the demand and of the losses at the maximum temperature
+        losses = np.sum(self.loss * maximum) * delta_t_k / config.delta_t
+        self.rise = (
+            _get_rest((heat_max * delta_t_k - self.demand - losses)[None, :])[0]
+            / np.sum(self.capacity)
+            if np.sum(self.capacity) > 0
+            else np.zeros(horizon)
+        )
+
+        self.heating = False
+        self.running = np.zeros(len(producers), dtype=int)
+        self.power_k = np.zeros((len(producers), horizon))
+        self.running_k = np.zeros((len(producers), horizon), dtype=int)
+        self.starting_k = np.zeros((len(producers), horizon), dtype=int)
+        self.temperature_k = np.zeros((len(storages), horizon))
+        self.energy_in_k = np.zeros((len(storages), horizon))
+        self.energy_out_k = np.zeros((len(storages), horizon))
+
+    def step(self, k: int, surplus: float) -> float:
+        """Dispatches the heat producers at step k, given the surplus
+        production [kW], and returns their electrical power
+        """
+        producers = self.heatnode.heatproducers
+        if not self.heatnode.heatstorages:
+            return 0.0
+        dt = self.delta_t_k[k]
+        losses = self.loss * dt / config.delta_t
+        demand = self.demand[k]
+        last = k == len(self.delta_t_k) - 1
+
+        def heat_for(temperature: np.ndarray) -> float:
+            # heat needed for every storage to reach at least temperature
+            return float(
+                np.max(
+                    demand
+                    + (
+                        (self.capacity + losses) * temperature
+                        - self.capacity * self.temperature
+                    )
+                    / self.share
+                )
+            )
+
+        limit = heat_for(self.maximum) if not last else heat_for(self.final)
+        low = np.maximum(self.low, self.final - self.rise[k])
+        needed = heat_for(self.final) if last else heat_for(low)
+        if needed > TOLERANCE:
+            self.heating = True
+        wanted = max(needed, heat_for(self.high)) if self.heating else needed
+        if surplus > TOLERANCE and not last:
+            best = max((p.efficiency for p in producers), default=0.0)
+            wanted = max(wanted, surplus * best * dt)
+        wanted = min(wanted, limit)
+
+        heat = 0.0
+        running = np.zeros(len(producers), dtype=int)
+        # the most efficient producer heats up to the high temperature, the
+        # others only keep the low one
+        for n, j in enumerate(self.order):
+            producer = producers[j]
+            remaining = (wanted if n == 0 else needed) - heat
+            if remaining <= TOLERANCE:
+                break
+            heat_max = producer.power_max * producer.efficiency * dt
+            heat_min = producer.minimum_power_factor * heat_max
+            produced = min(max(remaining, heat_min), heat_max)
+            if heat + produced > limit + TOLERANCE and needed - heat <= TOLERANCE:
+                continue
+            running[j] = 1
+            heat += produced
+            self.power_k[j, k] = produced / (producer.efficiency * dt)
+        starting = running & (1 - self.running)
+        for j, producer in enumerate(producers):
+            self.power_k[j, k] += (
+                starting[j] * producer.power_loss_startup * producer.power_max
+            )
+        self.running = running
+        self.running_k[:, k] = running
+        self.starting_k[:, k] = starting
+
+        self.temperature = (
+            self.capacity * self.temperature + self.share * (heat - demand)
+        ) / (self.capacity + losses)
+        if np.all(self.temperature >= self.high - TOLERANCE):
+            self.heating = False
+        self.temperature_k[:, k] = self.temperature
+        self.energy_in_k[:, k] = self.share * heat
+        self.energy_out_k[:, k] = self.share * demand
+        return float(np.sum(self.power_k[:, k]))
+
+    def set_results(self) -> None:
+        for j, producer in enumerate(self.heatnode.heatproducers):
+            producer.power_k = self.power_k[j]
+            producer.running_k = self.running_k[j]
+            producer.starting_k = self.starting_k[j]
+        for j, storage in enumerate(self.heatnode.heatstorages):
+            storage.temperature_k = self.temperature_k[j]
+            storage.energy_in_k = self.energy_in_k[j]
+            storage.energy_out_k = self.energy_out_k[j]
+
+
+def _get_rest(values: np.ndarray, end: np.ndarray = None) -> np.ndarray:
+    """Returns, for each row and step k, the sum of values over the steps
+    after k, up to end[k] (included) or up to the last step
+    """
+    after = np.cumsum(values[:, ::-1], axis=1)[:, ::-1] - values
+    if end is None:
+        return after
+    return after - np.take_along_axis(after, end, axis=1)
+
+
+def _get_segment_end(last: np.ndarray) -> np.ndarray:
+    """Returns, for each row and step, the index of the next step (itself
+    included) where last is True, or the last step
+    """
+    horizon = last.shape[1]
+    index = np.where(last, np.arange(horizon), horizon - 1)
+    return np.minimum.accumulate(index[:, ::-1], axis=1)[:, ::-1]
+
+
+def _share(room: np.ndarray, wanted: float) -> float:
+    """Returns the fraction of the room to use to cover wanted"""
+    total = np.sum(room)
+    if wanted <= TOLERANCE or total <= TOLERANCE:
+        return 0.0
+    return min(1.0, wanted / total)
@@ -0,0 +1,249 @@
+import numpy as np
+
+from enduseroptimizer import config
+
+TOLERANCE = 1e-9
+# status of a schedule optimal up to the state of charge grid
+APPROXIMATE = "Optimal (approximate)"
+
+
+def is_single_storage(enduser) -> bool:
+    """Returns True when the enduser has the structure solved by StorageDP:
+    one storage, no heatnode, consumers without deficit (their power is the
+    desired power) and a loss function of the Grid class
+    """
+    return (
+        len(enduser.storages) == 1
+        and not enduser.heatnodes
+        and all(
+            not np.any(np.asarray(consumer.energy_deficit_max_k) * enduser.flexibility)
+            for consumer in enduser.consumers
+        )
+        and enduser.grid.loss_f in ["minimize_cost", "minimize_grid_supply"]
+    )
+
+
+class StorageDP:
+    def __init__(self, enduser, delta_t_k: np.ndarray = None) -> None:
+        """Dynamic program for endusers with a single storage (see
+        is_single_storage), as a fast alternative to the MILP. The energy of
+        the storage is discretized on a grid of config.soc_tolerance times its
+        capacity, and the cheapest path through the grid is found forward, all
+        transitions of a step at once. For each transition, the curtailment
+        and the grid exchange follow from the power balance, with the same
+        bounds and exclusivity rules as the MILP. The schedule is feasible and
+        its loss exact, but optimal only up to the grid resolution: its
+        status is APPROXIMATE ("Optimal (approximate)").
+
+        Editable attributes:
+            enduser (EndUser): enduser to solve, its results are overwritten
+            delta_t_k (array[float]): length of each step [h], defaults to
+                config.delta_t for every step of config.horizon
+            tolerance (float): step of the state of charge grid, defaults to
+                config.soc_tolerance
+        """
+        self.enduser = enduser
+        self.delta_t_k = delta_t_k
+        self.tolerance = config.soc_tolerance
+
+    def run(self) -> bool:
+        """Solves the enduser, setting its results, loss and status
+
+        Returns:
+            bool: False when no feasible path exists, the enduser is then left
+                unchanged (for the MILP to report the infeasibility)
+        """
+        enduser = self.enduser
+        delta_t_k = self.delta_t_k
+        if delta_t_k is None:
+            delta_t_k = np.full(config.horizon, config.delta_t)
+        delta_t_k = np.asarray(delta_t_k, dtype=float)
+        horizon = len(delta_t_k)
+        storage = enduser.storages[0]
+        grid = enduser.grid
+        flexibility = float(enduser.flexibility)
+
+        def array(values) -> np.ndarray:
+            return np.broadcast_to(np.asarray(values, dtype=float), (horizon,))
+
+        # consumers at their desired power, which must be within bounds
+        load = np.zeros(horizon)
+        for consumer in enduser.consumers:
+            desired = array(consumer.power_desired_k)
+            upper = array(consumer.available_k) * consumer.power_max
+            if np.any(desired < consumer.power_min - TOLERANCE) or np.any(
+                desired > upper + TOLERANCE
+            ):
+                return False
+            load += desired
+        production = np.zeros(horizon)
+        curtailable = np.zeros(horizon)
+        for producer in enduser.producers:
+            power = array(producer.power_actual_k)
+            production += power
+            curtailable += power * producer.power_curtailment_factor_max
+        self._load = load - production
+        self._curtailable = curtailable
+        self._weight = delta_t_k / config.delta_t
+
+        # storage grid
+        available = array(storage.available_k) > 0
+        capacity = storage.energy_capacity
+        low = capacity * storage.state_of_charge_min
+        high = capacity * storage.state_of_charge_max
+        count = max(int(np.ceil((high - low) / (self.tolerance * capacity))), 1) + 1
+        levels = np.linspace(low, high, count)
+        final = capacity * array(storage.state_of_charge_final_k)[-1]
+        if available[-1]:
+            if not low - TOLERANCE <= final <= high + TOLERANCE:
+                return False
+            levels = np.unique(np.append(levels, final))
+        initial = capacity * array(storage.state_of_charge_initial_k)
+        charging_max = storage.power_charge_max * flexibility
+        discharging_max = storage.power_discharge_max * flexibility
+
+        # forward pass: cost of the cheapest path to each state, and the
+        # previous state on this path
+        energies, previous = [], []
+        state = np.zeros(1)
+        cost = np.zeros(1)
+        for k in range(horizon):
+            dt = delta_t_k[k]
+            best = int(np.argmin(cost))
+            if not available[k]:
+                step = self._get_costs(k, np.zeros((1, 1)), np.zeros((1, 1)))
+                energies.append(np.zeros(1))
+                previous.append(np.array([best]))
+                state, cost = energies[-1], cost[best] + step[0]
+                continue
+            if k == 0 or not available[k - 1]:
+                # (re)connected at the initial state of charge
+                state, cost, back = initial[k : k + 1], cost[best : best + 1], best
+            else:
+                back = None
+            target = levels if not (k == horizon - 1) else levels[levels == final]
+
+            change = target[None, :] - state[:, None]
+            charging = np.maximum(change, 0) / (storage.efficiency_charging * dt)
+            discharging = np.maximum(-change, 0) * storage.efficiency_discharging / dt
+            step = self._get_costs(k, charging, discharging)
+            step[charging > charging_max + TOLERANCE] = np.inf
+            step[discharging > discharging_max + TOLERANCE] = np.inf
+
+            total = cost[:, None] + step
+            index = np.argmin(total, axis=0)
+            cost = total[index, np.arange(len(target))]
+            if back is not None:
+                index = np.full(len(target), back)
+            energies.append(target)
+            previous.append(index)
+            state = target
+
+        if not np.isfinite(np.min(cost)):
+            return False
+
+        # backward pass: energy of the storage at each step
+        energy = np.zeros(horizon)
+        n = int(np.argmin(cost))
+        for k in range(horizon - 1, -1, -1):
+            energy[k] = energies[k][n]
+            n = previous[k][n]
+
+        before = np.concatenate(([0.0], energy[:-1]))
+        before = np.where(
+            available & ~np.append(False, available[:-1]), initial, before
+        )
+        change = np.where(available, energy - before, 0.0)
+        charging = np.maximum(change, 0) / (storage.efficiency_charging * delta_t_k)
+        discharging = (
+            np.maximum(-change, 0) * storage.efficiency_discharging / delta_t_k
+        )
+        curtailment, power_import, power_export = self._get_exchange(
+            np.arange(horizon), charging, discharging
+        )
+
+        previous_available = np.append(False, available[:-1])
+        storage.event_connect_k = (available & ~previous_available).astype(int)
+        storage.event_disconnect_k = (~available & previous_available).astype(int)
+        storage.energy_k = energy
+        storage.power_charging_k = charging
+        storage.power_discharging_k = discharging
+        for consumer in enduser.consumers:
+            consumer.power_actual_k = array(consumer.power_desired_k).copy()
+            consumer.energy_deficit_k = np.zeros(horizon)
+        share = np.divide(
+            curtailment,
+            curtailable,
+            out=np.zeros(horizon),
+            where=curtailable > TOLERANCE,
+        )
+        for producer in enduser.producers:
+            producer.power_curtailment_factor_k = (
+                share * producer.power_curtailment_factor_max
+            )
+        grid.power_import_k = power_import
+        grid.power_export_k = power_export
+        grid.exporting_to_grid_k = (power_export > TOLERANCE).astype(int)
+
+        enduser.loss = float(
+            np.sum(self._weight * grid.losses[grid.loss_f](grid, np.arange(horizon)))
+        )
+        enduser.status = APPROXIMATE
+        enduser.relaxations = []
+        enduser.solution = {}
+        enduser.include_results = True
+        return True
+
+    def _get_exchange(self, k, charging: np.ndarray, discharging: np.ndarray):
+        """Returns the curtailed power, the import and the export for given
+        charging and discharging powers at steps k (arrays broadcast together),
+        with nan where no curtailment satisfies the grid bounds
+        """
+        grid = self.enduser.grid
+        net = self._load[k] + charging - discharging
+        curtailable = self._curtailable[k]
+        export_max = np.asarray(grid.power_export_max_k, dtype=float)[k]
+        # smallest curtailment for the export bound, and for no export while
+        # discharging if the grid forbids it
+        curtailment = np.maximum(-net - export_max, 0)
+        if not grid.discharge_to_grid:
+            curtailment = np.where(
+                discharging > TOLERANCE, np.maximum(-net, 0), curtailment
+            )
+        if grid.loss_f == "minimize_cost":
+            # curtail the whole export while its tariff is negative
+            negative = np.asarray(grid.export_tariff_k, dtype=float)[k] < 0
+            curtailment = np.where(
+                negative,
+                np.maximum(curtailment, np.minimum(curtailable, np.maximum(-net, 0))),
+                curtailment,
+            )
+        net = net + curtailment
+        power_import = np.maximum(net, 0)
+        power_export = np.maximum(-net, 0)
+        feasible = (curtailment <= curtailable + TOLERANCE) & (
+            power_import
+            <= np.asarray(grid.power_import_max_k, dtype=float)[k] + TOLERANCE
+        )
+        return (
+            np.where(feasible, curtailment, np.nan),
+            power_import,
+            power_export,
+        )
+
+    def _get_costs(
+        self, k: int, charging: np.ndarray, discharging: np.ndarray
+    ) -> np.ndarray:
+        """Returns the loss of step k for each transition, inf if infeasible"""
+        grid = self.enduser.grid
+        curtailment, power_import, power_export = self._get_exchange(
+            k, charging, discharging
+        )
+        if grid.loss_f == "minimize_cost":
+            loss = (
+                np.asarray(grid.import_tariff_k, dtype=float)[k] * power_import
+                - np.asarray(grid.export_tariff_k, dtype=float)[k] * power_export
+            )
+        else:
+            loss = power_import
+        return np.where(np.isnan(curtailment), np.inf, self._weight[k] * loss)
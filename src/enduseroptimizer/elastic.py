@@ -0,0 +1,86 @@
+import numpy as np
+import pulp as pl
+
+TOLERANCE = 1e-6
+
+
+class Slacks:
+    def __init__(self, enabled: bool = False, penalty: float = 1e6) -> None:
+        """Penalized slack variables of the elastic optimization mode. When
+        disabled, no variable is created and every slack is 0, so that the
+        problem is unchanged.
+
+        Editable attributes:
+            enabled (bool): create the slack variables
+            penalty (float): cost of one unit of slack in the objective
+
+        Computed attributes:
+            variables (list[tuple]): (constraint, asset, k, sign, variable) of
+                each slack variable
+        """
+        self.enabled = enabled
+        self.penalty = penalty
+        self.variables: list[tuple] = []
+
+    def add(self, constraint: str, asset: str, k: int, sign: int = 1):
+        """Returns a slack variable (>= 0) relaxing constraint of asset at
+        timestep k, or 0 when disabled
+        """
+        if not self.enabled:
+            return 0
+        variable = pl.LpVariable(
+            name=f"slack_{len(self.variables)}_{constraint}", lowBound=0
+        )
+        self.variables.append((constraint, asset, k, sign, variable))
+        return variable
+
+    def add_pair(self, constraint: str, asset: str, k: int):
+        """Returns the difference of two slack variables, relaxing an equality
+        constraint in both directions, or 0 when disabled
+        """
+        return self.add(constraint, asset, k, 1) - self.add(constraint, asset, k, -1)
+
+    def get_penalty(self):
+        """Returns the penalty of the slack variables, to add to the objective"""
+        return self.penalty * pl.lpSum(variable for *_, variable in self.variables)
+
+    def get_relaxations(self) -> list[dict]:
+        """Returns the constraints relaxed by the solution
+
+        Returns:
+            list[dict]: one entry per constraint and asset, with "constraint",
+                "asset", "k" (array of the relaxed timesteps) and "amount"
+                (array of the relaxation at these timesteps). For equality
+                constraints, the amount is positive when the solution is above
+                its target (state of charge, temperature) or when the supply
+                is above the demand (power balance)
+        """
+        amounts: dict[tuple[str, str], dict[int, float]] = {}
+        for constraint, asset, k, sign, variable in self.variables:
+            value = variable.varValue or 0.0
+            if value > TOLERANCE:
+                relaxed = amounts.setdefault((constraint, asset), {})
+                relaxed[k] = relaxed.get(k, 0.0) + sign * value
+
+        relaxations = []
+        for (constraint, asset), relaxed in amounts.items():
+            k = np.array(sorted(relaxed), dtype=int)
+            relaxations.append(
+                {
+                    "constraint": constraint,
+                    "asset": asset,
+                    "k": k,
+                    "amount": np.array([relaxed[n] for n in k]),
+                }
+            )
+        return relaxations
+
+
+def format_relaxations(relaxations: list[dict]) -> str:
+    """Returns the relaxations found by Slacks.get_relaxations, one per line"""
+    return "\n".join(
+        f"{relaxation['asset']}: {relaxation['constraint']} relaxed at "
+        f"{len(relaxation['k'])} timestep(s), first k={relaxation['k'][0]}, "
+        f"max |amount|={np.max(np.abs(relaxation['amount'])):.4g}"
+        for relaxation in relaxations
+    )
@@ -0,0 +1,171 @@
+import base64
+import json
+
+import numpy as np
+
+
+def encode_k(values, compact: bool = False):
+    """Returns a JSON compatible representation of an array
+
+    Args:
+        values (array): array to encode
+        compact (bool): when false, the array is a plain list. When true, the
+            shortest of the following exact encodings is used:
+                {"enc": "const", "v": value, "n": length}: constant array
+                {"enc": "rle", "v": [values], "n": [run lengths]}: run-length
+                {"enc": "bits", "b64": packed bits, "n": length}: 0/1 array
+                {"enc": "b64", "dtype": "<f4" | "<f8" | "<i4" | "<i8",
+                    "b64": packed values}: base64 of the raw values, in
+                    float32/int32 when it represents the values exactly
+    """
+    values = np.asarray(values)
+    if not compact or values.ndim != 1 or len(values) == 0:
+        return values.tolist()
+
+    if values.dtype.kind not in "biuf":
+        return values.tolist()
+
+    changes = _get_changes(values)
+    if not np.any(changes):
+        return {"enc": "const", "v": values[0].item(), "n": len(values)}
+
+    candidates = [values.tolist(), _encode_b64(values)]
+    runs = np.count_nonzero(changes) + 1
+    if runs <= len(values) // 4:
+        starts = np.concatenate(([0], np.flatnonzero(changes) + 1))
+        candidates.append(
+            {
+                "enc": "rle",
+                "v": values[starts].tolist(),
+                "n": np.diff(np.append(starts, len(values))).tolist(),
+            }
+        )
+    # -0.0 would be decoded as 0.0
+    if np.all((values == 0) | (values == 1)) and not np.any(np.signbit(values)):
+        candidates.append(
+            {
+                "enc": "bits",
+                "b64": base64.b64encode(
+                    np.packbits(values.astype(np.uint8)).tobytes()
+                ).decode("ascii"),
+                "n": len(values),
+            }
+        )
+    return min(candidates, key=lambda candidate: len(json.dumps(candidate)))
+
+
+def decode_k(data, dtype=float) -> np.ndarray:
+    """Returns the array encoded by encode_k (compact or plain list)"""
+    if not isinstance(data, dict):
+        try:
+            values = np.asarray(data, dtype=dtype)
+        except TypeError as error:
+            raise ValueError(f"Invalid array: {error}") from error
+        if values.ndim != 1:
+            raise ValueError(f"Expected a 1-d array, got shape {values.shape}")
+        return values
+
+    encoding = data.get("enc")
+    if encoding == "const":
+        return np.full(data["n"], data["v"], dtype=dtype)
+    if encoding == "rle":
+        return np.repeat(np.asarray(data["v"], dtype=dtype), data["n"])
+    if encoding == "bits":
+        bits = np.frombuffer(base64.b64decode(data["b64"]), dtype=np.uint8)
+        return np.unpackbits(bits, count=data["n"]).astype(dtype)
+    if encoding == "b64":
+        return np.frombuffer(base64.b64decode(data["b64"]), dtype=data["dtype"]).astype(
+            dtype
+        )
+    raise ValueError(f"Unknown array encoding '{encoding}'")
+
+
+def length_k(data) -> int:
+    """Returns the length of the array encoded by encode_k, without decoding
+    it
+    """
+    if isinstance(data, list):
+        return len(data)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected an array, got {type(data).__name__}")
+
+    encoding = data.get("enc")
+    if encoding in ("const", "bits"):
+        return int(data["n"])
+    if encoding == "rle":
+        if len(data["v"]) != len(data["n"]):
+            raise ValueError("Run-length values and lengths differ in length")
+        return int(sum(data["n"]))
+    if encoding == "b64":
+        text = data["b64"]
+        size = len(text) * 3 // 4 - text.count("=", -2)
+        return size // np.dtype(data["dtype"]).itemsize
+    raise ValueError(f"Unknown array encoding '{encoding}'")
+
+
+class LazyArray:
+    def __init__(self, dtype=float) -> None:
+        """Class attribute of an asset for a result array read by from_dict:
+        the array is stored as read (see defer_k) and only decoded on first
+        access. Assigning the attribute replaces it as for a plain attribute.
+
+        Args:
+            dtype: dtype of the decoded array
+        """
+        self.dtype = dtype
+        self.name = ""
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            data = instance.__dict__["_deferred"].pop(self.name)
+        except KeyError:
+            raise AttributeError(
+                f"'{type(instance).__name__}' object has no attribute '{self.name}'"
+            ) from None
+        # cached in the instance, which takes precedence over the descriptor
+        values = decode_k(data, self.dtype)
+        instance.__dict__[self.name] = values
+        return values
+
+
+def defer_k(instance, name: str, data) -> None:
+    """Stores an encoded array as attribute name of instance, decoded on first
+    access (the attribute must be a LazyArray of the class)
+    """
+    instance.__dict__.pop(name, None)
+    instance.__dict__.setdefault("_deferred", {})[name] = data
+
+
+def _get_changes(values: np.ndarray) -> np.ndarray:
+    """Returns True where values[k + 1] differs from values[k] (NaN equal),
+    floats being compared by their bits, so that -0.0 differs from 0.0
+    """
+    if values.dtype.kind != "f":
+        return values[1:] != values[:-1]
+    bits = values.view(f"i{values.dtype.itemsize}")
+    same = bits[1:] == bits[:-1]
+    same |= np.isnan(values[1:]) & np.isnan(values[:-1])
+    return ~same
+
+
+def _encode_b64(values: np.ndarray) -> dict:
+    if values.dtype.kind == "f":
+        dtype = np.dtype("<f8")
+        with np.errstate(over="ignore"):
+            single = values.astype("<f4")
+        if np.array_equal(single.astype(values.dtype), values, equal_nan=True):
+            dtype = np.dtype("<f4")
+    else:
+        dtype = np.dtype("<i8")
+        if np.all((values >= -(2**31)) & (values < 2**31)):
+            dtype = np.dtype("<i4")
+    return {
+        "enc": "b64",
+        "dtype": dtype.str,
+        "b64": base64.b64encode(values.astype(dtype).tobytes()).decode("ascii"),
+    }
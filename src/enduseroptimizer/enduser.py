@@ -1,3 +1,4 @@
+import copy
 from datetime import datetime, timedelta
 
 import numpy as np
@@ -8,10 +9,29 @@ from enduseroptimizer import (
     Consumer,
     Grid,
     HeatNode,
+    HeatStorage,
     Producer,
+    Results,
     Storage,
     config,
 )
+from enduseroptimizer.dispatch import HeuristicDispatch
+from enduseroptimizer.dynamic import APPROXIMATE, StorageDP, is_single_storage
+from enduseroptimizer.elastic import Slacks, format_relaxations
+from enduseroptimizer.feasibility import check_feasibility, format_report
+from enduseroptimizer.model import Model
+from enduseroptimizer.modelcache import ModelCache
+from enduseroptimizer.network import NetworkFlow, is_network
+from enduseroptimizer.repair import get_starting, repair_running, round_running
+from enduseroptimizer.resolution import aggregate_enduser, expand_results
+from enduseroptimizer.scaling import Scaling
+from enduseroptimizer.schema import validate_dict
+from enduseroptimizer.symmetry import get_symmetry_constraints
+
+TOLERANCE = 1e-6
+# statuses of a usable schedule: optimal, or optimal up to the state of
+# charge grid of dynamic.StorageDP
+SOLVED = ["Optimal", APPROXIMATE]
 
 
 class EndUser:
@@ -33,6 +53,29 @@ class EndUser:
             start_time (datetime): date of the start of the simulation
             flexibility (bool): enable flexible assets in the enduser
             status (str): status of the optimization, updated after optimization
+            infeasibilities (list[dict]): problems found by the feasibility
+                screen of the last optimization (see
+                feasibility.check_feasibility), the solver is not called if
+                any is found
+            relaxations (list[dict]): constraints relaxed by the last elastic
+                optimization (see elastic.Slacks.get_relaxations), empty if
+                the problem is feasible
+            coefficient_ranges (dict): ranges of the coefficients of the last
+                optimization problem, "before" and "after" scaling (see
+                scaling.get_coefficient_ranges)
+            solution (dict[str, float]): values of the variables of the last
+                optimization problem by name, e.g. to warm start a similar
+                problem
+            cross_check (dict): losses of the last optimization solved by
+                dynamic.StorageDP, network.NetworkFlow or optimize(approximate=
+                True) and by the exact solver, with config.cross_check:
+                "loss", "loss_solver" and their relative "gap"
+
+        The result attributes of the assets (e.g. Grid.power_import_k) are
+        only written with the values of a solved problem: the problem itself
+        is built on a copy of the structure of the enduser (see model.Model)
+        and released once its results are extracted. They are views of the
+        contiguous buffer of results (see results.Results).
         """
         self.name = name
 
@@ -46,6 +89,26 @@ class EndUser:
         self.start_time: datetime = datetime(year=2021, month=6, day=1)
         self.flexibility: bool = True
         self.status: str = "Not Solved"
+        self.infeasibilities: list[dict] = []
+        self.relaxations: list[dict] = []
+        self.coefficient_ranges: dict = {}
+        self.solution: dict[str, float] = {}
+        self.cross_check: dict = {}
+        self._results: Results = None
+
+    @property
+    def results(self) -> Results:
+        """Results of the last optimization (see results.Results): the result
+        arrays of the assets by "<asset key>.<attribute>", the loss and the
+        status. Result attributes set otherwise (other engines, from_dict) are
+        packed into a new buffer on access, and replaced by its views.
+        """
+        if self._results is None or not self._results.is_applied(self):
+            self._results = Results.from_enduser(self)
+            self._results.apply(self)
+        self._results.loss = self.loss
+        self._results.status = self.status
+        return self._results
 
     def get_timestamps(self) -> list[datetime]:
         """Returns the timestamps of the optimization horizon"""
@@ -53,7 +116,13 @@ class EndUser:
             self.start_time + timedelta(hours=i*config.delta_t) for i in range(config.horizon)
         ]
 
-    def to_dict(self) -> dict:
+    def to_dict(self, compact: bool = False) -> dict:
+        """Returns the enduser as a JSON compatible dict
+
+        Args:
+            compact (bool): when true, the arrays are stored in a compact
+                encoding (see encoding.encode_k), which from_dict reads as well
+        """
         data = {}
 
         data["horizon_i"] = config.horizon
@@ -65,29 +134,43 @@ class EndUser:
 
         data["producers_d"] = {}
         for i, producer in enumerate(self.producers):
-            data["producers_d"][i] = producer.to_dict(self.include_results)
+            data["producers_d"][i] = producer.to_dict(self.include_results, compact)
 
         data["storages_d"] = {}
         for i, storage in enumerate(self.storages):
-            data["storages_d"][i] = storage.to_dict(self.include_results)
+            data["storages_d"][i] = storage.to_dict(self.include_results, compact)
 
         data["consumers_d"] = {}
         for i, consumer in enumerate(self.consumers):
-            data["consumers_d"][i] = consumer.to_dict(self.include_results)
+            data["consumers_d"][i] = consumer.to_dict(self.include_results, compact)
 
         data["heatnodes_dd"] = {}
         for i, heatnode in enumerate(self.heatnodes):
-            data["heatnodes_dd"][i] = heatnode.to_dict(self.include_results)
+            data["heatnodes_dd"][i] = heatnode.to_dict(self.include_results, compact)
 
         data["grid_d"] = {}
-        data["grid_d"]["0"] = self.grid.to_dict(self.include_results)
+        data["grid_d"]["0"] = self.grid.to_dict(self.include_results, compact)
 
         if self.include_results:
             data["loss_i"] = self.loss
 
         return data
 
-    def from_dict(self, data: dict) -> None:
+    def from_dict(self, data: dict, validate: bool = True) -> None:
+        """Loads an enduser from a dict returned by to_dict. The input arrays
+        are decoded, the result arrays are only decoded on first access.
+
+        Args:
+            data (dict): enduser dict
+            validate (bool): check the keys, types and array lengths of data
+                before loading it (see schema.validate_dict)
+
+        Raises:
+            ValueError: if validate and data is invalid
+        """
+        if validate:
+            validate_dict(data)
+
         enduseroptimizer.config.horizon = data["horizon_i"]
         enduseroptimizer.config.delta_t = data["delta_t_i"]
         self.include_results = data["include_results_i"]
@@ -120,13 +203,399 @@ class EndUser:
         if self.include_results:
             self.loss = data["loss_i"]
 
-    def optimize(self) -> None:
+    def iter_assets(self):
+        """Yields (key, asset) for every asset of the enduser, heatnode
+        assets included, in a fixed order
+        """
+        for i, producer in enumerate(self.producers):
+            yield f"producers[{i}]", producer
+        for i, storage in enumerate(self.storages):
+            yield f"storages[{i}]", storage
+        for i, consumer in enumerate(self.consumers):
+            yield f"consumers[{i}]", consumer
+        for i, heatnode in enumerate(self.heatnodes):
+            for j, heatproducer in enumerate(heatnode.heatproducers):
+                yield f"heatnodes[{i}].heatproducers[{j}]", heatproducer
+            for j, heatstorage in enumerate(heatnode.heatstorages):
+                yield f"heatnodes[{i}].heatstorages[{j}]", heatstorage
+            for j, heatconsumer in enumerate(heatnode.heatconsumers):
+                yield f"heatnodes[{i}].heatconsumers[{j}]", heatconsumer
+        yield "grid", self.grid
+
+    def get_final_state(self) -> dict:
+        """Returns the state of the storages at the end of the optimized
+        horizon, as {asset key: value}: the state of charge of the storages
+        (None when disconnected) and the temperature of the heat storages
+        """
+        state = {}
+        for key, asset in self.iter_assets():
+            if isinstance(asset, Storage):
+                state[key] = (
+                    float(asset.energy_k[-1] / asset.energy_capacity)
+                    if asset.available_k[-1] and not np.isnan(asset.energy_k[-1])
+                    else None
+                )
+            elif isinstance(asset, HeatStorage):
+                state[key] = float(asset.temperature_k[-1])
+        return state
+
+    def set_initial_state(self, state: dict) -> None:
+        """Starts the storages from a state returned by get_final_state, e.g.
+        the end of the previous window of a rolling optimization
+        """
+        assets = dict(self.iter_assets())
+        for key, value in state.items():
+            asset = assets[key]
+            if value is None:
+                continue
+            if isinstance(asset, Storage):
+                asset.state_of_charge_initial_k = np.array(
+                    asset.state_of_charge_initial_k, dtype=float
+                )
+                asset.state_of_charge_initial_k[0] = value
+            elif isinstance(asset, HeatStorage):
+                asset.temperature_init = value
+
+    def optimize(
+        self,
+        elastic: bool = False,
+        warm_start: dict = None,
+        heuristic: bool = False,
+        approximate: bool = False,
+        model_cache: ModelCache = None,
+    ) -> None:
         """Optimize the electricity import/export values of the enduser,
         w.r.t. the loss function given by the grid, using the previously
         defined flexible assets
+
+        When config.resolution_schedule is set, the inputs are aggregated to
+        the coarse steps of the schedule before optimizing, and the results are
+        spread back over the delta_t steps of the horizon.
+
+        When config.precheck is set, the inputs are screened first: if they
+        are infeasible, status is set to "Infeasible", the problems found are
+        stored in infeasibilities and the solver is not called.
+
+        Args:
+            elastic (bool): when true, the power balance, the storage SoC
+                targets, the heat storage temperature bounds and targets and
+                the consumer deficit limits can be violated at a cost of
+                config.elastic_penalty per unit. An infeasible problem then
+                still gets a schedule, and the violated constraints are listed
+                in relaxations, with their timesteps and amounts. The loss
+                excludes the penalty. The precheck is skipped.
+            warm_start (dict[str, float]): initial values of the variables by
+                name, e.g. the solution of a similar enduser, passed to the
+                solver as a starting point
+            heuristic (bool): when true, the enduser is dispatched by rules
+                instead of the solver (see dispatch.HeuristicDispatch), with
+                status "Heuristic". The precheck is skipped.
+            approximate (bool): when true, the on/off schedules of the heat
+                producers are rounded from the LP relaxation and repaired
+                (see repair.repair_running), then fixed for the solver, which
+                only optimizes the continuous dispatch: faster for heatnodes
+                with several producers, at the cost of a small gap to the
+                optimum (reported with config.cross_check)
+            model_cache (ModelCache): compiled models used instead of
+                config.model_cache, e.g. by the threads of a ScenarioSweep
+        """
+        self.infeasibilities = []
+        self.relaxations = []
+        self.cross_check = {}
+        if config.precheck and not elastic and not heuristic:
+            self.infeasibilities = check_feasibility(self)
+            if self.infeasibilities:
+                self.status = "Infeasible"
+                print("Status: Infeasible (precheck)")
+                print(format_report(self.infeasibilities))
+                return
+
+        bounds = config.get_step_bounds()
+        if len(bounds) == config.horizon + 1:
+            self._solve(
+                config.horizon,
+                config.get_delta_t_k(),
+                elastic,
+                warm_start,
+                heuristic,
+                approximate,
+                model_cache,
+            )
+            return
+
+        coarse = aggregate_enduser(self, bounds)
+        coarse._solve(
+            len(bounds) - 1,
+            config.get_delta_t_k(),
+            elastic,
+            warm_start,
+            heuristic,
+            approximate,
+            model_cache,
+        )
+        expand_results(coarse, self, bounds)
+        self.coefficient_ranges = coarse.coefficient_ranges
+        self.solution = coarse.solution
+        self.cross_check = coarse.cross_check
+        self.relaxations = [
+            dict(relaxation, k=bounds[relaxation["k"]])
+            for relaxation in coarse.relaxations
+        ]
+
+    def _solve(
+        self,
+        horizon: int,
+        delta_t_k: np.ndarray,
+        elastic: bool,
+        warm_start: dict,
+        heuristic: bool,
+        approximate: bool = False,
+        model_cache: ModelCache = None,
+    ) -> None:
+        """Dispatches the enduser over horizon steps with the rules of
+        HeuristicDispatch if heuristic, else with StorageDP or NetworkFlow if
+        enabled in config and the enduser has their structure, else with the
+        solver (also when they find no feasible schedule), with repaired heat
+        producer schedules if approximate
+        """
+        if heuristic:
+            HeuristicDispatch(self, delta_t_k).run()
+            return
+        engine = None if elastic else self._solve_structured(delta_t_k)
+        if engine is None and approximate and self.heatnodes:
+            self._approximate(horizon, delta_t_k, elastic, warm_start, model_cache)
+            engine = "relax and repair"
+        elif engine is None:
+            self._optimize(
+                horizon, delta_t_k, elastic, warm_start, model_cache=model_cache
+            )
+            return
+        else:
+            print(f"Status: {self.status} ({engine})")
+            print(f"Total value of the Cost function = {round(self.loss, 2)}")
+        if config.cross_check:
+            self._cross_check(horizon, delta_t_k)
+
+    def _solve_structured(self, delta_t_k: np.ndarray) -> str:
+        """Solves the enduser with the specialized engine that applies,
+        returns its name, or None if the solver is needed: the exact network
+        flow, else the dynamic program (optimal up to its state of charge
+        grid) when the network flow is disabled. When the network flow fails,
+        the exact solver is used rather than the dynamic program. The engines
+        run on one core of config.resources.
         """
-        m = pl.LpProblem("MPC", pl.LpMinimize)
+        if config.network_flow and is_network(self):
+            name, engine = "network flow", NetworkFlow(self, delta_t_k)
+        elif config.dynamic_programming and is_single_storage(self):
+            name, engine = "dynamic programming", StorageDP(self, delta_t_k)
+        else:
+            return None
+        with config.resources.acquire():
+            return name if engine.run() else None
+
+    def _approximate(
+        self,
+        horizon: int,
+        delta_t_k: np.ndarray,
+        elastic: bool,
+        warm_start: dict,
+        model_cache: ModelCache = None,
+    ) -> None:
+        """Solves the LP relaxation of the problem, rounds and repairs the
+        on/off schedules of the heat producers, and solves the problem with
+        these schedules fixed. The exact problem is solved if the relaxation
+        or the fixed problem is not optimal.
+        """
+        model = Model(
+            self,
+            horizon,
+            delta_t_k,
+            elastic,
+            symmetry=config.symmetry_breaking,
+            name="Relaxation",
+        )
+        for variable in model.problem.variables():
+            if variable.cat == pl.LpInteger:
+                variable.cat = pl.LpContinuous
+        solve_problem(model.problem, warm_start)
+
+        optimal = model.problem.status == pl.LpStatusOptimal
+        fixed = {}
+        if optimal:
+            for i, heatnode in enumerate(model.enduser.heatnodes):
+                running = round_running(
+                    [
+                        [variable.varValue or 0.0 for variable in producer.running_k]
+                        for producer in heatnode.heatproducers
+                    ]
+                ).reshape(len(heatnode.heatproducers), horizon)
+                running = repair_running(
+                    heatnode, running, delta_t_k, float(self.flexibility)
+                )
+                starting = get_starting(running)
+                for j in range(len(heatnode.heatproducers)):
+                    key = f"heatnodes[{i}].heatproducers[{j}]"
+                    fixed[f"{key}.running_k"] = running[j]
+                    fixed[f"{key}.starting_k"] = starting[j]
+        # the relaxation is released before the next problem is built
+        del model
+        if optimal:
+            self._optimize(horizon, delta_t_k, elastic, warm_start, fixed)
+        if not optimal or self.status != "Optimal":
+            print("Repaired schedules infeasible, solving the exact problem")
+            self._optimize(
+                horizon, delta_t_k, elastic, warm_start, model_cache=model_cache
+            )
+
+    def _cross_check(self, horizon: int, delta_t_k: np.ndarray) -> None:
+        """Solves a copy of the enduser with the exact solver and compares
+        its loss with the loss of the specialized engine or approximation
+        """
+        reference = copy.deepcopy(self)
+        reference._optimize(horizon, delta_t_k)
+        loss_solver = reference.loss if reference.status == "Optimal" else np.nan
+        self.cross_check = {
+            "loss": self.loss,
+            "loss_solver": loss_solver,
+            "gap": (self.loss - loss_solver) / max(abs(loss_solver), 1e-9),
+        }
+        print(
+            f"Cross check: loss {round(self.loss, 2)}, solver "
+            f"{round(loss_solver, 2)}, gap {self.cross_check['gap']:.2%}"
+        )
+
+    def _optimize(
+        self,
+        horizon: int,
+        delta_t_k: np.ndarray,
+        elastic: bool = False,
+        warm_start: dict = None,
+        fixed: dict = None,
+        model_cache: ModelCache = None,
+    ) -> None:
+        """Builds and solves the optimization problem over horizon steps,
+        step k lasting delta_t_k[k] hours, with slack variables if elastic and
+        starting from the variable values of warm_start. fixed maps
+        "<asset key>.<result attribute>" (e.g. "grid.power_import_k") to the
+        values its first steps are fixed to.
+
+        With config.lazy_exclusivity, the grid exclusivity binaries are only
+        added for the steps where the solution without them imports and
+        exports at once (or exports while discharging, see
+        Grid.discharge_to_grid), solving again until there is none.
+
+        With model_cache, else config.model_cache, the compiled model of the
+        structure of the enduser is filled with its inputs and solved instead
+        (not elastic, without fixed values or lazy exclusivity).
+        """
+        if model_cache is None:
+            model_cache = config.model_cache
+        if (
+            model_cache is not None
+            and not elastic
+            and not fixed
+            and not config.lazy_exclusivity
+            and model_cache.solve(
+                self, horizon, delta_t_k, config.symmetry_breaking, warm_start
+            )
+        ):
+            return
+        exclusive = np.zeros(horizon, dtype=bool) if config.lazy_exclusivity else None
+        while True:
+            model = Model(
+                self,
+                horizon,
+                delta_t_k,
+                elastic,
+                exclusive,
+                # fixed values may not follow the order of the assets
+                config.symmetry_breaking and not fixed,
+            )
+            for key, values in (fixed or {}).items():
+                for variable, value in zip(model.get_variables(key), values):
+                    variable.lowBound = variable.upBound = value
+
+            ranges = solve_problem(model.problem, warm_start)
+            if exclusive is None or model.problem.status != pl.LpStatusOptimal:
+                break
+            violated = self._get_exclusivity_violations(model, horizon) & ~exclusive
+            if not violated.any():
+                break
+            print(f"Exclusivity added for {violated.sum()} steps")
+            exclusive |= violated
+            warm_start = model.get_solution()
+
+        if ranges:
+            self.coefficient_ranges = ranges
+
+        self.status = pl.LpStatus[model.problem.status]
+        print("Status: " + self.status)
+        if pl.value(model.problem.objective) is None:
+            # no solution, e.g. none found by a portfolio within its deadline
+            print("Cost function cannot be evaluated, probably None")
+            self.solution = {}
+            return
+        print(
+            "Total value of the Cost function = "
+            f"{round(pl.value(model.problem.objective), 2)}"
+        )
+
+        results = model.get_results()
+        self.solution = model.get_solution()
+        self.relaxations = model.slacks.get_relaxations()
+        # the problem is released before the results are used
+        del model
+        self._set_results(results)
+        if self.relaxations:
+            print("Relaxed constraints:")
+            print(format_relaxations(self.relaxations))
+
+    def _get_exclusivity_violations(self, model: Model, horizon: int) -> np.ndarray:
+        """Returns the steps of the solved model importing and exporting at
+        once, or exporting while discharging if Grid.discharge_to_grid is
+        false
+        """
+
+        def values(variables) -> np.ndarray:
+            return np.array(
+                [variables[k].varValue or 0.0 for k in range(horizon)], dtype=float
+            )
+
+        grid = model.enduser.grid
+        exporting = values(grid.power_export_k) > TOLERANCE
+        violated = exporting & (values(grid.power_import_k) > TOLERANCE)
+        if not grid.discharge_to_grid:
+            discharging = sum(
+                (
+                    values(storage.power_discharging_k)
+                    for storage in model.enduser.storages
+                ),
+                np.zeros(horizon),
+            )
+            violated |= exporting & (discharging > TOLERANCE)
+        return violated
+
+    def _build(
+        self,
+        horizon: int,
+        delta_t_k: np.ndarray,
+        elastic: bool = False,
+        exclusive: np.ndarray = None,
+        symmetry: bool = False,
+    ) -> tuple[dict, pl.LpAffineExpression, Slacks]:
+        """Creates the variables of the optimization problem on the assets
+        (result attributes, called on a copy of the enduser by model.Model) and
+        returns the constraints by name, the objective without the slack
+        penalty and the slack variables. The grid exclusivity binaries are
+        only created for the steps where exclusive is true (all if None),
+        exporting_to_grid_k is None for the other steps. With symmetry,
+        interchangeable assets are ordered (see
+        symmetry.get_symmetry_constraints).
+        """
+        if exclusive is None:
+            exclusive = np.ones(horizon, dtype=bool)
         constraints = {}
+        slacks = Slacks(elastic, config.elastic_penalty)
 
         # Consumers
         for i, consumer in enumerate(self.consumers):
@@ -134,12 +603,31 @@ class EndUser:
                 pl.LpVariable(
                     cat="Continuous",
                     lowBound=0,
-                    upBound=consumer.energy_deficit_max_k[k] * self.flexibility,
+                    upBound=(
+                        None
+                        if elastic
+                        else consumer.energy_deficit_max_k[k] * self.flexibility
+                    ),
                     name=f"energy_deficit_k[{i}]{k}",
                 )
-                for k in range(config.horizon)
+                for k in range(horizon)
             ]
 
+            if elastic:
+                constraints.update(
+                    {
+                        f"energy_deficit_max[{i}]{k}": pl.LpConstraint(
+                            e=(
+                                consumer.energy_deficit_k[k]
+                                - slacks.add("energy_deficit_max", f"consumers[{i}]", k)
+                            ),
+                            sense=pl.LpConstraintLE,
+                            rhs=consumer.energy_deficit_max_k[k] * self.flexibility,
+                        )
+                        for k in range(horizon)
+                    }
+                )
+
             consumer.power_actual_k = [
                 pl.LpVariable(
                     cat="Continuous",
@@ -147,7 +635,7 @@ class EndUser:
                     upBound=consumer.available_k[k] * consumer.power_max,
                     name=f"power_actual_k[{i}]{k}",
                 )
-                for k in range(config.horizon)
+                for k in range(horizon)
             ]
 
             constraints.update(
@@ -156,7 +644,7 @@ class EndUser:
                         e=(
                             consumer.energy_deficit_k[0]
                             - (consumer.power_desired_k[0] - consumer.power_actual_k[0])
-                            * config.delta_t
+                            * delta_t_k[0]
                         ),
                         sense=pl.LpConstraintEQ,
                         rhs=0,
@@ -171,19 +659,21 @@ class EndUser:
                             consumer.energy_deficit_k[k]
                             - consumer.energy_deficit_k[k - 1]
                             - (consumer.power_desired_k[k] - consumer.power_actual_k[k])
-                            * config.delta_t
+                            * delta_t_k[k]
                         ),
                         sense=pl.LpConstraintEQ,
                         rhs=0,
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 }
             )
 
         # Storages
         for i, storage in enumerate(self.storages):
+            storage.event_connect_k = np.zeros(horizon, dtype=int)
+            storage.event_disconnect_k = np.zeros(horizon, dtype=int)
             storage.event_connect_k[0] = storage.available_k[0]  # start of window
-            for k in range(1, config.horizon):
+            for k in range(1, horizon):
                 storage.event_connect_k[k] = (
                     storage.available_k[k] - storage.available_k[k - 1]
                 ) == 1
@@ -202,7 +692,7 @@ class EndUser:
                     * storage.state_of_charge_max,
                     name=f"storage_energy_k[{i}]{k}",
                 )
-                for k in range(config.horizon)
+                for k in range(horizon)
             ]
 
             storage.power_charging_k = [
@@ -214,7 +704,7 @@ class EndUser:
                     * self.flexibility,
                     name=f"storage_power_charging_k[{i}]{k}",
                 )
-                for k in range(config.horizon)
+                for k in range(horizon)
             ]
 
             storage.power_discharging_k = [
@@ -226,10 +716,10 @@ class EndUser:
                     * self.flexibility,
                     name=f"storage_power_discharging_k[{i}]{k}",
                 )
-                for k in range(config.horizon)
+                for k in range(horizon)
             ]
 
-            for k in range(config.horizon):
+            for k in range(horizon):
                 if storage.available_k[k]:
                     if storage.event_connect_k[
                         k
@@ -248,7 +738,7 @@ class EndUser:
                                             / storage.efficiency_discharging
                                             * storage.power_discharging_k[k]
                                         )
-                                        * config.delta_t
+                                        * delta_t_k[k]
                                     ),
                                     sense=pl.LpConstraintEQ,
                                     rhs=0,
@@ -269,7 +759,7 @@ class EndUser:
                                             / storage.efficiency_discharging
                                             * storage.power_discharging_k[k]
                                         )
-                                        * config.delta_t
+                                        * delta_t_k[k]
                                     ),
                                     sense=pl.LpConstraintEQ,
                                     rhs=0,
@@ -277,7 +767,7 @@ class EndUser:
                             }
                         )
                     if (
-                        storage.event_disconnect_k[k] or k == config.horizon - 1
+                        storage.event_disconnect_k[k] or k == horizon - 1
                     ):  # final SoC constraint
                         constraints.update(
                             {
@@ -286,6 +776,11 @@ class EndUser:
                                         -storage.energy_k[k]
                                         + storage.energy_capacity
                                         * storage.state_of_charge_final_k[k]
+                                        + slacks.add_pair(
+                                            "state_of_charge_final",
+                                            f"storages[{i}]",
+                                            k,
+                                        )
                                     ),
                                     sense=pl.LpConstraintEQ,
                                     rhs=0,
@@ -301,7 +796,7 @@ class EndUser:
                     upBound=producer.power_curtailment_factor_max,
                     name=f"producer_curtailment_factor_k[{i}]{k}",
                 )
-                for k in range(config.horizon)
+                for k in range(horizon)
             ]
 
         for i, heatnode in enumerate(self.heatnodes):
@@ -312,7 +807,7 @@ class EndUser:
                         lowBound=0,
                         name=f"power_k-heatnode[{i}]-producer[{j}]{k}",
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 ]
 
                 heatproducer.running_k = [
@@ -320,7 +815,7 @@ class EndUser:
                         cat="Binary",
                         name=f"running_k-heatnode[{i}]-producer[{j}]{k}",
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 ]
 
                 heatproducer.starting_k = [
@@ -328,7 +823,7 @@ class EndUser:
                         cat="Binary",
                         name=f"starting_k-heatnode[{i}]-producer[{j}]{k}",
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 ]
 
                 constraints.update(
@@ -346,7 +841,7 @@ class EndUser:
                             sense=pl.LpConstraintGE,
                             rhs=0,
                         )
-                        for k in range(config.horizon)
+                        for k in range(horizon)
                     }
                 )
 
@@ -362,7 +857,7 @@ class EndUser:
                             sense=pl.LpConstraintLE,
                             rhs=0,
                         )
-                        for k in range(config.horizon)
+                        for k in range(horizon)
                     }
                 )
 
@@ -378,7 +873,7 @@ class EndUser:
                             sense=pl.LpConstraintLE,
                             rhs=0,
                         )
-                        for k in range(config.horizon)
+                        for k in range(horizon)
                     }
                 )
 
@@ -399,7 +894,7 @@ class EndUser:
                             sense=pl.LpConstraintGE,
                             rhs=0,
                         )
-                        for k in range(1, config.horizon)
+                        for k in range(1, horizon)
                     }
                 )
 
@@ -413,7 +908,7 @@ class EndUser:
                             sense=pl.LpConstraintLE,
                             rhs=1,
                         )
-                        for k in range(1, config.horizon)
+                        for k in range(1, horizon)
                     }
                 )
 
@@ -428,7 +923,7 @@ class EndUser:
                             sense=pl.LpConstraintLE,
                             rhs=0,
                         )
-                        for k in range(1, config.horizon)
+                        for k in range(1, horizon)
                     }
                 )
 
@@ -436,19 +931,43 @@ class EndUser:
                 heatstorage.temperature_k = [
                     pl.LpVariable(
                         cat="Continuous",
-                        lowBound=heatstorage.temperature_min,
-                        upBound=heatstorage.temperature_max,
+                        lowBound=None if elastic else heatstorage.temperature_min,
+                        upBound=None if elastic else heatstorage.temperature_max,
                         name=f"temperature_k-heatnode[{i}]-storage[{j}]{k}",
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 ]
 
+                if elastic:
+                    asset = f"heatnodes[{i}].heatstorages[{j}]"
+                    for k in range(horizon):
+                        constraints[
+                            f"temperature_max-heatnode[{i}]-storage[{j}]{k}"
+                        ] = pl.LpConstraint(
+                            e=(
+                                heatstorage.temperature_k[k]
+                                - slacks.add("temperature_max", asset, k)
+                            ),
+                            sense=pl.LpConstraintLE,
+                            rhs=heatstorage.temperature_max,
+                        )
+                        constraints[
+                            f"temperature_min-heatnode[{i}]-storage[{j}]{k}"
+                        ] = pl.LpConstraint(
+                            e=(
+                                heatstorage.temperature_k[k]
+                                + slacks.add("temperature_min", asset, k)
+                            ),
+                            sense=pl.LpConstraintGE,
+                            rhs=heatstorage.temperature_min,
+                        )
+
                 heatstorage.energy_in_k = [
                     pl.LpVariable(
                         cat="Continuous",
                         name=f"energy_in_k-heatnode[{i}]-storage[{j}]{k}",
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 ]
 
                 heatstorage.energy_out_k = [
@@ -456,15 +975,20 @@ class EndUser:
                         cat="Continuous",
                         name=f"energy_out_k-heatnode[{i}]-storage[{j}]{k}",
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 ]
 
                 constraints.update(
                     {
                         f"temperature_final-heatnode[{i}]-storage[{j}]": pl.LpConstraint(
                             e=(
-                                -heatstorage.temperature_k[config.horizon - 1]
+                                -heatstorage.temperature_k[horizon - 1]
                                 + heatstorage.temperature_final
+                                + slacks.add_pair(
+                                    "temperature_final",
+                                    f"heatnodes[{i}].heatstorages[{j}]",
+                                    horizon - 1,
+                                )
                             ),
                             sense=pl.LpConstraintEQ,
                             rhs=0,
@@ -484,7 +1008,7 @@ class EndUser:
                                         * heatproducer.power_max
                                     )
                                     * heatproducer.efficiency
-                                    * config.delta_t
+                                    * delta_t_k[k]
                                     for heatproducer in heatnode.heatproducers
                                 )
                                 + pl.lpSum(
@@ -495,7 +1019,7 @@ class EndUser:
                             sense=pl.LpConstraintEQ,
                             rhs=0,
                         )
-                        for k in range(config.horizon)
+                        for k in range(horizon)
                     }
                 )
 
@@ -512,7 +1036,10 @@ class EndUser:
                                 * (heatstorage.density * heatstorage.specific_heat)
                                 + heatstorage.energy_in_k[0]
                                 - heatstorage.energy_out_k[0]
-                                - heatstorage.loss_factor * heatstorage.temperature_k[0]
+                                - heatstorage.loss_factor
+                                * delta_t_k[0]
+                                / config.delta_t
+                                * heatstorage.temperature_k[0]
                             ),
                             sense=pl.LpConstraintEQ,
                             rhs=0,
@@ -533,12 +1060,15 @@ class EndUser:
                                 * (heatstorage.density * heatstorage.specific_heat)
                                 + heatstorage.energy_in_k[k]
                                 - heatstorage.energy_out_k[k]
-                                - heatstorage.loss_factor * heatstorage.temperature_k[k]
+                                - heatstorage.loss_factor
+                                * delta_t_k[k]
+                                / config.delta_t
+                                * heatstorage.temperature_k[k]
                             ),
                             sense=pl.LpConstraintEQ,
                             rhs=0,
                         )
-                        for k in range(1, config.horizon)
+                        for k in range(1, horizon)
                     }
                 )
 
@@ -547,7 +1077,7 @@ class EndUser:
                     f"energy_out_k-heatnode[{i}]{k}": pl.LpConstraint(
                         e=(
                             -pl.lpSum(
-                                heatconsumer.power_actual_k[k] * config.delta_t
+                                heatconsumer.power_actual_k[k] * delta_t_k[k]
                                 for heatconsumer in heatnode.heatconsumers
                             )
                             + pl.lpSum(
@@ -558,7 +1088,7 @@ class EndUser:
                         sense=pl.LpConstraintEQ,
                         rhs=0,
                     )
-                    for k in range(config.horizon)
+                    for k in range(horizon)
                 }
             )
 
@@ -570,7 +1100,7 @@ class EndUser:
                 upBound=self.grid.power_import_max_k[k],
                 name=f"grid_import_max{k}",
             )
-            for k in range(config.horizon)
+            for k in range(horizon)
         ]
 
         self.grid.power_export_k = [
@@ -580,7 +1110,7 @@ class EndUser:
                 upBound=self.grid.power_export_max_k[k],
                 name=f"grid_export_max{k}",
             )
-            for k in range(config.horizon)
+            for k in range(horizon)
         ]
 
         # Overall constraints
@@ -607,21 +1137,27 @@ class EndUser:
                             * (1 - producer.power_curtailment_factor_k[j])
                             for producer in self.producers
                         )
+                        + slacks.add_pair("power_balance", "enduser", j)
                     ),
                     sense=pl.LpConstraintEQ,
                     rhs=0,
                 )
-                for j in range(config.horizon)
+                for j in range(horizon)
             }
         )
 
         self.grid.exporting_to_grid_k = [
-            pl.LpVariable(
-                cat="Binary",
-                name=f"exporting_to_grid_k{k}",
+            (
+                pl.LpVariable(
+                    cat="Binary",
+                    name=f"exporting_to_grid_k{k}",
+                )
+                if exclusive[k]
+                else None
             )
-            for k in range(config.horizon)
+            for k in range(horizon)
         ]
+        steps = np.flatnonzero(exclusive)
 
         constraints.update(
             {
@@ -634,7 +1170,7 @@ class EndUser:
                     sense=pl.LpConstraintGE,
                     rhs=0,
                 )
-                for k in range(config.horizon)
+                for k in steps
             }
         )
 
@@ -649,7 +1185,7 @@ class EndUser:
                     sense=pl.LpConstraintLE,
                     rhs=0,
                 )
-                for k in range(config.horizon)
+                for k in steps
             }
         )
 
@@ -672,114 +1208,65 @@ class EndUser:
                         sense=pl.LpConstraintLE,
                         rhs=0,
                     )
-                    for k in range(config.horizon)
+                    for k in steps
                 }
             )
 
+        if symmetry:
+            constraints.update(get_symmetry_constraints(self, horizon))
+
+        # losses are defined per delta_t step, longer steps weigh accordingly
         objective = pl.lpSum(
-            self.grid.losses[self.grid.loss_f](self.grid, k)
-            for k in range(config.horizon)
+            delta_t_k[k]
+            / config.delta_t
+            * self.grid.losses[self.grid.loss_f](self.grid, k)
+            for k in range(horizon)
         )
 
-        m.constraints = constraints
-        m.objective = objective
-
-        m.solve(pl.PULP_CBC_CMD(msg=0))
+        return constraints, objective, slacks
 
-        print("Status: " + pl.LpStatus[m.status])
-        self.status = pl.LpStatus[m.status]
-        if pl.value(m.objective) is None:
-            print("Cost function cannot be evaluated, probably None")
-        else:
-            print(
-                f"Total value of the Cost function = {round(pl.value(m.objective), 2)}"
-            )
-
-        for i, consumer in enumerate(self.consumers):
-            consumer.energy_deficit_k = np.array(
-                [consumer.energy_deficit_k[k].varValue for k in range(config.horizon)],
-                dtype=float,
-            )
-            consumer.power_actual_k = np.array(
-                [consumer.power_actual_k[k].varValue for k in range(config.horizon)],
-                dtype=float,
-            )
+    def _set_results(self, results: Results) -> None:
+        """Sets the result attributes of the assets, the loss and the status
+        from the results of an optimization
+        """
+        results.apply(self)
+        self._results = results
+        self.loss = results.loss
+        self.status = results.status
+        self.include_results = True
 
-        for i, storage in enumerate(self.storages):
-            storage.energy_k = np.array(
-                [storage.energy_k[k].varValue for k in range(config.horizon)],
-                dtype=float,
-            )
-            storage.power_charging_k = np.array(
-                [storage.power_charging_k[k].varValue for k in range(config.horizon)],
-                dtype=float,
-            )
-            storage.power_discharging_k = np.array(
-                [
-                    storage.power_discharging_k[k].varValue
-                    for k in range(config.horizon)
-                ],
-                dtype=float,
-            )
 
-        for i, producer in enumerate(self.producers):
-            producer.power_curtailment_factor_k = np.array(
-                [
-                    producer.power_curtailment_factor_k[k].varValue
-                    for k in range(config.horizon)
-                ],
-                dtype=float,
+def solve_problem(problem: pl.LpProblem, warm_start: dict = None) -> dict:
+    """Solves a problem with CBC, or with the solvers of config.portfolio,
+    scaled when config.scaling is set
+
+    Args:
+        problem (pl.LpProblem): problem to solve, its variables get their values
+        warm_start (dict[str, float]): initial values of the variables by name
+
+    Returns:
+        dict: coefficient ranges "before" and "after" scaling (see
+            scaling.get_coefficient_ranges), empty when not scaled
+    """
+    if warm_start:
+        # values outside the bounds of the variable are skipped
+        for variable in problem.variables():
+            if warm_start.get(variable.name) is not None:
+                variable.setInitialValue(warm_start[variable.name], check=False)
+
+    scaling = Scaling(problem)
+    if config.scaling:
+        scaling.scale()
+    if config.portfolio is not None:
+        config.portfolio.solve(problem)
+    else:
+        resources = config.resources
+        integers = sum(variable.cat == pl.LpInteger for variable in problem.variables())
+        with resources.acquire(resources.get_threads(integers)) as threads:
+            problem.solve(
+                pl.PULP_CBC_CMD(msg=0, warmStart=bool(warm_start), threads=threads)
             )
-
-        for i, heatnode in enumerate(self.heatnodes):
-            for j, heatproducer in enumerate(heatnode.heatproducers):
-                heatproducer.starting_k = np.array(
-                    [
-                        heatproducer.starting_k[k].varValue
-                        for k in range(config.horizon)
-                    ],
-                    dtype=int,
-                )
-                heatproducer.running_k = np.array(
-                    [heatproducer.running_k[k].varValue for k in range(config.horizon)],
-                    dtype=int,
-                )
-                heatproducer.power_k = np.array(
-                    [heatproducer.power_k[k].varValue for k in range(config.horizon)],
-                    dtype=float,
-                )
-
-            for j, heatstorage in enumerate(heatnode.heatstorages):
-                heatstorage.temperature_k = np.array(
-                    [
-                        heatstorage.temperature_k[k].varValue
-                        for k in range(config.horizon)
-                    ],
-                    dtype=float,
-                )
-                heatstorage.energy_in_k = np.array(
-                    [
-                        heatstorage.energy_in_k[k].varValue
-                        for k in range(config.horizon)
-                    ],
-                    dtype=float,
-                )
-                heatstorage.energy_out_k = np.array(
-                    [
-                        heatstorage.energy_out_k[k].varValue
-                        for k in range(config.horizon)
-                    ],
-                    dtype=float,
-                )
-
-        self.grid.power_import_k = np.array(
-            [self.grid.power_import_k[k].varValue for k in range(config.horizon)],
-            dtype=float,
-        )
-        self.grid.power_export_k = np.array(
-            [self.grid.power_export_k[k].varValue for k in range(config.horizon)],
-            dtype=float,
-        )
-
-        self.loss = pl.value(m.objective)
-        self.include_results = True
+    if not config.scaling:
+        return {}
+    scaling.unscale()
+    return {"before": scaling.ranges_before, "after": scaling.ranges_after}
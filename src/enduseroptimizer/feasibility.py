@@ -0,0 +1,347 @@
+import numpy as np
+
+from enduseroptimizer import config
+
+TOLERANCE = 1e-6
+
+
+def check_feasibility(enduser, delta_t_k: np.ndarray = None) -> list[dict]:
+    """Screens the inputs of an enduser for infeasibilities before solving.
+    Only necessary conditions of the optimization problem are checked, on
+    bounds computed for all timesteps at once: an enduser passing the checks
+    may still be infeasible, but an enduser failing them is.
+
+    Checks:
+        consumer_bounds: must-serve power of a consumer (power_min, or desired
+            power minus the allowed deficit) above its maximum power
+        power_supply: maximum supply (import, production, storage discharge)
+            below the must-serve demand (consumers, heat demand served by the
+            heat producers at their best efficiency) at a timestep
+        power_excess: production that cannot be curtailed above the maximum
+            demand (export, consumers, heat producers, storage charge)
+        energy_supply: same as power_supply, summed over intervals of
+            timesteps where storages can supply at most their usable energy
+            (plus the energy they reconnect with), consumers can shift at most
+            their deficit limit and heat storages can buffer at most their
+            capacity
+        heat_supply: heat demand of a heatnode above the heat its producers
+            and storages can provide, over intervals of timesteps
+        state_of_charge: storage state of charge target outside the storage
+            bounds, or not reachable from the initial state with the maximum
+            charging / discharging power
+        temperature_final: heat storage final temperature outside its bounds
+
+    Args:
+        enduser (EndUser): enduser to check
+        delta_t_k (array[float]): length of each step [h], defaults to
+            config.delta_t for every step of config.horizon
+
+    Returns:
+        list[dict]: one entry per failed check and asset, with "asset" (key of
+            EndUser.iter_assets, or "enduser"), "check", "k" (array of the
+            offending timesteps) and "message"
+    """
+    if delta_t_k is None:
+        delta_t_k = np.full(config.horizon, config.delta_t)
+    delta_t_k = np.asarray(delta_t_k, dtype=float)
+    horizon = len(delta_t_k)
+    flexibility = float(enduser.flexibility)
+    problems: list[dict] = []
+
+    def report(asset: str, check: str, mask: np.ndarray, message: str) -> None:
+        _report(problems, asset, check, np.flatnonzero(mask), message)
+
+    def array(values) -> np.ndarray:
+        return np.broadcast_to(np.asarray(values, dtype=float), (horizon,))
+
+    # electrical bounds [kW]
+    grid = enduser.grid
+    supply_max = array(grid.power_import_max_k).copy()
+    supply_min = np.zeros(horizon)
+    demand_max = array(grid.power_export_max_k).copy()
+    must_serve = np.zeros(horizon)  # per timestep [kW]
+    desired = np.zeros(horizon)  # shiftable demand [kW]
+    deficit_max = np.zeros(horizon)  # sum of the deficit limits [kWh]
+    # energy the storages can supply over [a, b]: stored_end[b] - stored_start[a]
+    stored_end = np.zeros(horizon)
+    stored_start = np.zeros(horizon)
+
+    for i, producer in enumerate(enduser.producers):
+        power = array(producer.power_actual_k)
+        curtailed = power * (1 - producer.power_curtailment_factor_max)
+        supply_max += np.maximum(power, curtailed)
+        supply_min += np.minimum(power, curtailed)
+
+    energy_max = supply_max.copy()  # supply without storages [kW]
+    for i, storage in enumerate(enduser.storages):
+        available = array(storage.available_k)
+        supply_max += available * storage.power_discharge_max * flexibility
+        demand_max += available * storage.power_charge_max * flexibility
+
+        # each connection starts at most full and ends at least empty, the
+        # charging / discharging losses only reduce the energy supplied
+        connected = np.cumsum(
+            (available > 0) & ~np.concatenate(([False], available[:-1] > 0))
+        )
+        usable = (
+            flexibility
+            * storage.efficiency_discharging
+            * storage.energy_capacity
+            * (
+                max(
+                    storage.state_of_charge_max,
+                    np.max(storage.state_of_charge_initial_k, initial=0.0),
+                )
+                - storage.state_of_charge_min
+            )
+        )
+        if connected[-1]:
+            stored_end += usable * (1 + connected)
+            stored_start += usable * connected
+        problems.extend(
+            _check_storage(storage, f"storages[{i}]", delta_t_k, flexibility)
+        )
+
+    for i, consumer in enumerate(enduser.consumers):
+        power_max = array(consumer.available_k) * consumer.power_max
+        limit = array(consumer.energy_deficit_max_k) * flexibility
+        lower = np.maximum(
+            consumer.power_min, array(consumer.power_desired_k) - limit / delta_t_k
+        )
+        report(
+            f"consumers[{i}]",
+            "consumer_bounds",
+            lower > power_max + TOLERANCE,
+            "must-serve power above maximum power",
+        )
+        demand_max += power_max
+        must_serve += lower
+        desired += array(consumer.power_desired_k)
+        deficit_max += limit
+
+    heat_energy = np.zeros(horizon)  # electricity for the heat demand [kWh]
+    heat_buffer = 0.0  # electricity saved by the heat storages [kWh]
+    for i, heatnode in enumerate(enduser.heatnodes):
+        for heatproducer in heatnode.heatproducers:
+            demand_max += heatproducer.power_max * (1 + heatproducer.power_loss_startup)
+        heat = _check_heatnode(heatnode, f"heatnodes[{i}]", delta_t_k, flexibility)
+        problems.extend(heat["problems"])
+        if heat["efficiency"] > 0:
+            heat_energy += heat["needed"] / heat["efficiency"]
+            heat_buffer += heat["capacity"] / heat["efficiency"]
+
+    heat_power = np.maximum(heat_energy - heat_buffer, 0) / delta_t_k
+    report(
+        "enduser",
+        "power_supply",
+        supply_max + TOLERANCE < must_serve + heat_power,
+        "maximum supply below must-serve demand",
+    )
+    report(
+        "enduser",
+        "power_excess",
+        supply_min > demand_max + TOLERANCE,
+        "production that cannot be curtailed above maximum demand",
+    )
+
+    # over any interval [a, b], the consumers can shift at most their deficit
+    # limit at b and the heat storages at most their capacity
+    headroom = (energy_max - desired) * delta_t_k - heat_energy
+    violated = _violated_intervals(
+        headroom, stored_end + deficit_max + heat_buffer, stored_start
+    )
+    report(
+        "enduser",
+        "energy_supply",
+        violated,
+        "maximum supply below the demand to serve up to this timestep",
+    )
+
+    return problems
+
+
+def format_report(problems: list[dict]) -> str:
+    """Returns the problems found by check_feasibility, one per line"""
+    return "\n".join(
+        f"{problem['asset']}: {problem['check']}: {problem['message']}"
+        for problem in problems
+    )
+
+
+def _violated_intervals(
+    headroom: np.ndarray, credit_end, credit_start=0.0
+) -> np.ndarray:
+    """Returns True at each timestep b for which an interval [a, b] exists
+    whose summed headroom, plus its credit credit_end[b] - credit_start[a], is
+    negative. Evaluated for all intervals at once with a running maximum.
+    """
+    cumulative = np.cumsum(headroom)
+    before = np.concatenate(([0.0], cumulative[:-1])) + credit_start
+    return cumulative + credit_end < np.maximum.accumulate(before) - TOLERANCE
+
+
+def _report(
+    problems: list, asset: str, check: str, k: np.ndarray, message: str
+) -> None:
+    if len(k):
+        problems.append(
+            {
+                "asset": asset,
+                "check": check,
+                "k": k,
+                "message": f"{message} at {len(k)} timestep(s), first k={k[0]}",
+            }
+        )
+
+
+def _check_storage(
+    storage, key: str, delta_t_k: np.ndarray, flexibility: float
+) -> list[dict]:
+    """Checks that the final state of charge of the storage is within bounds
+    and reachable from the initial state of charge of its last connection.
+    As in EndUser._build, the final state of charge only applies at the last
+    step of the horizon, when the storage is available.
+    """
+    horizon = len(delta_t_k)
+    available = np.broadcast_to(np.asarray(storage.available_k) > 0, (horizon,))
+    if not available[-1]:
+        return []
+    connected = np.flatnonzero(available & ~np.concatenate(([False], available[:-1])))
+    connected = connected[-1:]
+    disconnected = np.array([horizon - 1])
+
+    # largest energy change of the storage from step 0 up to step k (excluded)
+    charge = np.concatenate(
+        (
+            [0.0],
+            np.cumsum(
+                storage.efficiency_charging * storage.power_charge_max * delta_t_k
+            ),
+        )
+    )
+    discharge = np.concatenate(
+        (
+            [0.0],
+            np.cumsum(
+                storage.power_discharge_max / storage.efficiency_discharging * delta_t_k
+            ),
+        )
+    )
+
+    capacity = storage.energy_capacity
+    initial = (
+        capacity
+        * np.broadcast_to(
+            np.asarray(storage.state_of_charge_initial_k, dtype=float), (horizon,)
+        )[connected]
+    )
+    final = (
+        capacity
+        * np.broadcast_to(
+            np.asarray(storage.state_of_charge_final_k, dtype=float), (horizon,)
+        )[disconnected]
+    )
+    change = final - initial
+    charge = flexibility * (charge[disconnected + 1] - charge[connected])
+    discharge = flexibility * (discharge[disconnected + 1] - discharge[connected])
+
+    bounded = (final >= capacity * storage.state_of_charge_min - TOLERANCE) & (
+        final <= capacity * storage.state_of_charge_max + TOLERANCE
+    )
+    reachable = (change <= charge + TOLERANCE) & (-change <= discharge + TOLERANCE)
+
+    problems = []
+    _report(
+        problems,
+        key,
+        "state_of_charge",
+        disconnected[~bounded],
+        "final state of charge outside bounds",
+    )
+    _report(
+        problems,
+        key,
+        "state_of_charge",
+        disconnected[bounded & ~reachable],
+        "final state of charge not reachable from the initial one",
+    )
+    return problems
+
+
+def _check_heatnode(
+    heatnode, key: str, delta_t_k: np.ndarray, flexibility: float
+) -> dict:
+    """Checks the heat balance of a heatnode
+
+    Returns:
+        dict: "problems", "needed" (heat to produce at each step, demand and
+            minimum storage losses [kWh]), "capacity" (heat the storages can
+            buffer [kWh]) and "efficiency" (best efficiency of the producers)
+    """
+    horizon = len(delta_t_k)
+    demand = np.zeros(horizon)
+    for heatconsumer in heatnode.heatconsumers:
+        demand += np.asarray(heatconsumer.power_actual_k, dtype=float) * delta_t_k
+    produced = delta_t_k * sum(
+        heatproducer.power_max * heatproducer.efficiency
+        for heatproducer in heatnode.heatproducers
+    )
+    efficiency = max(
+        (heatproducer.efficiency for heatproducer in heatnode.heatproducers),
+        default=0.0,
+    )
+
+    problems = []
+    needed = demand.copy()
+    capacity = 0.0
+    final = 0.0  # heat released by the storages from initial to final state
+    for j, heatstorage in enumerate(heatnode.heatstorages):
+        losses = heatstorage.loss_factor * np.array(
+            [heatstorage.temperature_min, heatstorage.temperature_max]
+        )
+        needed += losses.min() * delta_t_k / config.delta_t
+        heat_capacity = (
+            heatstorage.volume
+            * flexibility
+            * heatstorage.density
+            * heatstorage.specific_heat
+        )
+        capacity += heat_capacity * (
+            max(heatstorage.temperature_max, heatstorage.temperature_init)
+            - heatstorage.temperature_min
+        )
+        final += heat_capacity * (
+            heatstorage.temperature_init - heatstorage.temperature_final
+        )
+        if not (
+            heatstorage.temperature_min - TOLERANCE
+            <= heatstorage.temperature_final
+            <= heatstorage.temperature_max + TOLERANCE
+        ):
+            _report(
+                problems,
+                f"{key}.heatstorages[{j}]",
+                "temperature_final",
+                np.array([horizon - 1]),
+                "final temperature outside bounds",
+            )
+
+    if not heatnode.heatstorages:
+        # the heat demand is served through the heat storages only
+        violated = demand > TOLERANCE
+    else:
+        violated = _violated_intervals(produced - needed, capacity)
+        violated[-1] |= np.sum(produced - needed) + final < -TOLERANCE
+    _report(
+        problems,
+        key,
+        "heat_supply",
+        np.flatnonzero(violated),
+        "heat demand above the heat the producers and storages can provide",
+    )
+    return {
+        "problems": problems,
+        "needed": needed,
+        "capacity": capacity,
+        "efficiency": efficiency,
+    }
@@ -2,9 +2,14 @@ import numpy as np
 import numpy.typing as npt
 
 from enduseroptimizer import config
+from enduseroptimizer.encoding import LazyArray, decode_k, defer_k, encode_k
 
 
 class Grid:
+    # result arrays, decoded on first access when read by from_dict
+    power_import_k = LazyArray(dtype=float)
+    power_export_k = LazyArray(dtype=float)
+
     def loss_cost(self, k: int) -> float:
         return (
             self.import_tariff_k[k] * self.power_import_k[k]
@@ -63,32 +68,32 @@ class Grid:
 
         self.loss_f = "minimize_cost"
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
 
         data["discharge_to_grid_b"] = self.discharge_to_grid
-        data["power_import_max_k"] = self.power_import_max_k.tolist()
-        data["power_export_max_k"] = self.power_export_max_k.tolist()
-        data["import_tariff_k"] = self.import_tariff_k.tolist()
-        data["export_tariff_k"] = self.export_tariff_k.tolist()
+        data["power_import_max_k"] = encode_k(self.power_import_max_k, compact)
+        data["power_export_max_k"] = encode_k(self.power_export_max_k, compact)
+        data["import_tariff_k"] = encode_k(self.import_tariff_k, compact)
+        data["export_tariff_k"] = encode_k(self.export_tariff_k, compact)
         data["loss_f_s"] = self.loss_f
 
         if include_results:
-            data["power_import_k"] = self.power_import_k.tolist()
-            data["power_export_k"] = self.power_export_k.tolist()
+            data["power_import_k"] = encode_k(self.power_import_k, compact)
+            data["power_export_k"] = encode_k(self.power_export_k, compact)
             # data['loss_k'] = [self.losses[self.loss_f](self, k) for k in range(len(self.power_import_k))]
 
         return data
 
     def from_dict(self, data: dict, include_results: bool) -> None:
         self.discharge_to_grid = data["discharge_to_grid_b"]
-        self.power_import_max_k = np.asarray(data["power_import_max_k"], dtype=float)
-        self.power_export_max_k = np.asarray(data["power_export_max_k"], dtype=float)
-        self.import_tariff_k = np.asarray(data["import_tariff_k"], dtype=float)
-        self.export_tariff_k = np.asarray(data["export_tariff_k"], dtype=float)
+        self.power_import_max_k = decode_k(data["power_import_max_k"], dtype=float)
+        self.power_export_max_k = decode_k(data["power_export_max_k"], dtype=float)
+        self.import_tariff_k = decode_k(data["import_tariff_k"], dtype=float)
+        self.export_tariff_k = decode_k(data["export_tariff_k"], dtype=float)
         self.loss_f = data["loss_f_s"]
 
         if include_results:
-            self.power_import_k = np.asarray(data["power_import_k"], dtype=float)
-            self.power_export_k = np.asarray(data["power_export_k"], dtype=float)
-            # self.loss_k = np.asarray(data['loss_k'], dtype=float)
+            defer_k(self, "power_import_k", data["power_import_k"])
+            defer_k(self, "power_export_k", data["power_export_k"])
+            # self.loss_k = decode_k(data['loss_k'], dtype=float)
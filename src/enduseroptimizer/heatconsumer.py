@@ -2,6 +2,7 @@ import numpy as np
 import numpy.typing as npt
 
 from enduseroptimizer import config
+from enduseroptimizer.encoding import decode_k, encode_k
 
 
 class HeatConsumer:
@@ -16,11 +17,11 @@ class HeatConsumer:
         self.name: str = name
         self.power_actual_k: npt.NDArray[np.float_] = np.zeros(config.horizon)  # kW
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
-        data["power_actual_k"] = self.power_actual_k.tolist()
+        data["power_actual_k"] = encode_k(self.power_actual_k, compact)
 
         return data
 
     def from_dict(self, data: dict, include_results: bool) -> None:
-        self.power_actual_k = np.asarray(data["power_actual_k"], dtype=float)
+        self.power_actual_k = decode_k(data["power_actual_k"], dtype=float)
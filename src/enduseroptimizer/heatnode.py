@@ -18,19 +18,19 @@ class HeatNode:
         self.heatstorages: list[HeatStorage] = []
         self.heatconsumers: list[HeatConsumer] = []
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
         data["heatproducers_d"] = {}
         for i, heatproducer in enumerate(self.heatproducers):
-            data["heatproducers_d"][i] = heatproducer.to_dict(include_results)
+            data["heatproducers_d"][i] = heatproducer.to_dict(include_results, compact)
 
         data["heatstorages_d"] = {}
         for i, heatstorage in enumerate(self.heatstorages):
-            data["heatstorages_d"][i] = heatstorage.to_dict(include_results)
+            data["heatstorages_d"][i] = heatstorage.to_dict(include_results, compact)
 
         data["heatconsumers_d"] = {}
         for i, heatconsumer in enumerate(self.heatconsumers):
-            data["heatconsumers_d"][i] = heatconsumer.to_dict(include_results)
+            data["heatconsumers_d"][i] = heatconsumer.to_dict(include_results, compact)
 
         return data
 
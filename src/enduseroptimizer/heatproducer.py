@@ -1,7 +1,14 @@
 import numpy as np
 
+from enduseroptimizer.encoding import LazyArray, defer_k, encode_k
+
 
 class HeatProducer:
+    # result arrays, decoded on first access when read by from_dict
+    starting_k = LazyArray(dtype=int)
+    running_k = LazyArray(dtype=int)
+    power_k = LazyArray(dtype=float)
+
     def __init__(self, name: str = "HeatProducer") -> None:
         """Class defining a heat producer
 
@@ -31,7 +38,7 @@ class HeatProducer:
         self.running_k = np.array([])  # 0/1
         self.power_k = np.array([])  # kW
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
         data["efficiency_i"] = self.efficiency
         data["power_max_i"] = self.power_max
@@ -39,9 +46,9 @@ class HeatProducer:
         data["power_loss_startup_i"] = self.power_loss_startup
 
         if include_results:
-            data["starting_k"] = self.starting_k.tolist()
-            data["running_k"] = self.running_k.tolist()
-            data["power_k"] = self.power_k.tolist()
+            data["starting_k"] = encode_k(self.starting_k, compact)
+            data["running_k"] = encode_k(self.running_k, compact)
+            data["power_k"] = encode_k(self.power_k, compact)
 
         return data
 
@@ -52,6 +59,6 @@ class HeatProducer:
         self.power_loss_startup = data["power_loss_startup_i"]
 
         if include_results:
-            self.starting_k = np.asarray(data["starting_k"], dtype=int)
-            self.running_k = np.asarray(data["running_k"], dtype=int)
-            self.power_k = np.asarray(data["power_k"], dtype=float)
+            defer_k(self, "starting_k", data["starting_k"])
+            defer_k(self, "running_k", data["running_k"])
+            defer_k(self, "power_k", data["power_k"])
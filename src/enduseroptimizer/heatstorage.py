@@ -1,7 +1,13 @@
 import numpy as np
 
+from enduseroptimizer.encoding import LazyArray, defer_k, encode_k
+
 
 class HeatStorage:  # TODO - enforce heatproducer/heatstorage mapping (e.g max 1 storage per heatnode)
+    # result arrays, decoded on first access when read by from_dict
+    flow_k = LazyArray(dtype=float)
+    temperature_k = LazyArray(dtype=float)
+
     def __init__(self, name: str = "HeatStorage") -> None:
         """Class defining a heat storage
 
@@ -43,7 +49,7 @@ class HeatStorage:  # TODO - enforce heatproducer/heatstorage mapping (e.g max 1
         self.flow_k = np.array([])  # l/s
         self.temperature_k = np.array([])  # degC
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
         data["temperature_max_i"] = self.temperature_max
         data["temperature_min_i"] = self.temperature_min
@@ -57,8 +63,8 @@ class HeatStorage:  # TODO - enforce heatproducer/heatstorage mapping (e.g max 1
         data["flow_max_i"] = self.flow_max
 
         if include_results:
-            data["flow_k"] = self.flow_k.tolist()
-            data["temperature_k"] = self.temperature_k.tolist()
+            data["flow_k"] = encode_k(self.flow_k, compact)
+            data["temperature_k"] = encode_k(self.temperature_k, compact)
 
         return data
 
@@ -75,5 +81,5 @@ class HeatStorage:  # TODO - enforce heatproducer/heatstorage mapping (e.g max 1
         self.flow_max = data["flow_max_i"]
 
         if include_results:
-            self.flow_k = np.asarray(data["flow_k"], dtype=float)
-            self.temperature_k = np.asarray(data["temperature_k"], dtype=float)
+            defer_k(self, "flow_k", data["flow_k"])
+            defer_k(self, "temperature_k", data["temperature_k"])
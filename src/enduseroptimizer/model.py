@@ -0,0 +1,92 @@
+import copy
+
+import numpy as np
+import pulp as pl
+
+from enduseroptimizer.results import Results
+
+
+class Model:
+    def __init__(
+        self,
+        enduser,
+        horizon: int,
+        delta_t_k: np.ndarray,
+        elastic: bool = False,
+        exclusive: np.ndarray = None,
+        symmetry: bool = False,
+        name: str = "MPC",
+    ) -> None:
+        """Transient optimization problem of an enduser (see EndUser._build).
+        The variables are created on a copy of the structure of the enduser
+        (see copy_structure), in place of the result attributes of its
+        assets, so that the enduser only ever holds its inputs and results:
+        solve the problem, extract the results with get_results and drop the
+        model to release the problem.
+
+        Computed attributes:
+            enduser (EndUser): copy of the structure of the enduser, its
+                assets hold the variables
+            assets (dict): assets of the copy by key (see EndUser.iter_assets)
+            constraints (dict[str, pl.LpConstraint]): constraints by name
+            objective (pl.LpAffineExpression): loss, without the slack penalty
+            slacks (Slacks): slack variables of the elastic constraints
+            problem (pl.LpProblem): problem minimizing the loss, plus the
+                slack penalty if elastic
+        """
+        self.enduser = copy_structure(enduser)
+        self.assets = dict(self.enduser.iter_assets())
+        self.constraints, self.objective, self.slacks = self.enduser._build(
+            horizon, delta_t_k, elastic, exclusive, symmetry
+        )
+        self.problem = pl.LpProblem(name, pl.LpMinimize)
+        self.problem.constraints = self.constraints
+        self.problem.objective = (
+            self.objective + self.slacks.get_penalty() if elastic else self.objective
+        )
+
+    def get_variables(self, key: str) -> list:
+        """Returns the variables of "<asset key>.<result attribute>", e.g.
+        "grid.power_import_k"
+        """
+        name, attribute = key.rsplit(".", 1)
+        return getattr(self.assets[name], attribute)
+
+    def get_results(self) -> Results:
+        """Returns the values of the solved problem as results"""
+        results = Results.from_enduser(self.enduser)
+        results.loss = pl.value(self.objective)
+        results.status = pl.LpStatus[self.problem.status]
+        return results
+
+    def get_solution(self) -> dict[str, float]:
+        """Returns the values of the variables of the solved problem by name"""
+        return {
+            variable.name: variable.varValue for variable in self.problem.variables()
+        }
+
+
+def copy_structure(enduser):
+    """Returns a copy of an enduser and of its assets, sharing their
+    attributes (the input arrays are not copied)
+    """
+    structure = copy.copy(enduser)
+    structure.producers = [_copy_asset(asset) for asset in enduser.producers]
+    structure.storages = [_copy_asset(asset) for asset in enduser.storages]
+    structure.consumers = [_copy_asset(asset) for asset in enduser.consumers]
+    structure.heatnodes = []
+    for heatnode in enduser.heatnodes:
+        heatnode = copy.copy(heatnode)
+        heatnode.heatproducers = [_copy_asset(a) for a in heatnode.heatproducers]
+        heatnode.heatstorages = [_copy_asset(a) for a in heatnode.heatstorages]
+        heatnode.heatconsumers = [_copy_asset(a) for a in heatnode.heatconsumers]
+        structure.heatnodes.append(heatnode)
+    structure.grid = _copy_asset(enduser.grid)
+    return structure
+
+
+def _copy_asset(asset):
+    asset = copy.copy(asset)
+    # results read by from_dict and not decoded yet stay with the original
+    asset.__dict__.pop("_deferred", None)
+    return asset
@@ -0,0 +1,807 @@
+import copy
+import hashlib
+import json
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pulp as pl
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import csr_matrix
+
+from enduseroptimizer import Results, config
+from enduseroptimizer.model import Model
+from enduseroptimizer.results import RESULTS
+from enduseroptimizer.scaling import get_factors
+from enduseroptimizer.symmetry import get_groups
+
+# coefficient arrays of a compiled model, filled from the input profiles
+COEFFICIENTS = [
+    "data",
+    "cost",
+    "cost_constant",
+    "lower",
+    "upper",
+    "row_lower",
+    "row_upper",
+]
+# tolerance of the check of a traced model against a direct build
+TOLERANCE = 1e-9
+
+
+class CompiledModel:
+    def __init__(
+        self,
+        variables: list[str],
+        constraints: list[str],
+        integrality: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+    ) -> None:
+        """Minimization problem in matrix form: the sparsity pattern of its
+        constraint matrix and its variable and constraint index maps, with
+        each coefficient array (see COEFFICIENTS) an affine function of the
+        parameters, the input profiles of an enduser, so that an enduser of
+        the same structure only needs its coefficients filled in (fill()).
+
+        Editable attributes:
+            variables (list[str]): variable names, by column
+            constraints (list[str]): constraint names, by row
+            integrality (np.ndarray[bool]): integer variables
+            rows, cols (np.ndarray[int]): positions of the constraint
+                matrix entries
+            parameters (list[tuple[str, str, int]]): asset key, attribute and
+                length of each input profile, in the order of the parameters
+            maps (dict[str, tuple]): (constant, matrix) of each coefficient
+                array, its values being constant + matrix @ parameters
+            results (dict[str, dict[str, list[int]]]): columns of the result
+                variables of each asset attribute (see EndUser.iter_assets),
+                -1 for steps without variable
+            derived (dict[str, dict[str, list]]): other attributes set by the
+                build (e.g. Storage.event_connect_k), by asset key
+
+        Computed attributes:
+            index (dict[str, int]): column of each variable
+        """
+        self.variables = list(variables)
+        self.constraints = list(constraints)
+        self.integrality = np.asarray(integrality, dtype=bool)
+        self.rows = np.asarray(rows, dtype=int)
+        self.cols = np.asarray(cols, dtype=int)
+        self.parameters: list[tuple[str, str, int]] = []
+        self.maps: dict[str, tuple[np.ndarray, csr_matrix]] = {}
+        self.results: dict[str, dict[str, list[int]]] = {}
+        self.derived: dict[str, dict[str, list]] = {}
+        self.index = {name: n for n, name in enumerate(self.variables)}
+
+    def get_parameters(self, enduser) -> np.ndarray:
+        """Returns the input profiles of an enduser as the parameter vector"""
+        assets = dict(enduser.iter_assets())
+        if not self.parameters:
+            return np.zeros(0)
+        return np.concatenate(
+            [
+                np.asarray(getattr(assets[key], attribute), dtype=float)
+                for key, attribute, _ in self.parameters
+            ]
+        )
+
+    def fill(self, enduser) -> dict[str, np.ndarray]:
+        """Returns the coefficient arrays for the inputs of an enduser of the
+        structure of the model
+        """
+        parameters = self.get_parameters(enduser)
+        return {
+            name: constant + matrix @ parameters
+            for name, (constant, matrix) in self.maps.items()
+        }
+
+    def scale(
+        self, coefficients: dict[str, np.ndarray]
+    ) -> tuple[dict[str, np.ndarray], np.ndarray]:
+        """Returns the coefficients scaled as by scaling.Scaling, and the
+        column factors, the values of the model being the values of the scaled
+        coefficients times the factors
+        """
+        row_factors, column_factors, objective = get_factors(
+            self.rows,
+            self.cols,
+            coefficients["data"],
+            (len(self.constraints), len(self.variables)),
+            ~self.integrality,
+            coefficients["cost"],
+        )
+        scaled = {
+            "data": coefficients["data"]
+            * row_factors[self.rows]
+            * column_factors[self.cols],
+            "cost": coefficients["cost"] * column_factors * objective,
+            "cost_constant": coefficients["cost_constant"] * objective,
+            "lower": coefficients["lower"] / column_factors,
+            "upper": coefficients["upper"] / column_factors,
+            "row_lower": coefficients["row_lower"] * row_factors,
+            "row_upper": coefficients["row_upper"] * row_factors,
+        }
+        return scaled, column_factors
+
+    def solve(
+        self,
+        coefficients: dict[str, np.ndarray],
+        solver: str = "cbc",
+        time_limit: float = None,
+        threads: int = 1,
+        start: np.ndarray = None,
+    ) -> tuple[int, int, np.ndarray]:
+        """Solves the model with the coefficients with CBC (through an MPS
+        file, see get_mps) or HiGHS, starting CBC from the variable values by
+        column start (HiGHS takes no start)
+
+        Returns:
+            tuple[int, int, np.ndarray]: PuLP status and solution status, and
+                the variable values by column (None without solution)
+
+        Raises:
+            ValueError: for an unknown solver
+        """
+        if solver == "cbc":
+            status, sol_status, values = self._solve_cbc(
+                coefficients, time_limit, threads, start
+            )
+        elif solver == "highs":
+            status, sol_status, values = self._solve_highs(coefficients, time_limit)
+        else:
+            raise ValueError(f"Unknown solver '{solver}', expected 'cbc' or 'highs'")
+        if values is not None:
+            values[self.integrality] = np.round(values[self.integrality])
+        return status, sol_status, values
+
+    def _solve_cbc(
+        self,
+        coefficients: dict[str, np.ndarray],
+        time_limit: float,
+        threads: int,
+        start: np.ndarray = None,
+    ) -> tuple[int, int, np.ndarray]:
+        cbc = pl.PULP_CBC_CMD(msg=0)
+        with tempfile.TemporaryDirectory() as directory:
+            mps = Path(directory) / "model.mps"
+            solution = Path(directory) / "model.sol"
+            mps.write_text(self.get_mps(coefficients))
+            args = [cbc.path, str(mps), "-threads", str(threads)]
+            if start is not None:
+                # solution file format of CBC, as written by PuLP for its starts
+                mst = Path(directory) / "model.mst"
+                mst.write_text(
+                    "Stopped on time - objective value 0\n"
+                    + "".join(
+                        f"{j:>7} X{j} {value:>15.12g} {0:>23}\n"
+                        for j, value in enumerate(start)
+                    )
+                )
+                args += ["-mips", str(mst)]
+            if time_limit is not None:
+                args += ["-sec", str(time_limit)]
+            args += ["-branch" if self.integrality.any() else "-initialSolve"]
+            args += ["-printingOptions", "all", "-solution", str(solution)]
+            subprocess.run(
+                args,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                check=True,
+            )
+            status, sol_status = cbc.get_status(str(solution))
+            lines = solution.read_text().splitlines()[1:]
+
+        values = np.zeros(len(self.variables))
+        for line in lines:
+            # index, name, value and reduced cost, "**" before infeasible rows
+            name, value = line.replace("**", "").split()[1:3]
+            if name[0] == "X":
+                values[int(name[1:])] = float(value)
+        if sol_status not in [pl.LpSolutionOptimal, pl.LpSolutionIntegerFeasible]:
+            return status, sol_status, None
+        return status, sol_status, values
+
+    def _solve_highs(
+        self, coefficients: dict[str, np.ndarray], time_limit: float
+    ) -> tuple[int, int, np.ndarray]:
+        matrix = csr_matrix(
+            (coefficients["data"], (self.rows, self.cols)),
+            shape=(len(self.constraints), len(self.variables)),
+        )
+        result = milp(
+            coefficients["cost"],
+            integrality=self.integrality,
+            bounds=Bounds(coefficients["lower"], coefficients["upper"]),
+            constraints=(
+                LinearConstraint(
+                    matrix, coefficients["row_lower"], coefficients["row_upper"]
+                )
+                if self.constraints
+                else ()
+            ),
+            options={} if time_limit is None else {"time_limit": time_limit},
+        )
+        if result.x is None:
+            status = (
+                pl.LpStatusInfeasible if result.status == 2 else pl.LpStatusNotSolved
+            )
+            return status, pl.LpSolutionNoSolutionFound, None
+        if result.status == 0:
+            return pl.LpStatusOptimal, pl.LpSolutionOptimal, result.x
+        return pl.LpStatusOptimal, pl.LpSolutionIntegerFeasible, result.x
+
+    def get_mps(self, coefficients: dict[str, np.ndarray]) -> str:
+        """Returns the model with the coefficients as an MPS file, with the
+        variables named X<column> and the constraints C<row>
+        """
+        lines = ["NAME MODEL", "ROWS", " N OBJ"]
+        row_lower, row_upper = coefficients["row_lower"], coefficients["row_upper"]
+        rhs = np.where(np.isfinite(row_lower), row_lower, row_upper)
+        for n, (lower, upper) in enumerate(zip(row_lower, row_upper)):
+            sense = "E" if lower == upper else "L" if np.isinf(lower) else "G"
+            lines.append(f" {sense} C{n}")
+
+        lines.append("COLUMNS")
+        matrix = csr_matrix(
+            (coefficients["data"], (self.rows, self.cols)),
+            shape=(len(self.constraints), len(self.variables)),
+        ).tocsc()
+        integer = False
+        for j, cost in enumerate(coefficients["cost"]):
+            if self.integrality[j] != integer:
+                integer = self.integrality[j]
+                marker = "INTORG" if integer else "INTEND"
+                lines.append(f"    MARKER 'MARKER' '{marker}'")
+            lines.append(f"    X{j} OBJ {cost:.12g}")
+            for n, value in zip(
+                matrix.indices[matrix.indptr[j] : matrix.indptr[j + 1]],
+                matrix.data[matrix.indptr[j] : matrix.indptr[j + 1]],
+            ):
+                lines.append(f"    X{j} C{n} {value:.12g}")
+        if integer:
+            lines.append("    MARKER 'MARKER' 'INTEND'")
+
+        lines.append("RHS")
+        lines += [f"    RHS C{n} {value:.12g}" for n, value in enumerate(rhs) if value]
+        lines.append("BOUNDS")
+        for j, (lower, upper) in enumerate(
+            zip(coefficients["lower"], coefficients["upper"])
+        ):
+            if lower == upper:
+                lines.append(f" FX BND X{j} {lower:.12g}")
+                continue
+            lines.append(
+                f" LO BND X{j} {lower:.12g}" if lower > -np.inf else f" MI BND X{j}"
+            )
+            lines.append(
+                f" UP BND X{j} {upper:.12g}" if upper < np.inf else f" PL BND X{j}"
+            )
+        lines.append("ENDATA")
+        return "\n".join(lines) + "\n"
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Saves the model to an .npz file"""
+        arrays = {
+            "variables": np.array(self.variables, dtype=str),
+            "constraints": np.array(self.constraints, dtype=str),
+            "integrality": self.integrality,
+            "rows": self.rows,
+            "cols": self.cols,
+        }
+        for name, (constant, matrix) in self.maps.items():
+            arrays[f"{name}_constant"] = constant
+            arrays[f"{name}_data"] = matrix.data
+            arrays[f"{name}_indices"] = matrix.indices
+            arrays[f"{name}_indptr"] = matrix.indptr
+        arrays["meta"] = np.array(
+            json.dumps(
+                {
+                    "parameters": self.parameters,
+                    "results": self.results,
+                    "derived": self.derived,
+                }
+            )
+        )
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]):
+        """Loads a model saved by save()"""
+        with np.load(path, allow_pickle=False) as arrays:
+            model = cls(
+                arrays["variables"].tolist(),
+                arrays["constraints"].tolist(),
+                arrays["integrality"],
+                arrays["rows"],
+                arrays["cols"],
+            )
+            meta = json.loads(str(arrays["meta"]))
+            size = sum(length for *_, length in meta["parameters"])
+            for name in COEFFICIENTS:
+                constant = arrays[f"{name}_constant"]
+                model.maps[name] = (
+                    constant,
+                    csr_matrix(
+                        (
+                            arrays[f"{name}_data"],
+                            arrays[f"{name}_indices"],
+                            arrays[f"{name}_indptr"],
+                        ),
+                        shape=(len(constant), size),
+                    ),
+                )
+        model.parameters = [tuple(parameter) for parameter in meta["parameters"]]
+        model.results = meta["results"]
+        model.derived = meta["derived"]
+        return model
+
+
+class ModelCache:
+    def __init__(self, path: Union[str, Path] = None, size: int = 32) -> None:
+        """Cache of compiled models keyed by the structure of the endusers
+        (see get_fingerprint): asset counts, scalar inputs, availability
+        patterns, options and time steps. The first enduser of a structure is
+        built once with its input profiles traced (see compile_enduser), the
+        next ones only fill in their coefficients and skip the build. The
+        models are solved with CBC, through an MPS file (see
+        CompiledModel.solve). Set config.model_cache to use it in
+        EndUser.optimize. It can be shared by threads (e.g. a ScenarioSweep),
+        a structure is then compiled by the first of them.
+
+        Editable attributes:
+            path (Path): directory where the models are saved and loaded
+                from, None to keep them in memory only
+            size (int): number of models kept in memory, the least recently
+                used are evicted
+
+        Computed attributes:
+            hits (int): solves with a cached model (memory or disk)
+            misses (int): solves compiling a model
+        """
+        self.path = None if path is None else Path(path)
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._models: OrderedDict[str, CompiledModel] = OrderedDict()
+        self._uncacheable: set[str] = set()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CompiledModel:
+        """Returns the model of a fingerprint, from memory or disk, None if
+        unknown
+        """
+        if key in self._models:
+            self._models.move_to_end(key)
+            return self._models[key]
+        if self.path is not None and (self.path / f"{key}.npz").exists():
+            model = CompiledModel.load(self.path / f"{key}.npz")
+            self._store(key, model)
+            return model
+        return None
+
+    def put(self, key: str, model: CompiledModel) -> None:
+        """Stores the model of a fingerprint, saved to disk if path is set"""
+        self._store(key, model)
+        if self.path is not None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            model.save(self.path / f"{key}.npz")
+
+    def _store(self, key: str, model: CompiledModel) -> None:
+        self._models[key] = model
+        self._models.move_to_end(key)
+        while len(self._models) > self.size:
+            self._models.popitem(last=False)
+
+    def solve(
+        self,
+        enduser,
+        horizon: int,
+        delta_t_k: np.ndarray,
+        symmetry: bool,
+        warm_start: dict = None,
+    ) -> bool:
+        """Solves an enduser with the model of its structure, compiled if
+        needed, starting from the variable values of warm_start (by name, as
+        EndUser.solution), and reads the results as EndUser._optimize does
+
+        Returns:
+            bool: False if the structure cannot be compiled (e.g. inputs that
+                are not affine in the model), the solver is then needed
+        """
+        key = get_fingerprint(enduser, horizon, delta_t_k, symmetry)
+        with self._lock:
+            if key in self._uncacheable:
+                return False
+            model = self.get(key)
+            if model is None:
+                self.misses += 1
+                model = compile_enduser(enduser, horizon, delta_t_k, symmetry)
+                if model is None:
+                    self._uncacheable.add(key)
+                    return False
+                self.put(key, model)
+            else:
+                self.hits += 1
+
+        coefficients = model.fill(enduser)
+        scaled, factors = (
+            model.scale(coefficients)
+            if config.scaling
+            else (coefficients, np.ones(len(model.variables)))
+        )
+        resources = config.resources
+        integers = int(model.integrality.sum())
+        start = None
+        if warm_start:
+            start = (
+                np.array([warm_start.get(name) or 0.0 for name in model.variables])
+                / factors
+            )
+        with resources.acquire(resources.get_threads(integers)) as threads:
+            status, sol_status, values = model.solve(
+                scaled, threads=threads, start=start
+            )
+        enduser.status = pl.LpStatus[status]
+        print(f"Status: {enduser.status} (cached model)")
+        if values is None:
+            print("Cost function cannot be evaluated, probably None")
+            enduser.solution = {}
+            return True
+
+        values = values * factors
+        assets = dict(enduser.iter_assets())
+        arrays = {}
+        for key, attributes in model.derived.items():
+            for attribute, (items, dtype) in attributes.items():
+                arrays[f"{key}.{attribute}"] = np.array(items, dtype=dtype)
+        for key, attributes in model.results.items():
+            for attribute, cols in attributes.items():
+                cols = np.asarray(cols, dtype=int)
+                arrays[f"{key}.{attribute}"] = np.where(
+                    cols >= 0, values[cols], np.nan
+                ).astype(RESULTS[type(assets[key])][attribute])
+        loss = float(coefficients["cost"] @ values + coefficients["cost_constant"][0])
+        print(f"Total value of the Cost function = {round(loss, 2)}")
+        enduser.relaxations = []
+        enduser._set_results(Results(arrays, loss, enduser.status))
+        enduser.solution = dict(zip(model.variables, values.tolist()))
+        return True
+
+
+def get_fingerprint(
+    enduser, horizon: int, delta_t_k: np.ndarray, symmetry: bool
+) -> str:
+    """Returns the structural fingerprint of an enduser: a hash of its
+    inputs but the float profiles (see get_profiles), of the time steps and
+    of the options changing its model
+    """
+    profiles = set(get_profiles(enduser))
+    assets = []
+    for key, asset in enduser.iter_assets():
+        inputs = {
+            name: (
+                (
+                    len(getattr(asset, name))
+                    if (key, name) in profiles
+                    else np.asarray(getattr(asset, name)).tolist()
+                )
+                if name.endswith("_k")
+                else value
+            )
+            for name, value in asset.to_dict().items()
+        }
+        assets.append((key, type(asset).__name__, inputs))
+    structure = {
+        "horizon": horizon,
+        "delta_t": config.delta_t,
+        "delta_t_k": np.asarray(delta_t_k, dtype=float).tolist(),
+        "flexibility": enduser.flexibility,
+        "symmetry": symmetry,
+        "groups": (
+            [get_groups(enduser.storages)]
+            + [get_groups(heatnode.heatproducers) for heatnode in enduser.heatnodes]
+            if symmetry
+            else []
+        ),
+        "assets": assets,
+    }
+    return hashlib.sha1(
+        json.dumps(structure, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def get_profiles(enduser) -> list[tuple[str, str]]:
+    """Returns the (asset key, attribute) of the float input profiles of an
+    enduser, the parameters of its compiled model
+    """
+    return [
+        (key, name)
+        for key, asset in enduser.iter_assets()
+        for name in asset.to_dict()
+        if name.endswith("_k") and np.asarray(getattr(asset, name)).dtype.kind == "f"
+    ]
+
+
+def compile_enduser(
+    enduser, horizon: int, delta_t_k: np.ndarray, symmetry: bool
+) -> CompiledModel:
+    """Compiles the model of an enduser: builds it once with its input
+    profiles replaced by traced values, which record the affine form of each
+    coefficient in the profiles. The compiled model is checked against a
+    direct build of the enduser.
+
+    Returns:
+        CompiledModel: the model, None if a coefficient is not affine in the
+            profiles or the check fails
+    """
+    traced = copy.deepcopy(enduser)
+    assets = dict(traced.iter_assets())
+    parameters = []
+    offset = 0
+    for key, attribute in get_profiles(enduser):
+        values = np.asarray(getattr(assets[key], attribute), dtype=float)
+        # traced values away from 0, so that no term is dropped by PuLP
+        traced_values = np.empty(len(values), dtype=object)
+        for k, value in enumerate(values):
+            traced_values[k] = _Affine(
+                1.37 * value + 1.11 + 0.013 * k, {offset + k: 1.0}, 0.0
+            )
+        setattr(assets[key], attribute, traced_values)
+        parameters.append((key, attribute, len(values)))
+        offset += len(values)
+
+    try:
+        build = Model(traced, horizon, delta_t_k, symmetry=symmetry)
+        model, raw = _compile(build.constraints, build.objective)
+        for name in COEFFICIENTS:
+            model.maps[name] = _get_affine(raw[name], offset)
+    except (TypeError, ValueError) as error:
+        print(f"Model not cached: {error}")
+        return None
+    model.parameters = parameters
+
+    direct = Model(enduser, horizon, delta_t_k, symmetry=symmetry)
+    if not _check(model, model.fill(enduser), direct.constraints, direct.objective):
+        print("Model not cached: the traced model differs from the build")
+        return None
+
+    for key, asset in build.assets.items():
+        for attribute, value in vars(asset).items():
+            if value is vars(assets[key]).get(attribute):
+                continue
+            if isinstance(value, list):
+                model.results.setdefault(key, {})[attribute] = [
+                    -1 if variable is None else model.index.get(variable.name, -1)
+                    for variable in value
+                ]
+            else:
+                values = np.asarray(value)
+                if not np.array_equal(values, getattr(direct.assets[key], attribute)):
+                    print(f"Model not cached: {key}.{attribute} depends on profiles")
+                    return None
+                model.derived.setdefault(key, {})[attribute] = (
+                    values.tolist(),
+                    values.dtype.str,
+                )
+    return model
+
+
+def compile_problem(problem: pl.LpProblem) -> tuple[CompiledModel, dict]:
+    """Compiles a PuLP problem, without parameters
+
+    Returns:
+        tuple[CompiledModel, dict]: the model and its coefficient arrays
+    """
+    model, raw = _compile(problem.constraints, problem.objective)
+    coefficients = {name: np.array(raw[name], dtype=float) for name in COEFFICIENTS}
+    if problem.sense == pl.LpMaximize:
+        coefficients["cost"] = -coefficients["cost"]
+        coefficients["cost_constant"] = -coefficients["cost_constant"]
+    for name, values in coefficients.items():
+        model.maps[name] = (values, csr_matrix((len(values), 0)))
+    return model, coefficients
+
+
+def _compile(constraints: dict, objective: pl.LpAffineExpression) -> tuple:
+    """Returns the model of constraints and an objective, without maps, and
+    its coefficients by name as lists (of floats or traced values)
+    """
+    variables = {}
+    for variable in objective.keys():
+        variables.setdefault(variable.name, variable)
+    for constraint in constraints.values():
+        for variable in constraint.keys():
+            variables.setdefault(variable.name, variable)
+    index = {name: n for n, name in enumerate(variables)}
+
+    rows, cols, data, row_lower, row_upper = [], [], [], [], []
+    for n, constraint in enumerate(constraints.values()):
+        for variable, coefficient in constraint.items():
+            rows.append(n)
+            cols.append(index[variable.name])
+            data.append(coefficient)
+        rhs = -constraint.constant
+        row_lower.append(rhs if constraint.sense >= 0 else -np.inf)
+        row_upper.append(rhs if constraint.sense <= 0 else np.inf)
+    cost = [0.0] * len(variables)
+    for variable, coefficient in objective.items():
+        cost[index[variable.name]] = coefficient
+
+    model = CompiledModel(
+        list(variables),
+        list(constraints),
+        [variable.cat == pl.LpInteger for variable in variables.values()],
+        rows,
+        cols,
+    )
+    raw = {
+        "data": data,
+        "cost": cost,
+        "cost_constant": [objective.constant],
+        "lower": [
+            -np.inf if v.lowBound is None else v.lowBound for v in variables.values()
+        ],
+        "upper": [
+            np.inf if v.upBound is None else v.upBound for v in variables.values()
+        ],
+        "row_lower": row_lower,
+        "row_upper": row_upper,
+    }
+    return model, raw
+
+
+def _get_affine(values: list, size: int) -> tuple[np.ndarray, csr_matrix]:
+    """Returns (constant, matrix) of values, affine in size parameters"""
+    constant = np.zeros(len(values))
+    rows, cols, weights = [], [], []
+    for n, value in enumerate(values):
+        if isinstance(value, _Affine):
+            constant[n] = value.constant
+            for i, weight in value.terms.items():
+                rows.append(n)
+                cols.append(i)
+                weights.append(weight)
+        else:
+            constant[n] = value
+    return constant, csr_matrix((weights, (rows, cols)), shape=(len(values), size))
+
+
+def _check(
+    model: CompiledModel,
+    coefficients: dict,
+    constraints: dict,
+    objective: pl.LpAffineExpression,
+) -> bool:
+    """Checks the filled coefficients of a model against a direct build.
+    Variables without coefficient are left out of the build by PuLP, their
+    coefficients in the model must be 0.
+    """
+    direct, raw = _compile(constraints, objective)
+    if direct.constraints != model.constraints:
+        return False
+    cols = np.array([model.index.get(name, -1) for name in direct.variables], dtype=int)
+    if np.any(cols < 0) or np.any(model.integrality[cols] != direct.integrality):
+        return False
+
+    def close(a, b) -> bool:
+        return np.allclose(a, b, rtol=TOLERANCE, atol=TOLERANCE)
+
+    shape = (len(model.constraints), len(model.variables))
+    difference = csr_matrix(
+        (coefficients["data"], (model.rows, model.cols)), shape=shape
+    ) - csr_matrix(
+        (np.array(raw["data"], dtype=float), (direct.rows, cols[direct.cols])),
+        shape=shape,
+    )
+    cost = np.zeros(len(model.variables))
+    cost[cols] = raw["cost"]
+    return (
+        (difference.nnz == 0 or close(np.abs(difference.data).max(), 0.0))
+        and close(coefficients["cost"], cost)
+        and close(coefficients["cost_constant"], raw["cost_constant"])
+        and close(coefficients["lower"][cols], raw["lower"])
+        and close(coefficients["upper"][cols], raw["upper"])
+        and close(coefficients["row_lower"], raw["row_lower"])
+        and close(coefficients["row_upper"], raw["row_upper"])
+    )
+
+
+class _NotAffine(TypeError):
+    pass
+
+
+class _Affine(float):
+    """Input value traced through a build: a float with its affine form in
+    the parameters, terms {parameter: weight} plus constant. Operations that
+    are not affine, or that depend on the value (comparisons, truth value),
+    raise _NotAffine.
+    """
+
+    # numpy defers to the operators below
+    __array_ufunc__ = None
+
+    def __new__(cls, value: float, terms: dict, constant: float):
+        affine = super().__new__(cls, value)
+        affine.terms = terms
+        affine.constant = constant
+        return affine
+
+    def _scale(self, factor: float):
+        return _Affine(
+            float(self) * factor,
+            {i: weight * factor for i, weight in self.terms.items()},
+            self.constant * factor,
+        )
+
+    def __add__(self, other):
+        if isinstance(other, _Affine):
+            terms = dict(self.terms)
+            for i, weight in other.terms.items():
+                terms[i] = terms.get(i, 0.0) + weight
+            return _Affine(
+                float(self) + float(other), terms, self.constant + other.constant
+            )
+        if isinstance(other, (int, float, np.number)):
+            return _Affine(float(self) + other, self.terms, self.constant + other)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            return self + (-other)
+        return NotImplemented
+
+    def __rsub__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            return -self + other
+        return NotImplemented
+
+    def __neg__(self):
+        return self._scale(-1.0)
+
+    def __pos__(self):
+        return self
+
+    def __mul__(self, other):
+        if isinstance(other, _Affine):
+            if other.terms and self.terms:
+                raise _NotAffine("product of two input profiles")
+            return (
+                self._scale(other.constant)
+                if not other.terms
+                else other._scale(self.constant)
+            )
+        if isinstance(other, (int, float, np.number)):
+            return self._scale(float(other))
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, _Affine) and other.terms:
+            raise _NotAffine("division by an input profile")
+        if isinstance(other, (int, float, np.number)):
+            return self._scale(1.0 / float(other))
+        return NotImplemented
+
+    def __rtruediv__(self, other):
+        if self.terms:
+            raise _NotAffine("division by an input profile")
+        if isinstance(other, (int, float, np.number)):
+            return other / float(self)
+        return NotImplemented
+
+    def _value_dependent(self, *args):
+        raise _NotAffine("the structure depends on an input profile")
+
+    __lt__ = __le__ = __gt__ = __ge__ = _value_dependent
+    __bool__ = __abs__ = __pow__ = __rpow__ = __floordiv__ = __mod__ = _value_dependent
+    __round__ = __int__ = __trunc__ = __floor__ = __ceil__ = _value_dependent
+    __hash__ = float.__hash__
@@ -0,0 +1,278 @@
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+
+from enduseroptimizer import config
+
+TOLERANCE = 1e-6
+# relative loss increase allowed when choosing between optimal schedules
+OPTIMALITY = 1e-9
+
+
+def is_network(enduser) -> bool:
+    """Returns True when the enduser has no feature outside of NetworkFlow:
+    no heatnode (heat producers need binaries) and a loss function of the
+    Grid class
+    """
+    return not enduser.heatnodes and enduser.grid.loss_f in [
+        "minimize_cost",
+        "minimize_grid_supply",
+    ]
+
+
+class NetworkFlow:
+    def __init__(self, enduser, delta_t_k: np.ndarray = None) -> None:
+        """Electrical part of the optimization problem as a flow over the
+        time-expanded network of the enduser, as a fast alternative to the
+        MILP for endusers without heatnode (see is_network). The bus of each
+        step exchanges power with the grid, the producers (less their
+        curtailment), the consumers and the storages; the energy of each
+        storage and the deficit of each consumer flow from one step to the
+        next. The storage efficiencies make it a generalized network (arcs
+        with gains), solved as a sparse LP by HiGHS, without the binaries of
+        the MILP. The import / export and export / discharge exclusivity is
+        checked on the result instead: when violated, the optimal schedule
+        with the least grid exchange and discharging is looked for, and if it
+        still violates it, run() fails and the MILP is needed.
+
+        Editable attributes:
+            enduser (EndUser): enduser to solve, its results are overwritten
+            delta_t_k (array[float]): length of each step [h], defaults to
+                config.delta_t for every step of config.horizon
+        """
+        self.enduser = enduser
+        self.delta_t_k = delta_t_k
+
+    def run(self) -> bool:
+        """Solves the enduser, setting its results, loss and status
+
+        Returns:
+            bool: False when the problem is infeasible or its solution
+                violates the exclusivity of the grid, the enduser is then left
+                unchanged (for the MILP to solve)
+        """
+        enduser = self.enduser
+        delta_t_k = self.delta_t_k
+        if delta_t_k is None:
+            delta_t_k = np.full(config.horizon, config.delta_t)
+        delta_t_k = np.asarray(delta_t_k, dtype=float)
+        horizon = len(delta_t_k)
+        steps = np.arange(horizon)
+        grid = enduser.grid
+        flexibility = float(enduser.flexibility)
+        weight = delta_t_k / config.delta_t
+
+        def array(values) -> np.ndarray:
+            return np.broadcast_to(np.asarray(values, dtype=float), (horizon,))
+
+        self._low, self._high, self._cost = [], [], []
+        self._rows, self._cols, self._values = [], [], []
+        self._rhs = []
+        self._count = 0
+
+        # arcs
+        if grid.loss_f == "minimize_cost":
+            import_cost = weight * array(grid.import_tariff_k)
+            export_cost = -weight * array(grid.export_tariff_k)
+        else:
+            import_cost, export_cost = weight, np.zeros(horizon)
+        power_import = self._add_arcs(0, array(grid.power_import_max_k), import_cost)
+        power_export = self._add_arcs(0, array(grid.power_export_max_k), export_cost)
+        curtailments = [
+            self._add_arcs(
+                0,
+                array(producer.power_actual_k) * producer.power_curtailment_factor_max,
+            )
+            for producer in enduser.producers
+        ]
+        consumers = [
+            (
+                self._add_arcs(
+                    consumer.power_min,
+                    array(consumer.available_k) * consumer.power_max,
+                ),
+                self._add_arcs(0, array(consumer.energy_deficit_max_k) * flexibility),
+            )
+            for consumer in enduser.consumers
+        ]
+        storages = []
+        for storage in enduser.storages:
+            available = array(storage.available_k)
+            capacity = available * storage.energy_capacity
+            storages.append(
+                (
+                    self._add_arcs(
+                        capacity * storage.state_of_charge_min,
+                        capacity * storage.state_of_charge_max,
+                    ),
+                    self._add_arcs(
+                        0, available * storage.power_charge_max * flexibility
+                    ),
+                    self._add_arcs(
+                        0, available * storage.power_discharge_max * flexibility
+                    ),
+                )
+            )
+
+        # nodes: bus of each step
+        production = sum(
+            (array(producer.power_actual_k) for producer in enduser.producers),
+            np.zeros(horizon),
+        )
+        self._add_nodes(
+            [
+                (power_import, 1.0),
+                (power_export, -1.0),
+                *((curtailment, -1.0) for curtailment in curtailments),
+                *((actual, -1.0) for actual, _ in consumers),
+                *((charging, -1.0) for _, charging, _ in storages),
+                *((discharging, 1.0) for _, _, discharging in storages),
+            ],
+            -production,
+        )
+        # deficit of each consumer, cyclic as in the MILP
+        for consumer, (actual, deficit) in zip(enduser.consumers, consumers):
+            self._add_nodes(
+                [
+                    (deficit, 1.0),
+                    (np.roll(deficit, 1), -1.0),
+                    (actual, delta_t_k),
+                ],
+                array(consumer.power_desired_k) * delta_t_k,
+            )
+        # energy of each storage, reset to its initial state of charge when
+        # (re)connected, and at its final state of charge at the last step
+        for storage, (energy, charging, discharging) in zip(enduser.storages, storages):
+            available = array(storage.available_k) > 0
+            connect = available & ~np.append(False, available[:-1])
+            rows = available & ~connect
+            initial = array(storage.state_of_charge_initial_k) * storage.energy_capacity
+            self._add_nodes(
+                [
+                    (energy, -1.0),
+                    (charging, storage.efficiency_charging * delta_t_k),
+                    (discharging, -delta_t_k / storage.efficiency_discharging),
+                ],
+                np.where(connect, -initial, 0.0),
+                available,
+                [(np.roll(energy, 1), rows.astype(float))],
+            )
+            if available[-1]:
+                self._add_nodes(
+                    [(energy[-1:], 1.0)],
+                    storage.energy_capacity
+                    * array(storage.state_of_charge_final_k)[-1:],
+                )
+
+        matrix = coo_matrix(
+            (
+                np.concatenate(self._values),
+                (np.concatenate(self._rows), np.concatenate(self._cols)),
+            ),
+            shape=(len(self._rhs), self._count),
+        ).tocsr()
+        cost = np.concatenate(self._cost)
+        bounds = np.column_stack(
+            (np.concatenate(self._low), np.concatenate(self._high))
+        )
+        result = linprog(
+            cost,
+            A_eq=matrix,
+            b_eq=np.asarray(self._rhs),
+            bounds=bounds,
+            method="highs",
+        )
+        if result.status != 0:
+            return False
+        x = result.x
+
+        # exclusivity of the MILP, not part of the network
+        def is_exclusive(x: np.ndarray) -> bool:
+            exporting = x[power_export] > TOLERANCE
+            discharging = (
+                sum((x[arcs[2]] for arcs in storages), np.zeros(horizon)) > TOLERANCE
+            )
+            return not np.any(exporting & (x[power_import] > TOLERANCE)) and (
+                grid.discharge_to_grid or not np.any(exporting & discharging)
+            )
+
+        if not is_exclusive(x):
+            # ties between optimal schedules (e.g. free export or equal
+            # tariffs): among them, the one with the least exchange with the
+            # grid and discharging
+            secondary = np.zeros(self._count)
+            secondary[power_import] = secondary[power_export] = 1.0
+            if not grid.discharge_to_grid:
+                for _, _, discharging in storages:
+                    secondary[discharging] = 1.0
+            result = linprog(
+                secondary,
+                A_ub=cost[np.newaxis],
+                b_ub=[result.fun + OPTIMALITY * max(1.0, abs(result.fun))],
+                A_eq=matrix,
+                b_eq=np.asarray(self._rhs),
+                bounds=bounds,
+                method="highs",
+            )
+            if result.status != 0 or not is_exclusive(result.x):
+                return False
+            x = result.x
+        exporting = x[power_export] > TOLERANCE
+
+        grid.power_import_k = x[power_import]
+        grid.power_export_k = x[power_export]
+        grid.exporting_to_grid_k = exporting.astype(int)
+        for producer, curtailment in zip(enduser.producers, curtailments):
+            power = array(producer.power_actual_k)
+            producer.power_curtailment_factor_k = np.divide(
+                x[curtailment],
+                power,
+                out=np.zeros(horizon),
+                where=power > 0,
+            )
+        for consumer, (actual, deficit) in zip(enduser.consumers, consumers):
+            consumer.power_actual_k = x[actual]
+            consumer.energy_deficit_k = x[deficit]
+        for storage, (energy, charging, discharging) in zip(enduser.storages, storages):
+            available = array(storage.available_k) > 0
+            previous = np.append(False, available[:-1])
+            storage.event_connect_k = (available & ~previous).astype(int)
+            storage.event_disconnect_k = (~available & previous).astype(int)
+            storage.energy_k = x[energy]
+            storage.power_charging_k = x[charging]
+            storage.power_discharging_k = x[discharging]
+
+        enduser.loss = float(np.sum(weight * grid.losses[grid.loss_f](grid, steps)))
+        enduser.status = "Optimal"
+        enduser.relaxations = []
+        enduser.solution = {}
+        enduser.include_results = True
+        return True
+
+    def _add_arcs(self, low, high, cost=0.0) -> np.ndarray:
+        """Adds one arc (variable) per step, returns their indices"""
+        horizon = len(high)
+        indices = np.arange(self._count, self._count + horizon)
+        self._count += horizon
+        self._low.append(np.broadcast_to(np.asarray(low, dtype=float), (horizon,)))
+        self._high.append(np.asarray(high, dtype=float))
+        self._cost.append(np.broadcast_to(np.asarray(cost, dtype=float), (horizon,)))
+        return indices
+
+    def _add_nodes(self, arcs: list, rhs, mask=None, extra: list = ()) -> None:
+        """Adds one flow conservation row per step (where mask), summing the
+        arcs given as (indices, coefficients) pairs, plus the extra pairs where
+        their coefficient is not 0
+        """
+        count = len(arcs[0][0])
+        mask = np.ones(count, dtype=bool) if mask is None else np.asarray(mask)
+        rows = len(self._rhs) + np.cumsum(mask) - 1
+        for indices, coefficients in [*arcs, *extra]:
+            coefficients = np.broadcast_to(
+                np.asarray(coefficients, dtype=float), (count,)
+            )
+            keep = mask & (coefficients != 0)
+            self._rows.append(rows[keep])
+            self._cols.append(indices[keep])
+            self._values.append(coefficients[keep])
+        self._rhs.extend(np.broadcast_to(np.asarray(rhs, dtype=float), (count,))[mask])
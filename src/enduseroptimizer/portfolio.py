@@ -0,0 +1,259 @@
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+import numpy as np
+import pandas as pd
+import pulp as pl
+
+from enduseroptimizer import config
+from enduseroptimizer.modelcache import compile_problem
+
+# solver configurations raced by default: CBC with its default and aggressive
+# strategies, and HiGHS (through scipy)
+CONFIGURATIONS = {
+    "cbc": {"solver": "cbc"},
+    "cbc-aggressive": {"solver": "cbc", "options": ["strategy 2"]},
+    "highs": {"solver": "highs"},
+}
+SOLVERS = ["cbc", "highs"]
+# seconds to wait for a killed process to exit
+JOIN_TIMEOUT = 5.0
+
+
+class Portfolio:
+    def __init__(
+        self, configurations: dict[str, dict] = None, deadline: float = None
+    ) -> None:
+        """Portfolio of solver configurations raced on each problem, in
+        parallel processes: the first proven optimal result wins and the
+        other processes are killed. Without any optimal result within the
+        deadline, the best solution found wins. Set config.portfolio to race
+        every problem solved by EndUser.optimize.
+
+        Each racer takes one core of config.resources; with fewer free cores
+        than configurations, only the configurations with the most wins race.
+
+        Editable attributes:
+            configurations (dict[str, dict]): configurations by name, with
+                the "solver" ("cbc" or "highs") and for CBC its command line
+                "options" (e.g. ["strategy 2"]), defaults to CONFIGURATIONS
+            deadline (float): time limit of the solvers [s], None for none
+
+        Computed attributes:
+            statistics (dict[str, dict]): "runs", "wins" and total "time" [s]
+                of the wins of each configuration, see get_statistics()
+        """
+        if configurations is None:
+            configurations = CONFIGURATIONS
+        self.configurations = dict(configurations)
+        self.deadline = deadline
+        self.statistics: dict[str, dict] = {}
+
+    def solve(self, problem: pl.LpProblem) -> str:
+        """Races the configurations on the problem, and sets the status and
+        the variable values of the winner on it
+
+        Returns:
+            str: name of the winning configuration, None if none has a
+                solution
+
+        Raises:
+            ValueError: for an unknown solver, or without configuration
+        """
+        if not self.configurations:
+            raise ValueError("The portfolio has no configuration")
+        for name, configuration in self.configurations.items():
+            if configuration.get("solver") not in SOLVERS:
+                raise ValueError(
+                    f"Unknown solver of configuration '{name}', expected {SOLVERS}"
+                )
+
+        with config.resources.acquire(len(self.configurations)) as threads:
+            return self._solve(problem, self._get_racers(threads))
+
+    def _get_racers(self, number: int) -> list[str]:
+        """Returns the names of the number configurations with the most wins,
+        in the order of configurations for equal wins
+        """
+        return sorted(
+            self.configurations,
+            key=lambda name: -self.statistics.get(name, {}).get("wins", 0),
+        )[:number]
+
+    def _solve(self, problem: pl.LpProblem, racers: list[str]) -> str:
+        data = problem.to_dict()
+        context = multiprocessing.get_context()
+        results = context.Queue()
+        processes = {
+            name: context.Process(
+                target=_race,
+                args=(name, self.configurations[name], data, self.deadline, results),
+                daemon=True,
+            )
+            for name in racers
+        }
+        start = time.perf_counter()
+        for process in processes.values():
+            process.start()
+
+        best = None
+        pending = len(processes)
+        while pending:
+            try:
+                result = results.get(timeout=0.1)
+            except queue.Empty:
+                result = None
+            if result is not None:
+                pending -= 1
+                if result["solution"] and (
+                    best is None
+                    or result["optimal"] > best["optimal"]
+                    or (
+                        result["optimal"] == best["optimal"]
+                        and result["objective"] < best["objective"]
+                    )
+                ):
+                    best = dict(result, time=time.perf_counter() - start)
+                if best is not None and best["optimal"]:
+                    break
+            elif results.empty() and not any(
+                process.is_alive() for process in processes.values()
+            ):
+                break
+            # best solution found within the deadline
+            if (
+                best is not None
+                and self.deadline is not None
+                and time.perf_counter() - start > self.deadline
+            ):
+                break
+        for process in processes.values():
+            _kill(process)
+
+        for name in racers:
+            statistics = self.statistics.setdefault(
+                name, {"runs": 0, "wins": 0, "time": 0.0}
+            )
+            statistics["runs"] += 1
+        if best is None:
+            problem.assignStatus(pl.LpStatusNotSolved)
+            return None
+        self.statistics[best["name"]]["wins"] += 1
+        self.statistics[best["name"]]["time"] += best["time"]
+
+        for variable in problem.variables():
+            variable.varValue = best["values"].get(variable.name)
+        problem.assignStatus(best["status"], best["sol_status"])
+        return best["name"]
+
+    def get_statistics(self) -> pd.DataFrame:
+        """Returns the runs, wins, win_rate and mean_time [s] of the wins of
+        each configuration
+        """
+        statistics = pd.DataFrame.from_dict(
+            self.statistics, orient="index", columns=["runs", "wins", "time"]
+        )
+        statistics["win_rate"] = statistics["wins"] / statistics["runs"]
+        statistics["mean_time"] = statistics["time"] / statistics["wins"]
+        statistics.index.name = "configuration"
+        return statistics.drop(columns="time")
+
+    def prune(self, min_runs: int = 20, min_win_rate: float = 0.05) -> list[str]:
+        """Removes the configurations that won less than min_win_rate of at
+        least min_runs races, keeping at least one
+
+        Returns:
+            list[str]: names of the removed configurations
+        """
+        removed = [
+            name
+            for name in self.configurations
+            if self.statistics.get(name, {}).get("runs", 0) >= min_runs
+            and self.statistics[name]["wins"] / self.statistics[name]["runs"]
+            < min_win_rate
+        ]
+        if len(removed) == len(self.configurations):
+            removed.remove(max(removed, key=lambda name: self.statistics[name]["wins"]))
+        for name in removed:
+            del self.configurations[name]
+        return removed
+
+
+def _race(
+    name: str,
+    configuration: dict,
+    data: dict,
+    deadline: float,
+    results: multiprocessing.Queue,
+) -> None:
+    """Solves the problem of data with a configuration, in its own process
+    group so that killing it also kills the solver
+    """
+    if hasattr(os, "setsid"):
+        os.setsid()
+    _, problem = pl.LpProblem.from_dict(data)
+    if configuration["solver"] == "cbc":
+        warm_start = any(
+            variable.varValue is not None for variable in problem.variables()
+        )
+        problem.solve(
+            pl.PULP_CBC_CMD(
+                msg=0,
+                warmStart=warm_start,
+                timeLimit=deadline,
+                options=list(configuration.get("options", [])),
+            )
+        )
+        status, sol_status = problem.status, problem.sol_status
+        values = {variable.name: variable.varValue for variable in problem.variables()}
+    else:
+        status, sol_status, values = _solve_highs(problem, deadline)
+
+    solution = sol_status in [pl.LpSolutionOptimal, pl.LpSolutionIntegerFeasible]
+    objective = np.nan
+    if solution:
+        objective = problem.objective.constant + sum(
+            coefficient * values[variable.name]
+            for variable, coefficient in problem.objective.items()
+        )
+    results.put(
+        {
+            "name": name,
+            "status": status,
+            "sol_status": sol_status,
+            "solution": solution,
+            "optimal": sol_status == pl.LpSolutionOptimal,
+            "objective": objective,
+            "values": values if solution else {},
+        }
+    )
+
+
+def _solve_highs(problem: pl.LpProblem, deadline: float) -> tuple[int, int, dict]:
+    """Solves the problem with HiGHS, returns its status, solution status and
+    the variable values by name
+    """
+    model, coefficients = compile_problem(problem)
+    status, sol_status, values = model.solve(coefficients, "highs", deadline)
+    if values is None:
+        return status, sol_status, {}
+    return status, sol_status, dict(zip(model.variables, values.tolist()))
+
+
+def _kill(process: multiprocessing.Process) -> None:
+    """Kills a racing process and its solver. The process group only exists
+    once the process has called os.setsid, before that the process itself
+    is killed (it has not started its solver yet).
+    """
+    if process.is_alive():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            process.kill()
+    process.join(JOIN_TIMEOUT)
+    if process.is_alive():
+        process.kill()
+        process.join(JOIN_TIMEOUT)
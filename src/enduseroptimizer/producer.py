@@ -2,9 +2,13 @@ import numpy as np
 import numpy.typing as npt
 
 from enduseroptimizer import config
+from enduseroptimizer.encoding import LazyArray, decode_k, defer_k, encode_k
 
 
 class Producer:
+    # result arrays, decoded on first access when read by from_dict
+    power_curtailment_factor_k = LazyArray(dtype=float)
+
     def __init__(self, name: str = "Producer") -> None:
         """Class defining an electrical energy producer
 
@@ -27,24 +31,24 @@ class Producer:
 
         self.power_curtailment_factor_k = np.array([])  # (0,1)
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
 
         data["power_curtailment_factor_max_i"] = self.power_curtailment_factor_max
-        data["power_actual_k"] = self.power_actual_k.tolist()
+        data["power_actual_k"] = encode_k(self.power_actual_k, compact)
 
         if include_results:
-            data["power_curtailment_factor_k"] = (
-                self.power_curtailment_factor_k.tolist()
+            data["power_curtailment_factor_k"] = encode_k(
+                self.power_curtailment_factor_k, compact
             )
 
         return data
 
     def from_dict(self, data: dict, include_results: bool) -> None:
         self.power_curtailment_factor_max = data["power_curtailment_factor_max_i"]
-        self.power_actual_k = np.asarray(data["power_actual_k"], dtype=float)
+        self.power_actual_k = decode_k(data["power_actual_k"], dtype=float)
 
         if include_results:
-            self.power_curtailment_factor_k = np.asarray(
-                data["power_curtailment_factor_k"], dtype=float
+            defer_k(
+                self, "power_curtailment_factor_k", data["power_curtailment_factor_k"]
             )
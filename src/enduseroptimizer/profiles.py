@@ -0,0 +1,136 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from enduseroptimizer import config
+from enduseroptimizer.timeseries import TimeSeriesStore
+
+
+class ProfileStore:
+    MANIFEST = "profiles.json"
+    VALUES = "profiles.npy"
+
+    def __init__(self, root: Path) -> None:
+        """On-disk store of the input profiles of many sites over long periods.
+        Profiles are memory-mapped when opened, so that only the windows used
+        by the optimization are read from disk and the resident memory is
+        bounded by the active window, not by the size of the dataset.
+
+        Layout, one directory per site:
+            <root>/<site>/profiles.json: manifest with the start time, the
+                length of the steps [h], the profile names, the number of steps
+                and the dtype
+            <root>/<site>/profiles.npy: array of shape (profiles, steps), each
+                profile being contiguous on disk
+
+        Editable attributes:
+            root (Path): directory of the store
+        """
+        self.root = Path(root)
+
+    def sites(self) -> list[str]:
+        """Returns the names of the sites in the store"""
+        if not self.root.exists():
+            return []
+        return sorted(
+            path.name
+            for path in self.root.iterdir()
+            if (path / self.MANIFEST).exists()
+        )
+
+    def create(
+        self,
+        site: str,
+        columns: list[str],
+        start_time: datetime,
+        stop_time: datetime,
+        dtype: str = "float64",
+    ) -> None:
+        """Allocates the profiles of a site, sampled with config.delta_t, from
+        start_time to stop_time (excluded). Steps that are never written read
+        as 0.
+        """
+        steps = int(
+            round((stop_time - start_time) / timedelta(hours=config.delta_t))
+        )
+        path = self.root / site
+        path.mkdir(parents=True, exist_ok=True)
+
+        values = np.lib.format.open_memmap(
+            path / self.VALUES, mode="w+", dtype=dtype, shape=(len(columns), steps)
+        )
+        values.flush()
+        del values
+
+        manifest = {
+            "start_time": start_time.isoformat(),
+            "delta_t": config.delta_t,
+            "columns": [str(column) for column in columns],
+            "steps": steps,
+            "dtype": dtype,
+        }
+        with open(path / self.MANIFEST, "w") as out_file:
+            json.dump(manifest, out_file, indent=4)
+
+    def get_manifest(self, site: str) -> dict:
+        with open(self.root / site / self.MANIFEST) as in_file:
+            manifest = json.load(in_file)
+        manifest["start_time"] = datetime.fromisoformat(manifest["start_time"])
+        return manifest
+
+    def write(self, site: str, frame: pd.DataFrame) -> None:
+        """Writes a chunk of profiles (indexed by timestamps) to an allocated
+        site, resampled to the steps of the site. Chunks can be written in any
+        order, so that a long dataset never needs to be held in memory.
+        """
+        manifest = self.get_manifest(site)
+        self._check_delta_t(site, manifest)
+        unknown = set(map(str, frame.columns)) - set(manifest["columns"])
+        if unknown:
+            raise ValueError(f"Unknown profiles for site {site}: {sorted(unknown)}")
+
+        # align the chunk with the steps of the site
+        step = pd.Timedelta(hours=manifest["delta_t"])
+        origin = pd.Timestamp(manifest["start_time"])
+        offset = -((origin - frame.index.min()) // step)
+        chunk = TimeSeriesStore()
+        chunk.from_frame(frame, start_time=origin + offset * step)
+        stop = min(offset + len(chunk), manifest["steps"])
+        start = max(offset, 0)
+        if stop <= start:
+            return
+
+        values = np.load(self.root / site / self.VALUES, mmap_mode="r+")
+        for n, column in enumerate(chunk.columns):
+            values[manifest["columns"].index(column), start:stop] = chunk.values[
+                n, start - offset : stop - offset
+            ]
+        values.flush()
+        del values
+
+    def open(self, site: str) -> TimeSeriesStore:
+        """Returns the memory-mapped profiles of a site, whose windows are
+        read from disk only when used
+        """
+        manifest = self.get_manifest(site)
+        self._check_delta_t(site, manifest)
+        store = TimeSeriesStore(name=site)
+        store.from_npy(
+            self.root / site / self.VALUES,
+            manifest["columns"],
+            manifest["start_time"],
+            manifest["delta_t"],
+            mmap=True,
+        )
+        return store
+
+    @staticmethod
+    def _check_delta_t(site: str, manifest: dict) -> None:
+        if not np.isclose(manifest["delta_t"], config.delta_t):
+            raise ValueError(
+                f"Profiles of site {site} have steps of {manifest['delta_t']} h, "
+                f"delta_t is {config.delta_t} h"
+            )
@@ -0,0 +1,113 @@
+import numpy as np
+
+from enduseroptimizer import config
+
+TOLERANCE = 1e-6
+
+
+def get_starting(running: np.ndarray) -> np.ndarray:
+    """Returns the start-up steps of on/off schedules (producers x steps), as
+    implied by the starting constraints of the optimization problem
+    """
+    running = np.asarray(running, dtype=int)
+    previous = np.zeros_like(running)
+    previous[:, 1:] = running[:, :-1]
+    return running * (1 - previous)
+
+
+def round_running(running: np.ndarray) -> np.ndarray:
+    """Rounds the relaxed running_k of heat producers (producers x steps)"""
+    return (np.asarray(running, dtype=float) >= 0.5).astype(int)
+
+
+def repair_running(
+    heatnode, running: np.ndarray, delta_t_k: np.ndarray, flexibility: float
+) -> np.ndarray:
+    """Repairs the on/off schedules of the heat producers of a heatnode, so
+    that the heat storage temperature can stay within its limits and reach
+    its final temperature with the powers allowed by the schedules
+    (minimum_power_factor when running, start-up losses). The first step
+    where no temperature is reachable is repaired in turn: lacking heat, the
+    most efficient producer that is off is turned on, at this step or the
+    closest earlier one; excess heat turns off the least efficient producer
+    running.
+
+    The heat storages are aggregated into one (summed capacity and losses,
+    narrowest temperature limits), exact for a single heat storage.
+
+    Args:
+        heatnode (HeatNode): heatnode of the schedules
+        running (np.ndarray): running_k of each heat producer (producers x
+            steps)
+        delta_t_k (np.ndarray): length of each step [h]
+        flexibility (float): flexibility of the enduser
+
+    Returns:
+        np.ndarray: the repaired schedules, unchanged if no repair is found
+    """
+    running = np.array(running, dtype=int)
+    if not heatnode.heatstorages or not heatnode.heatproducers:
+        return running
+    order = np.argsort([-producer.efficiency for producer in heatnode.heatproducers])
+    for _ in range(2 * running.size):
+        violation = _get_violation(heatnode, running, delta_t_k, flexibility)
+        if violation is None:
+            break
+        k, lacking = violation
+        candidates = order if lacking else order[::-1]
+        for step in range(k, -1, -1):
+            j = next((j for j in candidates if running[j, step] != lacking), None)
+            if j is not None:
+                running[j, step] = int(lacking)
+                break
+        else:
+            break
+    return running
+
+
+def _get_violation(
+    heatnode, running: np.ndarray, delta_t_k: np.ndarray, flexibility: float
+):
+    """Returns (k, lacking) for the first step k where the aggregated heat
+    storage cannot stay within its limits, lacking heat if lacking else with
+    excess heat, or None
+    """
+    horizon = len(delta_t_k)
+    starting = get_starting(running)
+    heat_min = np.zeros(horizon)
+    heat_max = np.zeros(horizon)
+    for j, producer in enumerate(heatnode.heatproducers):
+        heat = producer.efficiency * producer.power_max * delta_t_k
+        startup = starting[j] * producer.power_loss_startup
+        heat_min += heat * (
+            np.maximum(running[j] * producer.minimum_power_factor, startup) - startup
+        )
+        heat_max += heat * running[j]
+    demand = np.zeros(horizon)
+    for heatconsumer in heatnode.heatconsumers:
+        demand += np.asarray(heatconsumer.power_actual_k, dtype=float) * delta_t_k
+
+    storages = heatnode.heatstorages
+    capacity = flexibility * sum(
+        storage.volume * storage.density * storage.specific_heat for storage in storages
+    )
+    losses = (
+        sum(storage.loss_factor for storage in storages) * delta_t_k / config.delta_t
+    )
+    if capacity + np.min(losses) <= 0:
+        return None
+    minimum = max(storage.temperature_min for storage in storages)
+    maximum = min(storage.temperature_max for storage in storages)
+    final = np.mean([storage.temperature_final for storage in storages])
+    low = high = np.mean([storage.temperature_init for storage in storages])
+    for k in range(horizon):
+        # temperatures reachable at step k, within the limits at k - 1
+        low = (capacity * low + heat_min[k] - demand[k]) / (capacity + losses[k])
+        high = (capacity * high + heat_max[k] - demand[k]) / (capacity + losses[k])
+        lower, upper = (final, final) if k == horizon - 1 else (minimum, maximum)
+        if high < lower - TOLERANCE:
+            return k, True
+        if low > upper + TOLERANCE:
+            return k, False
+        low, high = max(low, lower), min(high, upper)
+    return None
@@ -0,0 +1,154 @@
+import copy
+
+import numpy as np
+
+from enduseroptimizer import (
+    Consumer,
+    Grid,
+    HeatConsumer,
+    HeatProducer,
+    HeatStorage,
+    Producer,
+    Storage,
+)
+
+# how each input array is reduced to a coarse step
+INPUTS_K = {
+    Producer: {
+        "power_actual_k": "mean",
+    },
+    Consumer: {
+        "available_k": "min",
+        "energy_deficit_max_k": "min",
+        "power_desired_k": "mean",
+    },
+    Storage: {
+        "available_k": "min",
+        "state_of_charge_initial_k": "first",
+        "state_of_charge_final_k": "last",
+    },
+    Grid: {
+        # limits of every delta_t step, the coarse step stays within them
+        "power_import_max_k": "min",
+        "power_export_max_k": "min",
+        "import_tariff_k": "mean",
+        "export_tariff_k": "mean",
+    },
+    HeatConsumer: {
+        "power_actual_k": "mean",
+    },
+}
+
+# how each result array is spread back over the delta_t steps of a coarse step
+RESULTS_K = {
+    Producer: {
+        "power_curtailment_factor_k": "repeat",
+    },
+    Consumer: {
+        "power_actual_k": "repeat",
+        "energy_deficit_k": "repeat",
+    },
+    Storage: {
+        "event_connect_k": "event",
+        "event_disconnect_k": "event",
+        "energy_k": "repeat",
+        "power_charging_k": "repeat",
+        "power_discharging_k": "repeat",
+    },
+    Grid: {
+        "power_import_k": "repeat",
+        "power_export_k": "repeat",
+    },
+    HeatProducer: {
+        "starting_k": "event",
+        "running_k": "repeat",
+        "power_k": "repeat",
+    },
+    HeatStorage: {
+        "temperature_k": "repeat",
+        "energy_in_k": "split",
+        "energy_out_k": "split",
+    },
+}
+
+
+def aggregate_k(values, bounds: np.ndarray, how: str = "mean") -> np.ndarray:
+    """Reduces an array defined on the delta_t steps to the steps given by
+    bounds (see Config.get_step_bounds)
+
+    Args:
+        values (array): array of length bounds[-1]
+        bounds (array[int]): step bounds
+        how (str): one of "mean", "min", "max", "first", "last"
+    """
+    values = np.asarray(values)
+    starts = bounds[:-1]
+    if how == "mean":
+        return np.add.reduceat(values, starts) / np.diff(bounds)
+    if how == "min":
+        return np.minimum.reduceat(values, starts)
+    if how == "max":
+        return np.maximum.reduceat(values, starts)
+    if how == "first":
+        return values[starts]
+    if how == "last":
+        return values[bounds[1:] - 1]
+    raise ValueError(f"Unknown aggregation '{how}'")
+
+
+def expand_k(values, bounds: np.ndarray, how: str = "repeat") -> np.ndarray:
+    """Spreads an array defined on the steps given by bounds back over the
+    delta_t steps, inverse of aggregate_k
+
+    Args:
+        values (array): array of length len(bounds) - 1
+        bounds (array[int]): step bounds
+        how (str): "repeat" for powers and states, "split" for quantities
+            integrated over a step (e.g. energies), "event" for events that are
+            placed on the first delta_t step of the coarse step
+    """
+    values = np.asarray(values)
+    widths = np.diff(bounds)
+    if how == "repeat":
+        return np.repeat(values, widths)
+    if how == "split":
+        return np.repeat(values / widths, widths)
+    if how == "event":
+        expanded = np.zeros(bounds[-1], dtype=values.dtype)
+        expanded[bounds[:-1]] = values
+        return expanded
+    raise ValueError(f"Unknown expansion '{how}'")
+
+
+def aggregate_enduser(enduser, bounds: np.ndarray):
+    """Returns a copy of the enduser whose input arrays are aggregated to the
+    steps given by bounds
+    """
+    coarse = copy.deepcopy(enduser)
+    for _, asset in coarse.iter_assets():
+        for attribute, how in INPUTS_K.get(type(asset), {}).items():
+            setattr(
+                asset,
+                attribute,
+                aggregate_k(getattr(asset, attribute), bounds, how).astype(
+                    np.asarray(getattr(asset, attribute)).dtype
+                ),
+            )
+    return coarse
+
+
+def expand_results(coarse, enduser, bounds: np.ndarray) -> None:
+    """Writes the results of the aggregated (coarse) enduser back to enduser,
+    on the delta_t steps
+    """
+    for (_, coarse_asset), (_, asset) in zip(
+        coarse.iter_assets(), enduser.iter_assets()
+    ):
+        for attribute, how in RESULTS_K.get(type(asset), {}).items():
+            setattr(
+                asset, attribute, expand_k(getattr(coarse_asset, attribute), bounds, how)
+            )
+
+    enduser.loss = coarse.loss
+    enduser.status = coarse.status
+    enduser.include_results = coarse.include_results
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+def get_cores() -> int:
+    """Returns the cores available to the process (its CPU affinity, e.g. the
+    allocation of a batch job, where supported)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ResourceManager:
+    def __init__(self, cores: int = None) -> None:
+        """Process-wide budget of the cores used by the solvers, shared by
+        every solve of the process (config.resources). A solve acquires
+        threads from the budget and waits while it is exhausted, so that
+        parallel sweeps, stochastic scenarios, backtest ranges and portfolio
+        races do not oversubscribe the machine. LPs and small MIPs get one
+        thread, larger MIPs one thread per integers_per_thread integer
+        variables, up to max_threads and the free cores. With several
+        processes sharing a machine, give each a share of the cores.
+
+        Editable attributes:
+            cores (int): core budget, defaults to the cores available to the
+                process
+            max_threads (int): maximum solver threads of a job, defaults to
+                cores
+            integers_per_thread (int): integer variables per solver thread
+
+        Computed attributes:
+            running (int): jobs holding threads
+            waiting (int): jobs waiting for free cores
+            in_use (int): threads held by the running jobs
+            jobs (int): jobs done since the start (or reset())
+            peak (int): maximum threads held at once
+            busy (float): threads held times their duration [s]
+        """
+        self.cores = get_cores() if cores is None else cores
+        self.max_threads = None
+        self.integers_per_thread = 500
+        self._condition = threading.Condition()
+        self.reset()
+
+    def reset(self) -> None:
+        """Resets the utilization statistics"""
+        with self._condition:
+            self.running = 0
+            self.waiting = 0
+            self.in_use = 0
+            self.jobs = 0
+            self.peak = 0
+            self.busy = 0.0
+            self._start = time.perf_counter()
+
+    def get_threads(self, integers: int) -> int:
+        """Returns the solver threads wanted for a problem with a number of
+        integer variables: one for an LP or a small MIP, more for larger MIPs
+        """
+        max_threads = self.max_threads or self.cores
+        return max(1, min(integers // self.integers_per_thread, max_threads))
+
+    @contextmanager
+    def acquire(self, threads: int = 1):
+        """Holds up to threads cores of the budget while solving, waiting for
+        at least one free core. Yields the threads granted, fewer than
+        requested when only some cores are free.
+        """
+        with self._condition:
+            self.waiting += 1
+            self._condition.wait_for(lambda: self.in_use < self.cores)
+            self.waiting -= 1
+            granted = max(1, min(threads, self.cores - self.in_use))
+            self.running += 1
+            self.in_use += granted
+            self.peak = max(self.peak, self.in_use)
+        start = time.perf_counter()
+        try:
+            yield granted
+        finally:
+            with self._condition:
+                self.busy += granted * (time.perf_counter() - start)
+                self.running -= 1
+                self.in_use -= granted
+                self.jobs += 1
+                self._condition.notify_all()
+
+    def get_utilization(self) -> dict:
+        """Returns the cores, the running and waiting jobs, the threads in
+        use, the jobs done, the peak threads and the utilization of the
+        budget since the start (busy core time over cores times elapsed time)
+        """
+        with self._condition:
+            elapsed = time.perf_counter() - self._start
+            return {
+                "cores": self.cores,
+                "running": self.running,
+                "waiting": self.waiting,
+                "in_use": self.in_use,
+                "jobs": self.jobs,
+                "peak": self.peak,
+                "utilization": (
+                    self.busy / (self.cores * elapsed) if elapsed > 0 else 0.0
+                ),
+            }
@@ -0,0 +1,213 @@
+import json
+
+import numpy as np
+import numpy.lib.recfunctions as rfn
+import pyarrow as pa
+
+from enduseroptimizer import (
+    Consumer,
+    Grid,
+    HeatProducer,
+    HeatStorage,
+    Producer,
+    Storage,
+)
+
+# result attributes of each asset type and their dtype, in the order of
+# EndUser._build
+RESULTS = {
+    Consumer: {"energy_deficit_k": float, "power_actual_k": float},
+    Storage: {
+        "event_connect_k": int,
+        "event_disconnect_k": int,
+        "energy_k": float,
+        "power_charging_k": float,
+        "power_discharging_k": float,
+    },
+    Producer: {"power_curtailment_factor_k": float},
+    HeatProducer: {"power_k": float, "running_k": int, "starting_k": int},
+    HeatStorage: {"temperature_k": float, "energy_in_k": float, "energy_out_k": float},
+    # NaN for the steps without exclusivity binary (config.lazy_exclusivity)
+    Grid: {
+        "power_import_k": float,
+        "power_export_k": float,
+        "exporting_to_grid_k": float,
+    },
+}
+
+
+class Results:
+    def __init__(
+        self, arrays: dict = None, loss: float = 0.0, status: str = "Not Solved"
+    ) -> None:
+        """Results of an optimization of an enduser, held apart from its
+        inputs and from the solver objects: the result arrays of its assets by
+        "<asset key>.<attribute>" (e.g. "grid.power_import_k", see
+        EndUser.iter_assets), the loss and the status.
+
+        The arrays are stored in one contiguous buffer, a structured array
+        with a field per key, and are named views of it: extracting,
+        serializing (to_bytes, to_arrow, pickle) and stacking the results of
+        several endusers (see stack_results) are bulk operations on the
+        buffer. Setting them on an enduser (apply) makes the result attributes
+        of its assets these views.
+
+        Args:
+            arrays (dict[str, np.ndarray]): result arrays by key, copied into
+                the buffer
+
+        Computed attributes:
+            buffer (np.ndarray): 0-d structured array holding the arrays
+            arrays (dict[str, np.ndarray]): views of the buffer by key
+            loss (float): value of the loss
+            status (str): status of the optimization
+        """
+        arrays = {key: np.asarray(values) for key, values in (arrays or {}).items()}
+        self.buffer = np.zeros(
+            (),
+            dtype=[(key, values.dtype, values.shape) for key, values in arrays.items()],
+        )
+        for key, values in arrays.items():
+            self.buffer[key] = values
+        self.loss = loss
+        self.status = status
+        self._set_views()
+
+    @classmethod
+    def from_enduser(cls, enduser) -> "Results":
+        """Collects the result attributes of the assets of an enduser: arrays,
+        or the solved variables of a model (see model.Model), replaced by their
+        values
+        """
+        arrays = {}
+        for key, asset in enduser.iter_assets():
+            for attribute, dtype in RESULTS.get(type(asset), {}).items():
+                values = getattr(asset, attribute)
+                if isinstance(values, list):
+                    values = [getattr(value, "varValue", value) for value in values]
+                arrays[f"{key}.{attribute}"] = np.asarray(values, dtype=dtype)
+        return cls(arrays, enduser.loss, enduser.status)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Results":
+        """Returns the results serialized by to_bytes"""
+        size = int.from_bytes(data[:4], "little")
+        header = json.loads(data[4 : 4 + size])
+        dtype = np.dtype(
+            [(key, kind, tuple(shape)) for key, kind, shape in header["dtype"]]
+        )
+        results = cls(loss=header["loss"], status=header["status"])
+        results.buffer = np.zeros((), dtype=dtype)
+        if dtype.itemsize:
+            results.buffer[()] = np.frombuffer(data[4 + size :], dtype=dtype)[0]
+        results._set_views()
+        return results
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "Results":
+        """Returns the results converted by to_arrow"""
+        metadata = table.schema.metadata or {}
+        return cls(
+            {name: table.column(name).to_numpy() for name in table.column_names},
+            json.loads(metadata.get(b"loss", b"0.0")),
+            metadata.get(b"status", b"Not Solved").decode(),
+        )
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def __getstate__(self) -> dict:
+        # the views are rebuilt from the buffer, not pickled one by one
+        return {"buffer": self.buffer, "loss": self.loss, "status": self.status}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._set_views()
+
+    def keys(self) -> list[str]:
+        return list(self.arrays)
+
+    def apply(self, enduser) -> None:
+        """Sets the result attributes of the assets of an enduser of the same
+        structure to the views of the buffer
+        """
+        assets = dict(enduser.iter_assets())
+        for key, values in self.arrays.items():
+            name, attribute = key.rsplit(".", 1)
+            setattr(assets[name], attribute, values)
+
+    def is_applied(self, enduser) -> bool:
+        """Returns True if the result attributes of the assets of an enduser
+        are the views of the buffer
+        """
+        assets = dict(enduser.iter_assets())
+        for key, values in self.arrays.items():
+            name, attribute = key.rsplit(".", 1)
+            if name not in assets or assets[name].__dict__.get(attribute) is not values:
+                return False
+        return len(self.arrays) == sum(
+            len(RESULTS.get(type(asset), {})) for asset in assets.values()
+        )
+
+    def get_matrix(self) -> np.ndarray:
+        """Returns the arrays as a 2-d float array, one row per key (in the
+        order of keys()), when they have the same length
+
+        Raises:
+            ValueError: if the arrays differ in length
+        """
+        lengths = {len(values) for values in self.arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError("Results of different lengths cannot form a matrix")
+        if not self.arrays:
+            return np.zeros((0, 0))
+        matrix = rfn.structured_to_unstructured(self.buffer, dtype=float)
+        return matrix.reshape(len(self.arrays), lengths.pop())
+
+    def to_bytes(self) -> bytes:
+        """Returns the results as bytes: the length of a JSON header (4 bytes),
+        the header (fields of the buffer, loss and status) and the raw buffer
+        """
+        header = json.dumps(
+            {
+                "dtype": [
+                    [key, kind, list(shape)]
+                    for key, kind, shape in self.buffer.dtype.descr
+                ],
+                "loss": self.loss,
+                "status": self.status,
+            }
+        ).encode()
+        return len(header).to_bytes(4, "little") + header + self.buffer.tobytes()
+
+    def to_arrow(self) -> pa.Table:
+        """Returns the results as an Arrow table, one column per key (views of
+        the buffer, not copied), with the loss and the status as metadata
+
+        Raises:
+            ValueError: if the arrays differ in length
+        """
+        if len({len(values) for values in self.arrays.values()}) > 1:
+            raise ValueError("Results of different lengths cannot form a table")
+        return pa.table(
+            {key: pa.array(values) for key, values in self.arrays.items()},
+            metadata={"loss": json.dumps(self.loss), "status": self.status},
+        )
+
+    def _set_views(self) -> None:
+        self.arrays = {key: self.buffer[key] for key in self.buffer.dtype.names or ()}
+
+
+def stack_results(results: list[Results]) -> np.ndarray:
+    """Returns the buffers of the results of endusers with the same structure
+    (e.g. several sites) as one structured array, with one row per enduser:
+    stacked[key] is a 2-d array (endusers, steps), e.g.
+    stacked["grid.power_import_k"].sum(axis=0) is the total import
+
+    Raises:
+        ValueError: if the results differ in structure
+    """
+    dtypes = {item.buffer.dtype for item in results}
+    if len(dtypes) > 1:
+        raise ValueError("Results of different structures cannot be stacked")
+    return np.stack([item.buffer for item in results])
@@ -0,0 +1,276 @@
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from enduseroptimizer import EndUser, config
+from enduseroptimizer.backtest import Sink
+from enduseroptimizer.resolution import RESULTS_K
+
+
+class ResultStore(Sink):
+    SCHEMA = pa.schema(
+        [
+            ("asset", pa.string()),
+            ("variable", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+            ("value", pa.float64()),
+        ]
+    )
+    PARTITIONS = pa.schema([("site", pa.string()), ("date", pa.string())])
+    RUNS_SCHEMA = pa.schema(
+        [
+            ("start_time", pa.timestamp("us")),
+            ("loss", pa.float64()),
+            ("status", pa.string()),
+        ]
+    )
+
+    def __init__(self, root: Path = None, site: str = "site") -> None:
+        """Append-only columnar store of optimization results: a Parquet
+        dataset partitioned by site and date, with one row per asset,
+        variable and timestamp. Every flush adds new files, existing files are
+        never rewritten. Readers only load the partitions and row groups of
+        the requested site, period and asset.
+
+        Layout:
+            <root>/results/site=<site>/date=<period>/part-*.parquet: asset,
+                variable (e.g. "power_import_k"), timestamp and value
+            <root>/runs/site=<site>/part-*.parquet: start_time, loss and
+                status of each optimized enduser
+
+        Timestamps are stored without timezone, timezone aware timestamps are
+        converted to UTC. A store can be shared by threads, e.g. the ranges
+        of Backtest.run_ranges.
+
+        Editable attributes:
+            root (Path): directory of the store, defaults to
+                config.default_result_path / "store"
+            site (str): default site of the appended results
+            batch_size (int): number of buffered rows that triggers a flush
+            partitioning (str): "month" or "day", period of the date partitions
+        """
+        self.root = (
+            Path(root) if root is not None else config.default_result_path / "store"
+        )
+        self.site = site
+        self.batch_size: int = 1_000_000
+        self.partitioning: str = "month"
+
+        self._buffer: list[pd.DataFrame] = []
+        self._runs: list[pd.DataFrame] = []
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def append(self, enduser: EndUser, site: str = None) -> None:
+        """Buffers all the result arrays of an optimized enduser"""
+        site = self.site if site is None else site
+        timestamps = self._to_utc(pd.DatetimeIndex(enduser.get_timestamps()))
+
+        assets, variables, values = [], [], []
+        for key, asset in enduser.iter_assets():
+            for attribute in RESULTS_K.get(type(asset), {}):
+                array = np.asarray(getattr(asset, attribute), dtype=float)
+                if len(array) != len(timestamps):
+                    continue
+                assets.append(key)
+                variables.append(attribute)
+                values.append(array)
+
+        n = len(timestamps)
+        self._add(
+            pd.DataFrame(
+                {
+                    "site": site,
+                    "asset": np.repeat(assets, n),
+                    "variable": np.repeat(variables, n),
+                    "timestamp": np.tile(timestamps, len(values)),
+                    "value": np.concatenate(values) if values else [],
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "site": [site],
+                    "start_time": self._to_utc(pd.DatetimeIndex([enduser.start_time])),
+                    "loss": [enduser.loss if enduser.loss is not None else np.nan],
+                    "status": [enduser.status],
+                }
+            ),
+        )
+
+    def write(self, measurement: str, frame: pd.DataFrame) -> None:
+        """Sink interface: buffers a frame indexed by timestamps, its columns
+        being stored as assets and the measurement as variable
+        """
+        long = frame.melt(ignore_index=False, var_name="asset", value_name="value")
+        self._add(
+            pd.DataFrame(
+                {
+                    "site": self.site,
+                    "asset": long["asset"].astype(str).to_numpy(),
+                    "variable": measurement,
+                    "timestamp": self._to_utc(pd.DatetimeIndex(long.index)),
+                    "value": long["value"].to_numpy(dtype=float),
+                }
+            )
+        )
+
+    def close(self) -> None:
+        self.flush()
+
+    def flush(self) -> None:
+        """Writes the buffered results to new files of the dataset"""
+        # the buffers are swapped out, frames added meanwhile go to new ones
+        with self._lock:
+            buffer, runs = self._buffer, self._runs
+            self._buffer, self._runs, self._rows = [], [], 0
+        if buffer:
+            results = pd.concat(buffer, ignore_index=True)
+            results["date"] = self._period(pd.DatetimeIndex(results["timestamp"]))
+            # sorted by asset, so that row group statistics skip other assets
+            results = results.sort_values(
+                ["site", "date", "asset", "variable", "timestamp"]
+            )
+            self._write(results, "results", ["site", "date"], self.SCHEMA)
+        if runs:
+            runs = pd.concat(runs, ignore_index=True)
+            self._write(runs, "runs", ["site"], self.RUNS_SCHEMA)
+
+    def read(
+        self,
+        site: str = None,
+        asset: str = None,
+        variable: str = None,
+        start_time: datetime = None,
+        stop_time: datetime = None,
+    ) -> pd.DataFrame:
+        """Returns the stored results matching the given site, asset, variable
+        and period [start_time, stop_time), as a long frame with the columns
+        site, asset, variable, timestamp and value
+        """
+        path = self.root / "results"
+        if not path.exists():
+            return pd.DataFrame(
+                columns=["site", "asset", "variable", "timestamp", "value"]
+            )
+
+        field = ds.field
+        conditions = []
+        if site is not None:
+            conditions.append(field("site") == site)
+        if asset is not None:
+            conditions.append(field("asset") == asset)
+        if variable is not None:
+            conditions.append(field("variable") == variable)
+        if start_time is not None:
+            start = self._to_utc(pd.DatetimeIndex([start_time]))[0]
+            conditions.append(field("date") >= self._period(start))
+            conditions.append(
+                field("timestamp") >= pa.scalar(start, pa.timestamp("us"))
+            )
+        if stop_time is not None:
+            stop = self._to_utc(pd.DatetimeIndex([stop_time]))[0]
+            conditions.append(field("date") <= self._period(stop))
+            conditions.append(field("timestamp") < pa.scalar(stop, pa.timestamp("us")))
+
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+
+        table = self._dataset(path).to_table(
+            columns=["site", "asset", "variable", "timestamp", "value"],
+            filter=expression,
+        )
+        return (
+            table.to_pandas()
+            .sort_values(["site", "asset", "variable", "timestamp"])
+            .reset_index(drop=True)
+        )
+
+    def read_series(
+        self,
+        asset: str,
+        variable: str,
+        site: str = None,
+        start_time: datetime = None,
+        stop_time: datetime = None,
+    ) -> pd.Series:
+        """Returns one result series of one asset, indexed by timestamp"""
+        site = self.site if site is None else site
+        frame = self.read(site, asset, variable, start_time, stop_time)
+        return pd.Series(
+            frame["value"].to_numpy(),
+            index=pd.DatetimeIndex(frame["timestamp"]),
+            name=f"{asset}.{variable}",
+        )
+
+    def read_runs(self, site: str = None) -> pd.DataFrame:
+        """Returns the start time, loss and status of the stored endusers"""
+        path = self.root / "runs"
+        if not path.exists():
+            return pd.DataFrame(columns=["site", "start_time", "loss", "status"])
+        table = self._dataset(path, ["site"]).to_table(
+            filter=None if site is None else ds.field("site") == site
+        )
+        return (
+            table.to_pandas().sort_values(["site", "start_time"]).reset_index(drop=True)
+        )
+
+    def _add(self, frame: pd.DataFrame, run: pd.DataFrame = None) -> None:
+        with self._lock:
+            self._buffer.append(frame)
+            if run is not None:
+                self._runs.append(run)
+            self._rows += len(frame)
+            full = self._rows >= self.batch_size
+        if full:
+            self.flush()
+
+    def _write(
+        self, frame: pd.DataFrame, name: str, partitions: list[str], schema: pa.Schema
+    ) -> None:
+        fields = [self.PARTITIONS.field(partition) for partition in partitions]
+        table = pa.Table.from_pandas(
+            frame[partitions + schema.names],
+            schema=pa.schema(fields + list(schema)),
+            preserve_index=False,
+        )
+        pq.write_to_dataset(
+            table,
+            self.root / name,
+            partition_cols=partitions,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        )
+
+    def _dataset(self, path: Path, partitions: list[str] = None) -> ds.Dataset:
+        partitions = ["site", "date"] if partitions is None else partitions
+        return ds.dataset(
+            path,
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema(
+                    [self.PARTITIONS.field(partition) for partition in partitions]
+                ),
+                flavor="hive",
+            ),
+        )
+
+    def _period(
+        self, timestamp: Union[pd.Timestamp, pd.DatetimeIndex]
+    ) -> Union[str, pd.Index]:
+        return timestamp.strftime(
+            "%Y-%m" if self.partitioning == "month" else "%Y-%m-%d"
+        )
+
+    @staticmethod
+    def _to_utc(timestamps: pd.DatetimeIndex) -> pd.DatetimeIndex:
+        if timestamps.tz is not None:
+            timestamps = timestamps.tz_convert("UTC").tz_localize(None)
+        return timestamps.astype("datetime64[us]")
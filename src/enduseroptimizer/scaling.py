@@ -0,0 +1,215 @@
+import numpy as np
+import pulp as pl
+
+# largest objective coefficient after scaling: CBC prunes the nodes that cannot
+# improve the best solution by an absolute 1e-5, a relative gap of about 1e-5
+# on an objective of order 1
+OBJECTIVE_MAX = 2.0**7
+
+
+def get_coefficient_ranges(problem: pl.LpProblem) -> dict:
+    """Returns the range of the absolute values of the non-zero coefficients
+    of a problem
+
+    Returns:
+        dict: (min, max) of the "matrix", "objective", "rhs" and "bounds"
+            coefficients, or None when there is none
+    """
+    matrix = [
+        value
+        for constraint in problem.constraints.values()
+        for value in constraint.values()
+    ]
+    rhs = [constraint.constant for constraint in problem.constraints.values()]
+    bounds = [
+        bound
+        for variable in problem.variables()
+        for bound in (variable.lowBound, variable.upBound)
+        if bound is not None
+    ]
+    return {
+        "matrix": _get_range(matrix),
+        "objective": _get_range(list(problem.objective.values())),
+        "rhs": _get_range(rhs),
+        "bounds": _get_range(bounds),
+    }
+
+
+def format_ranges(ranges: dict) -> str:
+    """Returns the ranges of get_coefficient_ranges, with the ratio max / min
+    of each range"""
+    return ", ".join(
+        f"{name} [{low:.1e}, {high:.1e}] ({high / low:.0e})"
+        for name, (low, high) in (
+            (name, value) for name, value in ranges.items() if value is not None
+        )
+    )
+
+
+class Scaling:
+    def __init__(self, problem: pl.LpProblem, passes: int = 4) -> None:
+        """Geometric-mean scaling of a PuLP problem, applied in place before
+        solving and undone after: each row (constraint) and each continuous
+        column (variable) is divided by the geometric mean of its smallest and
+        largest coefficients, alternately for a few passes, and the objective
+        scaled to a largest coefficient of OBJECTIVE_MAX. Factors are rounded to powers of 2, so that
+        scaling and unscaling are exact. Integer variables are not scaled.
+
+        Editable attributes:
+            problem (pl.LpProblem): problem to scale
+            passes (int): number of alternate row / column scaling passes
+
+        Computed attributes:
+            ranges_before (dict): coefficient ranges before scaling, see
+                get_coefficient_ranges
+            ranges_after (dict): coefficient ranges after scaling
+        """
+        self.problem = problem
+        self.passes = passes
+
+        self.ranges_before: dict = {}
+        self.ranges_after: dict = {}
+
+        self._rows: dict[str, float] = {}
+        self._columns: dict[pl.LpVariable, float] = {}
+        self._objective: float = 1.0
+
+    def scale(self) -> None:
+        """Scales the constraints, variables and objective of the problem"""
+        problem = self.problem
+        self.ranges_before = get_coefficient_ranges(problem)
+
+        names = list(problem.constraints)
+        variables = problem.variables()
+        index = {variable.name: n for n, variable in enumerate(variables)}
+        rows, columns, values = [], [], []
+        for row, name in enumerate(names):
+            for variable, value in problem.constraints[name].items():
+                rows.append(row)
+                columns.append(index[variable.name])
+                values.append(value)
+        cost = np.zeros(len(variables))
+        for variable, value in problem.objective.items():
+            cost[index[variable.name]] = value
+        row_factors, column_factors, self._objective = get_factors(
+            np.array(rows, dtype=int),
+            np.array(columns, dtype=int),
+            np.array(values, dtype=float),
+            (len(names), len(variables)),
+            np.array([variable.cat == pl.LpContinuous for variable in variables]),
+            cost,
+            self.passes,
+        )
+        self._rows = {name: row_factors[n] for n, name in enumerate(names)}
+        self._columns = {
+            variable: column_factors[n]
+            for n, variable in enumerate(variables)
+            if column_factors[n] != 1.0
+        }
+        self._apply(self._rows, self._columns, self._objective)
+        self.ranges_after = get_coefficient_ranges(problem)
+
+    def unscale(self) -> None:
+        """Restores the coefficients of the problem and converts the values of
+        the variables back to the original units
+        """
+        self._apply(
+            {name: 1.0 / factor for name, factor in self._rows.items()},
+            {variable: 1.0 / factor for variable, factor in self._columns.items()},
+            1.0 / self._objective,
+        )
+        self._rows, self._columns, self._objective = {}, {}, 1.0
+
+    def report(self) -> str:
+        """Returns the coefficient ranges before and after scaling"""
+        return (
+            f"before: {format_ranges(self.ranges_before)}\n"
+            f"after: {format_ranges(self.ranges_after)}"
+        )
+
+    def _apply(self, rows: dict, columns: dict, objective: float) -> None:
+        """Multiplies the rows, columns and objective by the given factors, the
+        variables x being replaced by x * factor (bounds and values, e.g. of a
+        warm start, divided by factor)
+        """
+        for name, factor in rows.items():
+            constraint = self.problem.constraints[name]
+            for variable in constraint:
+                constraint[variable] *= factor * columns.get(variable, 1.0)
+            constraint.constant *= factor
+        expression = self.problem.objective
+        for variable in expression:
+            expression[variable] *= objective * columns.get(variable, 1.0)
+        expression.constant *= objective
+        for variable, factor in columns.items():
+            if variable.lowBound is not None:
+                variable.lowBound /= factor
+            if variable.upBound is not None:
+                variable.upBound /= factor
+            if variable.varValue is not None:
+                variable.varValue /= factor
+
+
+def get_factors(
+    rows: np.ndarray,
+    columns: np.ndarray,
+    values: np.ndarray,
+    shape: tuple[int, int],
+    scalable: np.ndarray,
+    cost: np.ndarray,
+    passes: int = 4,
+) -> tuple[np.ndarray, np.ndarray, float]:
+    """Returns the row, column and objective factors of the geometric-mean
+    scaling of a problem (see Scaling), given the rows, columns and values of
+    the entries of its constraint matrix of shape (rows, columns), its
+    scalable (continuous) columns and its objective coefficients by column
+    """
+    nonzero = values != 0
+    rows, columns = rows[nonzero], columns[nonzero]
+    logs = np.log2(np.abs(values[nonzero]))
+
+    # log2 of the row and column factors, the scaled coefficients being
+    # a_ij * 2^(row_i + column_j)
+    row_logs = np.zeros(shape[0])
+    column_logs = np.zeros(shape[1])
+    for _ in range(passes):
+        scaled = logs + column_logs[columns]
+        row_logs = -_get_midpoints(scaled, rows, shape[0])
+        scaled = logs + row_logs[rows]
+        column_logs = np.where(
+            scalable, -_get_midpoints(scaled, columns, shape[1]), 0.0
+        )
+    row_factors = np.exp2(np.round(row_logs))
+    column_factors = np.exp2(np.round(column_logs))
+
+    objective = np.abs(cost) * column_factors
+    objective = objective[objective > 0]
+    objective_factor = (
+        float(np.exp2(np.round(np.log2(OBJECTIVE_MAX / objective.max()))))
+        if len(objective)
+        else 1.0
+    )
+    return row_factors, column_factors, objective_factor
+
+
+def _get_midpoints(logs: np.ndarray, groups: np.ndarray, size: int) -> np.ndarray:
+    """Returns, for each group, the midpoint of the smallest and largest logs,
+    i.e. the log of the geometric mean of its smallest and largest coefficients
+    (0 for empty groups)
+    """
+    low = np.full(size, np.inf)
+    high = np.full(size, -np.inf)
+    np.minimum.at(low, groups, logs)
+    np.maximum.at(high, groups, logs)
+    midpoints = np.zeros(size)
+    filled = np.isfinite(low)
+    midpoints[filled] = (low[filled] + high[filled]) / 2
+    return midpoints
+
+
+def _get_range(values: list) -> tuple:
+    values = np.abs(np.asarray(values, dtype=float))
+    values = values[values > 0]
+    if len(values) == 0:
+        return None
+    return float(values.min()), float(values.max())
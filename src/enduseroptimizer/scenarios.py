@@ -0,0 +1,219 @@
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+import numpy as np
+import pandas as pd
+
+from enduseroptimizer import EndUser, config
+from enduseroptimizer.enduser import SOLVED
+from enduseroptimizer.modelcache import ModelCache, get_profiles
+
+
+class ScenarioSweep:
+    def __init__(
+        self,
+        enduser: EndUser,
+        scenarios: Union[list[dict], pd.DataFrame],
+        workers: int = None,
+    ) -> None:
+        """Optimizes one enduser under many scenarios, e.g. tariff designs.
+        Each scenario is a set of overrides of the inputs of the enduser. The
+        scenarios are split into contiguous chunks solved in parallel, and
+        within a chunk each scenario is warm started from the solution of the
+        previous one, so neighbouring scenarios should be similar. The
+        scenarios of the same structure (overriding profiles only, see
+        modelcache.get_fingerprint) are solved with one compiled model: the
+        problem is built once, each scenario fills in its coefficients. A
+        scenario overriding a scalar input (e.g. "storages[0].energy_capacity")
+        has its own structure, see get_model_cache.
+
+        Editable attributes:
+            enduser (EndUser): base enduser, left unchanged
+            scenarios (list[dict] | pd.DataFrame): overrides of each scenario
+                (one dict or row per scenario), keyed by
+                "<asset key>.<attribute>", with the asset keys of
+                EndUser.iter_assets (e.g. "grid.import_tariff_k",
+                "storages[0].energy_capacity"), or "<attribute>" for the
+                enduser itself (e.g. "flexibility"). A key ending with "*"
+                multiplies the attribute instead of replacing it (e.g.
+                "producers[0].power_actual_k*": 1.5)
+            workers (int): number of scenarios solved in parallel, defaults
+                to the cores of config.resources
+            warm_start (bool): warm start each scenario from the previous one
+            keep_endusers (bool): keep the optimized enduser of each scenario
+            model_cache (ModelCache): compiled models of the scenarios,
+                defaults to config.model_cache, else a cache for the run if the
+                scenarios share structures
+
+        Computed attributes:
+            endusers (list[EndUser]): optimized enduser of each scenario, if
+                keep_endusers
+            results (pd.DataFrame): results table, see run()
+        """
+        self.enduser = enduser
+        self.scenarios = scenarios
+        self.workers = workers
+        self.warm_start = True
+        self.keep_endusers = False
+        self.model_cache = None
+
+        self.endusers: list[EndUser] = []
+        self.results = pd.DataFrame()
+
+    def get_overrides(self) -> list[dict]:
+        """Returns the overrides of each scenario as a list of dicts"""
+        if isinstance(self.scenarios, pd.DataFrame):
+            return [
+                {key: value for key, value in row.items() if _is_set(value)}
+                for row in self.scenarios.to_dict(orient="records")
+            ]
+        return [dict(overrides) for overrides in self.scenarios]
+
+    def get_enduser(self, overrides: dict) -> EndUser:
+        """Returns a copy of the base enduser with the overrides applied"""
+        return apply_overrides(self.enduser, overrides)
+
+    def get_model_cache(self, scenarios: list[dict]) -> ModelCache:
+        """Returns the model cache of the run: model_cache, else
+        config.model_cache, else a new cache if the scenarios have at most
+        half as many structures as scenarios, None otherwise (compiling a
+        model for a single scenario is slower than building its problem)
+        """
+        if self.model_cache is not None:
+            return self.model_cache
+        if config.model_cache is not None:
+            return config.model_cache
+        profiles = {f"{key}.{name}" for key, name in get_profiles(self.enduser)}
+        structures = {
+            tuple(
+                sorted(
+                    (key, str(np.asarray(value).tolist()))
+                    for key, value in overrides.items()
+                    if key.rstrip("*") not in profiles
+                )
+            )
+            for overrides in scenarios
+        }
+        return ModelCache() if 2 * len(structures) <= len(scenarios) else None
+
+    def run(self) -> pd.DataFrame:
+        """Optimizes all scenarios
+
+        Returns:
+            pd.DataFrame: one row per scenario (same index as scenarios when
+                given as a DataFrame), with the scalar overrides and the
+                columns status, loss, energy_import_kWh, energy_export_kWh and
+                time_s (solve time of the scenario)
+        """
+        scenarios = self.get_overrides()
+        endusers = [self.get_enduser(overrides) for overrides in scenarios]
+        workers = max(1, self.workers or config.resources.cores)
+        chunks = np.array_split(np.arange(len(endusers)), workers)
+
+        model_cache = self.get_model_cache(scenarios)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            rows = executor.map(
+                lambda chunk: self._run_chunk(
+                    [endusers[n] for n in chunk], model_cache
+                ),
+                [chunk for chunk in chunks if len(chunk)],
+            )
+            rows = [row for chunk_rows in rows for row in chunk_rows]
+
+        self.endusers = endusers if self.keep_endusers else []
+        for row, overrides in zip(rows, scenarios):
+            row.update(
+                {key: value for key, value in overrides.items() if np.ndim(value) == 0}
+            )
+        index = (
+            self.scenarios.index
+            if isinstance(self.scenarios, pd.DataFrame)
+            else pd.RangeIndex(len(rows), name="scenario")
+        )
+        columns = [key for key in rows[0] if key not in _RESULT_COLUMNS] if rows else []
+        self.results = pd.DataFrame(rows, index=index)[columns + _RESULT_COLUMNS]
+        return self.results
+
+    def _run_chunk(
+        self, endusers: list[EndUser], model_cache: ModelCache
+    ) -> list[dict]:
+        rows = []
+        solution = None
+        for enduser in endusers:
+            start = time.perf_counter()
+            enduser.optimize(
+                warm_start=solution if self.warm_start else None,
+                model_cache=model_cache,
+            )
+            elapsed = time.perf_counter() - start
+
+            optimal = enduser.status in SOLVED
+            # the specialized engines (see EndUser._solve_structured) leave no
+            # solution, the next scenario starts from the last solver's one
+            if optimal and enduser.solution:
+                solution = enduser.solution
+            rows.append(
+                {
+                    "status": enduser.status,
+                    "loss": enduser.loss if optimal else np.nan,
+                    "energy_import_kWh": (
+                        float(np.sum(enduser.grid.power_import_k) * config.delta_t)
+                        if optimal
+                        else np.nan
+                    ),
+                    "energy_export_kWh": (
+                        float(np.sum(enduser.grid.power_export_k) * config.delta_t)
+                        if optimal
+                        else np.nan
+                    ),
+                    "time_s": elapsed,
+                }
+            )
+            if not self.keep_endusers:
+                enduser.solution = {}
+        return rows
+
+
+def apply_overrides(enduser: EndUser, overrides: dict) -> EndUser:
+    """Returns a copy of enduser with overrides applied, keyed as the
+    scenarios of ScenarioSweep
+
+    Raises:
+        KeyError: for an unknown asset or attribute
+    """
+    enduser = copy.deepcopy(enduser)
+    assets = dict(enduser.iter_assets())
+    for key, value in overrides.items():
+        scale = key.endswith("*")
+        path = key.rstrip("*")
+        if "." in path:
+            name, attribute = path.rsplit(".", 1)
+            if name not in assets:
+                raise KeyError(f"Unknown asset '{name}' in scenario key '{key}'")
+            target = assets[name]
+        else:
+            target, attribute = enduser, path
+        if not hasattr(target, attribute):
+            raise KeyError(f"Unknown attribute in scenario key '{key}'")
+        if scale:
+            value = np.asarray(getattr(target, attribute)) * value
+        elif isinstance(value, (list, tuple)):
+            value = np.asarray(value)
+        setattr(target, attribute, value)
+    return enduser
+
+
+_RESULT_COLUMNS = [
+    "status",
+    "loss",
+    "energy_import_kWh",
+    "energy_export_kWh",
+    "time_s",
+]
+
+
+def _is_set(value) -> bool:
+    """False for the missing values of a scenarios table"""
+    return np.ndim(value) > 0 or not pd.isna(value)
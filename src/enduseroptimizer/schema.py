@@ -0,0 +1,206 @@
+import numpy as np
+
+from enduseroptimizer.encoding import length_k
+
+# keys of the dict of each asset, as (inputs, results); the type of a key is
+# given by its suffix (see _check_scalar and length_k)
+ASSET_KEYS = {
+    "producers_d": (
+        ["power_curtailment_factor_max_i", "power_actual_k"],
+        ["power_curtailment_factor_k"],
+    ),
+    "storages_d": (
+        [
+            "efficiency_charging_i",
+            "efficiency_discharging_i",
+            "power_charge_max_i",
+            "power_charge_min_i",
+            "power_discharge_max_i",
+            "power_discharge_min_i",
+            "energy_capacity_i",
+            "state_of_charge_max_i",
+            "state_of_charge_min_i",
+            "available_k",
+            "state_of_charge_initial_k",
+            "state_of_charge_final_k",
+        ],
+        ["energy_k", "power_charging_k", "power_discharging_k"],
+    ),
+    "consumers_d": (
+        [
+            "power_max_i",
+            "power_min_i",
+            "available_k",
+            "energy_deficit_max_k",
+            "power_desired_k",
+        ],
+        ["power_actual_k", "energy_deficit_k"],
+    ),
+    "grid_d": (
+        [
+            "discharge_to_grid_b",
+            "power_import_max_k",
+            "power_export_max_k",
+            "import_tariff_k",
+            "export_tariff_k",
+            "loss_f_s",
+        ],
+        ["power_import_k", "power_export_k"],
+    ),
+    "heatproducers_d": (
+        [
+            "efficiency_i",
+            "power_max_i",
+            "minimum_power_factor_i",
+            "power_loss_startup_i",
+        ],
+        ["starting_k", "running_k", "power_k"],
+    ),
+    "heatstorages_d": (
+        [
+            "temperature_max_i",
+            "temperature_min_i",
+            "loss_factor_i",
+            "volume_i",
+            "density_i",
+            "specific_heat_i",
+            "temperature_input_i",
+            "temperature_init_i",
+            "temperature_final_i",
+            "flow_max_i",
+        ],
+        ["flow_k", "temperature_k"],
+    ),
+    "heatconsumers_d": (["power_actual_k"], []),
+}
+
+ENDUSER_KEYS = (
+    [
+        "horizon_i",
+        "delta_t_i",
+        "include_results_i",
+        "start_time_i",
+        "flexibility_i",
+        "producers_d",
+        "storages_d",
+        "consumers_d",
+        "heatnodes_dd",
+        "grid_d",
+    ],
+    ["loss_i"],
+)
+
+HEATNODE_KEYS = (["heatproducers_d", "heatstorages_d", "heatconsumers_d"], [])
+
+
+def validate_dict(data: dict) -> None:
+    """Checks a dict returned by EndUser.to_dict before it is loaded: missing
+    keys, wrong types, and arrays whose length differs from the horizon. The
+    arrays are not decoded, their lengths are read from the encoding and
+    compared all at once. Result arrays may be empty (not computed).
+
+    Raises:
+        ValueError: listing every problem found
+    """
+    errors: list[str] = []
+    arrays: list[tuple[str, object, bool]] = []
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a dict, got {type(data).__name__}")
+    include_results = bool(data.get("include_results_i", False))
+    _check_keys(data, ENDUSER_KEYS, include_results, "", errors, arrays)
+    if errors:
+        raise ValueError("Invalid enduser dict:\n  " + "\n  ".join(errors))
+
+    for group in ["producers_d", "storages_d", "consumers_d", "grid_d"]:
+        _check_group(data, group, include_results, "", errors, arrays)
+    for key, heatnode in _items(data, "heatnodes_dd"):
+        path = f"heatnodes_dd.{key}."
+        if _check_keys(heatnode, HEATNODE_KEYS, False, path, errors, arrays):
+            for group in HEATNODE_KEYS[0]:
+                _check_group(heatnode, group, include_results, path, errors, arrays)
+
+    horizon = data["horizon_i"]
+    lengths = np.full(len(arrays), -1)
+    for n, (path, array, _) in enumerate(arrays):
+        try:
+            lengths[n] = length_k(array)
+        except (ValueError, KeyError, TypeError) as error:
+            errors.append(f"{path}: {error}")
+    is_result = np.array([result for _, _, result in arrays], dtype=bool)
+    invalid = (lengths != horizon) & (lengths >= 0) & ~(is_result & (lengths == 0))
+    for n in np.flatnonzero(invalid):
+        errors.append(f"{arrays[n][0]}: length {lengths[n]} != horizon {horizon}")
+
+    if errors:
+        raise ValueError("Invalid enduser dict:\n  " + "\n  ".join(errors))
+
+
+def _check_group(
+    data: dict,
+    group: str,
+    include_results: bool,
+    path: str,
+    errors: list,
+    arrays: list,
+) -> None:
+    for key, asset in _items(data, group):
+        _check_keys(
+            asset,
+            ASSET_KEYS[group],
+            include_results,
+            f"{path}{group}.{key}.",
+            errors,
+            arrays,
+        )
+
+
+def _items(data: dict, group: str) -> list:
+    # missing or invalid groups are already reported by _check_keys
+    if not isinstance(data.get(group), dict):
+        return []
+    return list(data[group].items())
+
+
+def _check_keys(
+    data,
+    keys: tuple[list[str], list[str]],
+    include_results: bool,
+    path: str,
+    errors: list,
+    arrays: list,
+) -> bool:
+    """Checks the keys of one dict, collecting its arrays. Returns False when
+    data is not a dict
+    """
+    if not isinstance(data, dict):
+        errors.append(f"{path[:-1]}: expected a dict, got {type(data).__name__}")
+        return False
+
+    inputs, results = keys
+    for key in inputs + (results if include_results else []):
+        if key not in data:
+            errors.append(f"{path}{key}: missing")
+        elif key.endswith("_k"):
+            arrays.append((f"{path}{key}", data[key], key in results))
+        else:
+            error = _check_scalar(key, data[key])
+            if error:
+                errors.append(f"{path}{key}: {error}")
+    return True
+
+
+def _check_scalar(key: str, value) -> str:
+    """Returns an error message if value does not match the suffix of key"""
+    if key.endswith(("_d", "_dd")):
+        expected, valid = "a dict", isinstance(value, dict)
+    elif key.endswith("_b"):
+        expected, valid = "a bool", isinstance(value, bool)
+    elif key.endswith("_s"):
+        expected, valid = "a string", isinstance(value, str)
+    elif key == "loss_i":
+        expected = "a number or null"
+        valid = value is None or isinstance(value, (int, float))
+    else:
+        expected, valid = "a number", isinstance(value, (int, float))
+    return "" if valid else f"expected {expected}, got {type(value).__name__}"
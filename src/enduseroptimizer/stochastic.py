@@ -0,0 +1,350 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pulp as pl
+
+from enduseroptimizer import EndUser, config
+from enduseroptimizer.enduser import solve_problem
+from enduseroptimizer.feasibility import check_feasibility, format_report
+from enduseroptimizer.model import Model
+from enduseroptimizer.scenarios import apply_overrides
+
+METHODS = ["extensive", "decomposition"]
+
+
+class StochasticOptimizer:
+    def __init__(
+        self,
+        enduser: EndUser,
+        scenarios: list[dict],
+        probabilities: list[float] = None,
+        first_stage: int = 1,
+        method: str = "extensive",
+        workers: int = None,
+    ) -> None:
+        """Two-stage stochastic optimization of an enduser over an ensemble of
+        forecasts, minimizing the expected loss. The first-stage decisions,
+        grid import / export and storage charging / discharging power over the
+        first first_stage steps, are shared by all scenarios; the later steps
+        adapt to each scenario.
+
+        Methods:
+            extensive: one problem holding a copy of the model per scenario,
+                linked by non-anticipativity constraints on the first stage.
+                Exact, but its size grows with the number of scenarios
+            decomposition: the scenarios are solved separately in parallel
+                (wait and see), the first stage is set to the probability
+                weighted mean of their net grid and storage power, and the
+                scenarios are solved again in parallel with the first stage
+                fixed. For large ensembles, but a heuristic, not an exact
+                decomposition: expected_loss is then an upper bound of the
+                stochastic optimum, wait_and_see_loss a lower one. The mean
+                first stage may be infeasible for some scenario (e.g. an
+                import limit or a storage availability that differ), the
+                extensive form is then solved instead (fallback)
+
+        Editable attributes:
+            enduser (EndUser): base enduser, left unchanged
+            scenarios (list[dict]): overrides of each scenario, keyed as the
+                scenarios of ScenarioSweep, e.g. one PV and demand forecast
+                per scenario as "producers[0].power_actual_k" and
+                "consumers[0].power_desired_k"
+            probabilities (list[float]): probability of each scenario, equal
+                when None
+            first_stage (int): number of steps shared by all scenarios
+            method (str): "extensive" or "decomposition"
+            workers (int): number of scenarios solved in parallel
+                (decomposition only), defaults to the cores of
+                config.resources
+
+        Computed attributes:
+            endusers (list[EndUser]): optimized enduser of each scenario
+            status (str): "Optimal" when every scenario is, "Infeasible" when
+                the precheck fails, else the status of the first scenario that
+                is not optimal
+            infeasibilities (dict[int, list[dict]]): problems found by the
+                precheck, by scenario (see feasibility.check_feasibility)
+            losses (np.ndarray): loss of each scenario
+            expected_loss (float): probability weighted loss
+            wait_and_see_loss (float): expected loss when each scenario is
+                optimized alone (decomposition only, else nan)
+            fallback (bool): the mean first stage of the decomposition was
+                infeasible for a scenario, the extensive form was solved
+            results (pd.DataFrame): results table, see run()
+        """
+        self.enduser = enduser
+        self.scenarios = scenarios
+        self.probabilities = probabilities
+        self.first_stage = first_stage
+        self.method = method
+        self.workers = workers
+
+        self.endusers: list[EndUser] = []
+        self.status: str = "Not Solved"
+        self.infeasibilities: dict[int, list[dict]] = {}
+        self.losses = np.array([])
+        self.expected_loss: float = np.nan
+        self.wait_and_see_loss: float = np.nan
+        self.fallback = False
+        self.results = pd.DataFrame()
+
+    def get_probabilities(self) -> np.ndarray:
+        """Returns the probability of each scenario
+
+        Raises:
+            ValueError: if the probabilities do not match the scenarios, are
+                negative or do not sum to 1
+        """
+        if self.probabilities is None:
+            return np.full(len(self.scenarios), 1 / len(self.scenarios))
+        probabilities = np.asarray(self.probabilities, dtype=float)
+        if probabilities.shape != (len(self.scenarios),):
+            raise ValueError(
+                f"Expected {len(self.scenarios)} probabilities, "
+                f"got {probabilities.shape}"
+            )
+        if np.any(probabilities < 0) or abs(probabilities.sum() - 1) > 1e-6:
+            raise ValueError("Probabilities must be non-negative and sum to 1")
+        return probabilities
+
+    def run(self) -> pd.DataFrame:
+        """Optimizes the scenarios
+
+        Returns:
+            pd.DataFrame: one row per scenario, with the columns probability,
+                status, loss, energy_import_kWh and energy_export_kWh
+
+        Raises:
+            ValueError: for an unknown method, an invalid first_stage or
+                probabilities, or when config.resolution_schedule is set
+        """
+        if self.method not in METHODS:
+            raise ValueError(f"Unknown method '{self.method}', expected {METHODS}")
+        if not 1 <= self.first_stage <= config.horizon:
+            raise ValueError(f"first_stage must be in [1, {config.horizon}]")
+        if len(config.get_step_bounds()) != config.horizon + 1:
+            raise ValueError(
+                "Stochastic optimization does not support config.resolution_schedule"
+            )
+        probabilities = self.get_probabilities()
+
+        self.endusers = [
+            apply_overrides(self.enduser, overrides) for overrides in self.scenarios
+        ]
+        self.wait_and_see_loss = np.nan
+        self.fallback = False
+        self.infeasibilities = {}
+        if config.precheck:
+            for n, enduser in enumerate(self.endusers):
+                enduser.infeasibilities = check_feasibility(enduser)
+                if enduser.infeasibilities:
+                    enduser.status = "Infeasible"
+                    self.infeasibilities[n] = enduser.infeasibilities
+                    print(f"Scenario {n}: Infeasible (precheck)")
+                    print(format_report(enduser.infeasibilities))
+
+        if not self.infeasibilities:
+            if self.method == "extensive":
+                self._run_extensive(probabilities)
+            else:
+                self._run_decomposition(probabilities)
+
+        return self._get_results(probabilities)
+
+    def get_distribution(self) -> dict:
+        """Returns the distribution of the loss across the scenarios: the
+        "expected" loss, its standard deviation "std", and the "min", "p5",
+        "p50", "p95" and "max" quantiles, weighted by the probabilities
+        """
+        probabilities = self.get_probabilities()
+        order = np.argsort(self.losses)
+        losses = self.losses[order]
+        cumulative = np.cumsum(probabilities[order])
+        distribution = {
+            "expected": self.expected_loss,
+            "std": float(
+                np.sqrt(probabilities @ (self.losses - self.expected_loss) ** 2)
+            ),
+            "min": float(losses[0]),
+        }
+        for q in [5, 50, 95]:
+            n = min(np.searchsorted(cumulative, q / 100 - 1e-9), len(losses) - 1)
+            distribution[f"p{q}"] = float(losses[n])
+        distribution["max"] = float(losses[-1])
+        return distribution
+
+    def _run_extensive(self, probabilities: np.ndarray) -> None:
+        horizon, delta_t_k = config.horizon, config.get_delta_t_k()
+        constraints, models, stages = {}, [], []
+        for n, enduser in enumerate(self.endusers):
+            model = Model(enduser, horizon, delta_t_k)
+            # the scenarios share the variable and constraint names
+            prefix = f"scenario{n}_"
+            for variable in _get_variables(model.constraints, model.objective):
+                variable.name = prefix + variable.name
+            constraints.update(
+                {
+                    prefix + name: constraint
+                    for name, constraint in model.constraints.items()
+                }
+            )
+            models.append(model)
+            stages.append(_get_first_stage(model.enduser, self.first_stage))
+
+        for n in range(1, len(self.endusers)):
+            for name, variable in stages[n].items():
+                constraints[f"nonanticipativity_{n}_{name}"] = pl.LpConstraint(
+                    e=variable - stages[0][name],
+                    sense=pl.LpConstraintEQ,
+                    rhs=0,
+                )
+
+        problem = pl.LpProblem("Stochastic", pl.LpMinimize)
+        problem.constraints = constraints
+        problem.objective = pl.lpSum(
+            probability * model.objective
+            for probability, model in zip(probabilities, models)
+        )
+        solve_problem(problem)
+
+        status = pl.LpStatus[problem.status]
+        print("Status: " + status)
+        for enduser, model in zip(self.endusers, models):
+            results = model.get_results()
+            results.status = status
+            enduser.relaxations = model.slacks.get_relaxations()
+            enduser._set_results(results)
+
+    def _run_decomposition(self, probabilities: np.ndarray) -> None:
+        self._solve_all()
+        if any(enduser.status != "Optimal" for enduser in self.endusers):
+            return
+        self.wait_and_see_loss = float(
+            probabilities @ [enduser.loss for enduser in self.endusers]
+        )
+
+        # consensus of the net power of each grid / storage, split back into
+        # its two non-negative directions
+        fixed = {}
+        for positive, negative in _get_first_stage_pairs(self.enduser):
+            net = probabilities @ np.array(
+                [
+                    _get_result(enduser, positive)[: self.first_stage]
+                    - _get_result(enduser, negative)[: self.first_stage]
+                    for enduser in self.endusers
+                ]
+            )
+            fixed[positive] = np.maximum(net, 0.0)
+            fixed[negative] = np.maximum(-net, 0.0)
+        self._solve_all(fixed)
+
+        infeasible = [
+            n for n, enduser in enumerate(self.endusers) if enduser.status != "Optimal"
+        ]
+        if infeasible:
+            print(
+                f"Mean first stage not feasible for scenarios {infeasible}, "
+                "solving the extensive form"
+            )
+            self.fallback = True
+            self._run_extensive(probabilities)
+
+    def _solve_all(self, fixed: dict = None) -> None:
+        """Optimizes every scenario in parallel, warm started from its
+        previous solution
+        """
+        horizon, delta_t_k = config.horizon, config.get_delta_t_k()
+        workers = max(1, self.workers or config.resources.cores)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(
+                executor.map(
+                    lambda enduser: enduser._optimize(
+                        horizon, delta_t_k, warm_start=enduser.solution, fixed=fixed
+                    ),
+                    self.endusers,
+                )
+            )
+
+    def _get_results(self, probabilities: np.ndarray) -> pd.DataFrame:
+        optimal = np.array([enduser.status == "Optimal" for enduser in self.endusers])
+        self.status = (
+            "Infeasible"
+            if self.infeasibilities
+            else next(
+                (
+                    enduser.status
+                    for enduser in self.endusers
+                    if enduser.status != "Optimal"
+                ),
+                "Optimal",
+            )
+        )
+        self.losses = np.array(
+            [
+                enduser.loss if ok else np.nan
+                for enduser, ok in zip(self.endusers, optimal)
+            ],
+            dtype=float,
+        )
+        self.expected_loss = float(probabilities @ self.losses)
+        self.results = pd.DataFrame(
+            {
+                "probability": probabilities,
+                "status": [enduser.status for enduser in self.endusers],
+                "loss": self.losses,
+                "energy_import_kWh": [
+                    (
+                        float(np.sum(enduser.grid.power_import_k) * config.delta_t)
+                        if ok
+                        else np.nan
+                    )
+                    for enduser, ok in zip(self.endusers, optimal)
+                ],
+                "energy_export_kWh": [
+                    (
+                        float(np.sum(enduser.grid.power_export_k) * config.delta_t)
+                        if ok
+                        else np.nan
+                    )
+                    for enduser, ok in zip(self.endusers, optimal)
+                ],
+            },
+            index=pd.RangeIndex(len(self.endusers), name="scenario"),
+        )
+        return self.results
+
+
+def _get_first_stage_pairs(enduser: EndUser) -> list[tuple[str, str]]:
+    """Returns the (positive, negative) result keys of the first-stage
+    decisions, as "<asset key>.<attribute>"
+    """
+    pairs = [("grid.power_import_k", "grid.power_export_k")]
+    for i in range(len(enduser.storages)):
+        pairs.append(
+            (f"storages[{i}].power_charging_k", f"storages[{i}].power_discharging_k")
+        )
+    return pairs
+
+
+def _get_result(enduser: EndUser, key: str):
+    name, attribute = key.rsplit(".", 1)
+    return getattr(dict(enduser.iter_assets())[name], attribute)
+
+
+def _get_first_stage(enduser: EndUser, first_stage: int) -> dict:
+    """Returns the first-stage variables of a built enduser by name"""
+    return {
+        f"{key}[{k}]": _get_result(enduser, key)[k]
+        for pair in _get_first_stage_pairs(enduser)
+        for key in pair
+        for k in range(first_stage)
+    }
+
+
+def _get_variables(constraints: dict, objective) -> list[pl.LpVariable]:
+    variables = {}
+    for expression in [objective, *constraints.values()]:
+        for variable in expression:
+            variables[id(variable)] = variable
+    return list(variables.values())
@@ -2,9 +2,15 @@ import numpy as np
 import numpy.typing as npt
 
 from enduseroptimizer import config
+from enduseroptimizer.encoding import LazyArray, decode_k, defer_k, encode_k
 
 
 class Storage:
+    # result arrays, decoded on first access when read by from_dict
+    energy_k = LazyArray(dtype=float)
+    power_charging_k = LazyArray(dtype=float)
+    power_discharging_k = LazyArray(dtype=float)
+
     def __init__(self, name: str = "Storage") -> None:
         """Class defining an electrical energy producer
 
@@ -63,7 +69,7 @@ class Storage:
         self.power_charging_k = np.array([])  # kW
         self.power_discharging_k = np.array([])  # kW
 
-    def to_dict(self, include_results: bool = False) -> dict:
+    def to_dict(self, include_results: bool = False, compact: bool = False) -> dict:
         data = {}
         data["efficiency_charging_i"] = self.efficiency_charging
         data["efficiency_discharging_i"] = self.efficiency_discharging
@@ -75,14 +81,18 @@ class Storage:
         data["state_of_charge_max_i"] = self.state_of_charge_max
         data["state_of_charge_min_i"] = self.state_of_charge_min
 
-        data["available_k"] = self.available_k.tolist()
-        data["state_of_charge_initial_k"] = self.state_of_charge_initial_k.tolist()
-        data["state_of_charge_final_k"] = self.state_of_charge_final_k.tolist()
+        data["available_k"] = encode_k(self.available_k, compact)
+        data["state_of_charge_initial_k"] = encode_k(
+            self.state_of_charge_initial_k, compact
+        )
+        data["state_of_charge_final_k"] = encode_k(
+            self.state_of_charge_final_k, compact
+        )
 
         if include_results:
-            data["energy_k"] = self.energy_k.tolist()
-            data["power_charging_k"] = self.power_charging_k.tolist()
-            data["power_discharging_k"] = self.power_discharging_k.tolist()
+            data["energy_k"] = encode_k(self.energy_k, compact)
+            data["power_charging_k"] = encode_k(self.power_charging_k, compact)
+            data["power_discharging_k"] = encode_k(self.power_discharging_k, compact)
 
         return data
 
@@ -97,17 +107,15 @@ class Storage:
         self.state_of_charge_max = data["state_of_charge_max_i"]
         self.state_of_charge_min = data["state_of_charge_min_i"]
 
-        self.available_k = np.asarray(data["available_k"], dtype=int)
-        self.state_of_charge_initial_k = np.asarray(
+        self.available_k = decode_k(data["available_k"], dtype=int)
+        self.state_of_charge_initial_k = decode_k(
             data["state_of_charge_initial_k"], dtype=float
         )
-        self.state_of_charge_final_k = np.asarray(
+        self.state_of_charge_final_k = decode_k(
             data["state_of_charge_final_k"], dtype=float
         )
 
         if include_results:
-            self.energy_k = np.asarray(data["energy_k"], dtype=float)
-            self.power_charging_k = np.asarray(data["power_charging_k"], dtype=float)
-            self.power_discharging_k = np.asarray(
-                data["power_discharging_k"], dtype=float
-            )
+            defer_k(self, "energy_k", data["energy_k"])
+            defer_k(self, "power_charging_k", data["power_charging_k"])
+            defer_k(self, "power_discharging_k", data["power_discharging_k"])
@@ -0,0 +1,51 @@
+import pulp as pl
+
+
+def get_groups(assets: list) -> list[list[int]]:
+    """Returns the groups of interchangeable assets, with the same inputs
+    (see to_dict), as lists of indices, for groups of two assets or more
+    """
+    groups: list[tuple[dict, list[int]]] = []
+    for n, asset in enumerate(assets):
+        data = asset.to_dict()
+        for reference, group in groups:
+            if data == reference:
+                group.append(n)
+                break
+        else:
+            groups.append((data, [n]))
+    return [group for _, group in groups if len(group) > 1]
+
+
+def get_symmetry_constraints(enduser, horizon: int) -> dict:
+    """Returns constraints ordering the interchangeable assets of a built
+    enduser (variables on the assets): storages by decreasing energy, heat
+    producers of a heatnode by decreasing running time, both weighted by
+    horizon - k so that earlier steps count more, as a linear stand-in for a
+    lexicographic order. Swapping two interchangeable assets gives another
+    solution of the same loss, so one of them always satisfies the order,
+    and the solver does not explore the others.
+    """
+    constraints = {}
+    weights = [horizon - k for k in range(horizon)]
+
+    def add(name: str, variables: list) -> None:
+        for n, (first, second) in enumerate(zip(variables, variables[1:])):
+            constraints[f"{name}-{n}"] = pl.LpConstraint(
+                e=pl.lpSum(w * (a - b) for w, a, b in zip(weights, first, second)),
+                sense=pl.LpConstraintGE,
+                rhs=0,
+            )
+
+    for n, group in enumerate(get_groups(enduser.storages)):
+        add(
+            f"symmetry storages{n}",
+            [enduser.storages[i].energy_k for i in group],
+        )
+    for i, heatnode in enumerate(enduser.heatnodes):
+        for n, group in enumerate(get_groups(heatnode.heatproducers)):
+            add(
+                f"symmetry heatnode[{i}]-producers{n}",
+                [heatnode.heatproducers[j].running_k for j in group],
+            )
+    return constraints
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from enduseroptimizer import config
+
+
+class TimeSeriesStore:
+    def __init__(self, name: str = "TimeSeriesStore") -> None:
+        """Holds the input profiles of a whole study, resampled once to
+        config.delta_t, and hands out the profiles of an optimization window
+        as views (no copy) of the stored data
+
+        Editable attributes:
+            name (str): Name of the instanciated object, for logging
+
+        Loaded attributes:
+            start_time (datetime): timestamp of the first stored step
+            delta_t (float): length of the stored steps [h]
+            columns (list[str]): names of the stored profiles
+            values (array[float]): read-only array of shape (columns, steps),
+                each profile being contiguous in memory
+        """
+        self.name: str = name
+
+        self.start_time: datetime = datetime(year=2021, month=6, day=1)
+        self.delta_t: float = config.delta_t
+        self.columns: list[str] = []
+        self.values = np.zeros((0, 0))
+
+    def __len__(self) -> int:
+        return self.values.shape[1]
+
+    def from_frame(
+        self,
+        frame: pd.DataFrame,
+        start_time: datetime = None,
+        stop_time: datetime = None,
+    ) -> None:
+        """Loads the columns of a frame indexed by timestamps. All columns are
+        resampled to config.delta_t in one pass: averaged when the frame is
+        finer, linearly interpolated (in time) when it is coarser or has gaps.
+
+        Args:
+            frame (pd.DataFrame): profiles, indexed by a DatetimeIndex
+            start_time (datetime): first step to store, defaults to the first
+                timestamp of the frame
+            stop_time (datetime): end of the stored period (excluded), defaults
+                to the last timestamp of the frame (included)
+        """
+        frame = frame.sort_index()
+        frame = frame[~frame.index.duplicated()]
+        step = pd.Timedelta(hours=config.delta_t)
+        start = pd.Timestamp(start_time) if start_time is not None else frame.index[0]
+        if stop_time is not None:
+            target = pd.date_range(start, pd.Timestamp(stop_time) - step, freq=step)
+        else:
+            target = pd.date_range(start, frame.index[-1], freq=step)
+
+        if len(frame) > 1 and frame.index.to_series().diff().median() < step:
+            frame = frame.resample(step, origin=start).mean()
+
+        resampled = (
+            frame.reindex(frame.index.union(target))
+            .interpolate(method="time", limit_direction="both")
+            .reindex(target)
+        )
+
+        self.start_time = start.to_pydatetime()
+        self.delta_t = config.delta_t
+        self.columns = [str(column) for column in resampled.columns]
+        self.values = np.ascontiguousarray(resampled.to_numpy(dtype=float).T)
+        self.values.setflags(write=False)
+
+    def from_parquet(
+        self,
+        path: Path,
+        columns: list[str] = None,
+        start_time: datetime = None,
+        stop_time: datetime = None,
+    ) -> None:
+        """Loads profiles from a Parquet file indexed by timestamps, see
+        from_frame
+        """
+        self.from_frame(
+            pd.read_parquet(path, columns=columns), start_time, stop_time
+        )
+
+    def from_npy(
+        self,
+        path: Path,
+        columns: list[str],
+        start_time: datetime,
+        delta_t: float = None,
+        mmap: bool = True,
+    ) -> None:
+        """Loads profiles from a NumPy file holding an array of shape
+        (columns, steps), already sampled with the steps of the optimization
+
+        Args:
+            path (Path): path of the .npy file
+            columns (list[str]): names of the rows of the array
+            start_time (datetime): timestamp of the first step
+            delta_t (float): length of the steps [h], defaults to config.delta_t
+            mmap (bool): when true, the file is memory-mapped and only the
+                windows that are used are read from disk
+        """
+        values = np.load(path, mmap_mode="r" if mmap else None)
+        if values.ndim != 2 or values.shape[0] != len(columns):
+            raise ValueError(
+                f"Expected an array of shape ({len(columns)}, steps), "
+                f"got {values.shape}"
+            )
+        delta_t = config.delta_t if delta_t is None else delta_t
+        if not np.isclose(delta_t, config.delta_t):
+            raise ValueError(
+                f"Stored steps of {delta_t} h do not match delta_t "
+                f"({config.delta_t} h)"
+            )
+
+        self.start_time = start_time
+        self.delta_t = delta_t
+        self.columns = list(columns)
+        self.values = values
+        if not mmap:
+            self.values.setflags(write=False)
+
+    def get_timestamps(self) -> list[datetime]:
+        """Returns the timestamps of the stored steps"""
+        return [
+            self.start_time + timedelta(hours=i * self.delta_t)
+            for i in range(len(self))
+        ]
+
+    def get_index(self, start_time: datetime) -> int:
+        """Returns the index of the stored step starting at start_time"""
+        offset = (
+            pd.Timestamp(start_time) - pd.Timestamp(self.start_time)
+        ) / pd.Timedelta(hours=self.delta_t)
+        index = int(round(offset))
+        if not np.isclose(offset, index):
+            raise ValueError(f"{start_time} is not aligned with the stored steps")
+        return index
+
+    def get(
+        self, column: str, start_time: datetime, horizon: int = None
+    ) -> np.ndarray:
+        """Returns a read-only view of a profile over the window starting at
+        start_time
+
+        Args:
+            column (str): name of the profile
+            start_time (datetime): start of the window
+            horizon (int): number of steps, defaults to config.horizon
+        """
+        horizon = config.horizon if horizon is None else horizon
+        start = self.get_index(start_time)
+        if start < 0 or start + horizon > len(self):
+            raise ValueError(
+                f"Window of {horizon} steps starting at {start_time} is out of "
+                "the stored period"
+            )
+        return self.values[self.columns.index(column), start : start + horizon]
+
+    def window(self, start_time: datetime, horizon: int = None) -> dict:
+        """Returns read-only views of all profiles over the window starting at
+        start_time, as {column: array}
+        """
+        return {
+            column: self.get(column, start_time, horizon) for column in self.columns
+        }
@@ -10,6 +10,7 @@ from enduseroptimizer import (
     HeatProducer,
     HeatStorage,
     Producer,
+    ResourceManager,
     Storage,
     config,
 )
@@ -18,6 +19,19 @@ from enduseroptimizer import (
 @pytest.fixture
 def example_enduser() -> EndUser:
     config.horizon = int(24 * 60 / 15)  # number of discrete steps
+    config.delta_t = 15 / 60  # length of steps [h]
+    config.resolution_schedule = None
+    config.precheck = True
+    config.scaling = True
+    config.dynamic_programming = True
+    config.soc_tolerance = 0.01
+    config.network_flow = True
+    config.lazy_exclusivity = False
+    config.symmetry_breaking = True
+    config.portfolio = None
+    config.resources = ResourceManager()
+    config.model_cache = None
+    config.cross_check = False
     mdl = EndUser()
 
     grid = Grid()
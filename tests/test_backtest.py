@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enduseroptimizer import (
+    Backtest,
+    Checkpoint,
+    Consumer,
+    EndUser,
+    Grid,
+    MemorySink,
+    MemorySource,
+    ParquetSink,
+    Producer,
+    Sink,
+    Storage,
+    config,
+)
+
+
+@pytest.fixture
+def source() -> MemorySource:
+    config.horizon = int(24 * 60 / 15)
+    config.delta_t = 15 / 60
+    config.resolution_schedule = None
+    index = pd.date_range(datetime(2023, 1, 1), periods=5 * 96, freq="15min")
+    fake_pv = np.sin(np.linspace(-np.pi / 2, 3 / 2 * np.pi, 96))
+    return MemorySource(
+        pd.DataFrame(
+            {
+                "PV": np.tile(50 * np.where(fake_pv > 0, fake_pv, 0), 5),
+                "House": 20 * np.ones(len(index)),
+            },
+            index=index,
+        )
+    )
+
+
+def build(start_time: datetime, inputs: dict) -> EndUser:
+    mdl = EndUser()
+    mdl.start_time = start_time
+    mdl.grid = Grid()
+    mdl.grid.import_tariff_k = 0.3 * np.ones(config.horizon)
+    mdl.grid.export_tariff_k = 0.1 * np.ones(config.horizon)
+    producer = Producer()
+    producer.power_actual_k = inputs["PV"]
+    mdl.producers.append(producer)
+    consumer = Consumer()
+    consumer.power_desired_k = inputs["House"]
+    mdl.consumers.append(consumer)
+    storage = Storage()
+    storage.state_of_charge_initial_k = 0.5 * np.ones(config.horizon)
+    storage.state_of_charge_final_k = 0.5 * np.ones(config.horizon)
+    mdl.storages.append(storage)
+    return mdl
+
+
+START_TIMES = [datetime(2023, 1, 1) + timedelta(days=i) for i in range(4)]
+
+
+def test_backtest_memory(source):
+    sink = MemorySink()
+    backtest = Backtest(source, sink, build)
+    backtest.batch_size = 3
+    backtest.run(START_TIMES)
+
+    assert all(status == "Optimal" for status in backtest.statuses.values())
+    assert len(sink.frames["power_kW"]) == 2  # batches of 3 and 1 windows
+    power = sink.get("power_kW")
+    assert len(power) == 4 * config.horizon
+    assert power.index.is_monotonic_increasing
+    assert np.allclose(power["consumers[0]"], 20.0)
+
+
+def test_backtest_parquet(source, tmp_path):
+    sink = ParquetSink(tmp_path)
+    Backtest(source, sink, build).run(START_TIMES)
+    energy = sink.read("energy_kWh")
+    assert len(energy) == 4 * config.horizon
+    assert list(energy.columns) == ["storages[0]", "consumers[0]"]
+
+
+def test_backtest_error(source):
+    class FailingSink(Sink):
+        def write(self, measurement, frame):
+            raise IOError("sink unavailable")
+
+    with pytest.raises(IOError):
+        Backtest(source, FailingSink(), build).run(START_TIMES)
+
+
+def test_backtest_resume(source, tmp_path):
+    failing_day = START_TIMES[2]
+
+    def failing_build(start_time, inputs):
+        if start_time == failing_day:
+            raise RuntimeError("database hiccup")
+        return build(start_time, inputs)
+
+    sink = MemorySink()
+    backtest = Backtest(source, sink, failing_build)
+    backtest.checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+    backtest.carry_state = True
+    backtest.run(START_TIMES)
+    assert list(backtest.failures) == [failing_day]
+    assert backtest.checkpoint.completed() == START_TIMES[:2] + START_TIMES[3:]
+    assert "database hiccup" in backtest.checkpoint.failed()[failing_day]
+    assert len(sink.get("power_kW")) == 3 * config.horizon
+
+    # resume: only the failed window runs, from the state of the previous one
+    resumed = Backtest(source, sink, build)
+    resumed.checkpoint = backtest.checkpoint
+    resumed.carry_state = True
+    resumed.rerun_failed = True
+    assert resumed.get_pending(START_TIMES) == [failing_day]
+    built = []
+
+    def recording_build(start_time, inputs):
+        built.append(build(start_time, inputs))
+        return built[-1]
+
+    resumed.build = recording_build
+    resumed.run(START_TIMES)
+    assert list(resumed.statuses) == [failing_day]
+    assert resumed.checkpoint.completed() == START_TIMES
+    assert len(sink.get("power_kW")) == 4 * config.horizon
+    assert np.isclose(
+        built[0].storages[0].state_of_charge_initial_k[0],
+        resumed.checkpoint.get_state(before=failing_day)["storages[0]"],
+    )
+
+
+def test_backtest_ranges(source, tmp_path):
+    sink = MemorySink()
+    backtest = Backtest(source, sink, build)
+    backtest.checkpoint = Checkpoint(tmp_path / "checkpoint.jsonl")
+    backtest.run_ranges([START_TIMES[:2], START_TIMES[2:]], workers=2)
+
+    assert backtest.checkpoint.completed() == START_TIMES
+    assert list(tmp_path.iterdir()) == [tmp_path / "checkpoint.jsonl"]
+    power = sink.get("power_kW").sort_index()
+    assert len(power) == 4 * config.horizon
@@ -0,0 +1,73 @@
+import numpy as np
+
+from enduseroptimizer import (
+    Consumer,
+    EndUser,
+    Grid,
+    Producer,
+    RepresentativeDays,
+    Storage,
+    config,
+)
+
+
+def daily_enduser(sunny: bool) -> EndUser:
+    mdl = EndUser()
+
+    grid = Grid()
+    grid.import_tariff_k = 0.3 * np.ones(config.horizon)
+    grid.export_tariff_k = 0.1 * np.ones(config.horizon)
+    mdl.grid = grid
+
+    producer = Producer()
+    fake_pv = np.sin(np.linspace(-np.pi / 2, 3 / 2 * np.pi, config.horizon))
+    producer.power_actual_k = (100 if sunny else 10) * np.where(fake_pv > 0, fake_pv, 0)
+    mdl.producers.append(producer)
+
+    consumer = Consumer()
+    consumer.power_desired_k = 30 * np.ones(config.horizon)
+    mdl.consumers.append(consumer)
+
+    storage = Storage()
+    storage.state_of_charge_initial_k = 0.5 * np.ones(config.horizon)
+    storage.state_of_charge_final_k = 0.5 * np.ones(config.horizon)
+    mdl.storages.append(storage)
+
+    return mdl
+
+
+def test_representative_days():
+    config.horizon = int(24 * 60 / 15)
+    config.resolution_schedule = None
+    days = [daily_enduser(sunny) for sunny in [True, False, True, True, False, True]]
+
+    aggregation = RepresentativeDays(days, n_clusters=2)
+    aggregation.cluster()
+    assert sorted(aggregation.weights) == [2, 4]
+    assert aggregation.labels[0] == aggregation.labels[2] != aggregation.labels[1]
+
+    aggregation.optimize(link_storage=True)
+    assert all(enduser.status == "Optimal" for enduser in aggregation.representatives)
+    assert aggregation.expand()["grid.power_import_k"].shape == (6, config.horizon)
+
+    metrics = aggregation.compare()
+    assert np.isclose(metrics["loss_estimate"], metrics["loss_full"])
+    assert metrics["loss_error"] < 1e-6
+    assert metrics["grid.power_import_k"] < 1e-6
+
+
+def test_infeasible_day():
+    config.horizon = int(24 * 60 / 15)
+    config.resolution_schedule = None
+    days = [daily_enduser(sunny) for sunny in [True, False, True, True, False, True]]
+    for day in [days[1], days[4]]:
+        day.grid.power_import_max_k = 1.0 * np.ones(config.horizon)
+
+    aggregation = RepresentativeDays(days, n_clusters=2)
+    aggregation.optimize()
+    assert aggregation.status == "Infeasible"
+    assert aggregation.failed.tolist() == [1, 4]
+
+    sunny = aggregation.representatives[aggregation.labels[0]]
+    assert sunny.status == "Optimal"
+    assert np.isclose(aggregation.loss, 4 * sunny.loss)
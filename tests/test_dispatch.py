@@ -0,0 +1,147 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.dispatch import HeuristicDispatch
+
+TOLERANCE = 1e-6
+
+
+def check_schedule(enduser):
+    """Checks the bounds, targets and balances of an optimized enduser"""
+    dt = config.delta_t
+    grid = enduser.grid
+    assert np.all(grid.power_import_k <= grid.power_import_max_k + TOLERANCE)
+    assert np.all(grid.power_export_k <= grid.power_export_max_k + TOLERANCE)
+    assert not np.any(
+        (grid.power_import_k > TOLERANCE) & (grid.power_export_k > TOLERANCE)
+    )
+
+    balance = grid.power_import_k - grid.power_export_k
+    for producer in enduser.producers:
+        factor = np.nan_to_num(producer.power_curtailment_factor_k)
+        assert np.all((factor >= 0) & (factor <= producer.power_curtailment_factor_max))
+        balance += producer.power_actual_k * (1 - factor)
+    for consumer in enduser.consumers:
+        power = consumer.power_actual_k
+        assert np.all(power >= consumer.power_min - TOLERANCE)
+        assert np.all(power <= consumer.available_k * consumer.power_max + TOLERANCE)
+        deficit = consumer.energy_deficit_k
+        assert np.all(deficit >= -TOLERANCE)
+        assert np.all(deficit <= consumer.energy_deficit_max_k + TOLERANCE)
+        # cyclic deficit, as in the optimization problem
+        np.testing.assert_allclose(
+            deficit - np.roll(deficit, 1),
+            (consumer.power_desired_k - power) * dt,
+            atol=TOLERANCE,
+        )
+        balance -= power
+    discharging = np.zeros(config.horizon)
+    for storage in enduser.storages:
+        available = storage.available_k > 0
+        energy = storage.energy_k
+        capacity = storage.energy_capacity
+        assert np.all(
+            energy[available] >= capacity * storage.state_of_charge_min - TOLERANCE
+        )
+        assert np.all(
+            energy[available] <= capacity * storage.state_of_charge_max + TOLERANCE
+        )
+        assert np.all(
+            storage.power_charging_k <= available * storage.power_charge_max + TOLERANCE
+        )
+        assert np.all(
+            storage.power_discharging_k
+            <= available * storage.power_discharge_max + TOLERANCE
+        )
+        if available[-1]:
+            assert energy[-1] == pytest.approx(
+                capacity * storage.state_of_charge_final_k[-1], abs=1e-4
+            )
+        balance -= storage.power_charging_k - storage.power_discharging_k
+        discharging += storage.power_discharging_k
+    if not grid.discharge_to_grid:
+        assert not np.any((grid.power_export_k > TOLERANCE) & (discharging > TOLERANCE))
+    for heatnode in enduser.heatnodes:
+        for heatproducer in heatnode.heatproducers:
+            balance -= heatproducer.power_k
+            running = heatproducer.running_k
+            assert np.all(heatproducer.starting_k <= running)
+            assert np.all(
+                heatproducer.power_k
+                <= (running + heatproducer.starting_k * heatproducer.power_loss_startup)
+                * heatproducer.power_max
+                + TOLERANCE
+            )
+        for heatstorage in heatnode.heatstorages:
+            temperature = heatstorage.temperature_k
+            assert np.all(temperature >= heatstorage.temperature_min - TOLERANCE)
+            assert np.all(temperature <= heatstorage.temperature_max + TOLERANCE)
+            assert temperature[-1] == pytest.approx(
+                heatstorage.temperature_final, abs=1e-4
+            )
+    np.testing.assert_allclose(balance, 0, atol=1e-4)
+
+
+def test_heuristic(example_enduser):
+    enduser = copy.deepcopy(example_enduser)
+    enduser.optimize(heuristic=True)
+    assert enduser.status == "Heuristic"
+    check_schedule(enduser)
+
+    grid = enduser.grid
+    assert enduser.loss == pytest.approx(
+        np.sum(grid.import_tariff_k * grid.power_import_k)
+        - np.sum(grid.export_tariff_k * grid.power_export_k)
+    )
+
+    # not better than the optimum
+    example_enduser.optimize()
+    check_schedule(example_enduser)
+    assert enduser.loss >= example_enduser.loss - 1e-6
+
+
+def test_prices(example_enduser):
+    # cheap nights, expensive evenings and a low feed-in tariff
+    hours = np.arange(config.horizon) * config.delta_t
+    example_enduser.grid.import_tariff_k = np.where(
+        hours < 6, 20.0, np.where(hours >= 17, 90.0, 60.0)
+    )
+    example_enduser.grid.export_tariff_k = 10 * np.ones(config.horizon)
+    enduser = copy.deepcopy(example_enduser)
+    enduser.optimize(heuristic=True)
+    check_schedule(enduser)
+
+    # the storages charge at night and with PV, and discharge in the evening
+    storage = enduser.storages[1]
+    assert np.sum(storage.power_charging_k[hours < 6]) > 0
+    assert np.sum(storage.power_discharging_k[hours >= 17]) > 0
+
+    rigid = copy.deepcopy(example_enduser)
+    rigid.flexibility = False
+    for storage in rigid.storages:
+        storage.state_of_charge_final_k = storage.state_of_charge_initial_k
+    rigid.optimize(heuristic=True)
+    assert enduser.loss < rigid.loss
+
+
+def test_warm_start(example_enduser):
+    warm_start = HeuristicDispatch(example_enduser).get_warm_start()
+    assert example_enduser.status == "Not Solved"
+    assert "grid_import_max0" in warm_start
+
+    enduser = copy.deepcopy(example_enduser)
+    enduser.optimize(warm_start=warm_start)
+    example_enduser.optimize()
+    assert enduser.status == "Optimal"
+    assert enduser.loss == pytest.approx(example_enduser.loss, rel=1e-4)
+
+
+def test_resolution(example_enduser):
+    config.resolution_schedule = [(0.25, 16), (1, None)]
+    example_enduser.optimize(heuristic=True)
+    assert example_enduser.status == "Heuristic"
+    assert len(example_enduser.grid.power_import_k) == config.horizon
+    assert len(example_enduser.storages[0].energy_k) == config.horizon
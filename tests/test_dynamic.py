@@ -0,0 +1,132 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.dynamic import APPROXIMATE, StorageDP, is_single_storage
+from enduseroptimizer.network import NetworkFlow
+
+
+def get_site(enduser, i: int):
+    """Returns the example enduser reduced to its PV, consumer without deficit,
+    grid and storage i, with cheap nights, expensive evenings and a low
+    feed-in tariff
+    """
+    site = copy.deepcopy(enduser)
+    site.heatnodes = []
+    site.storages = [site.storages[i]]
+    site.consumers[0].energy_deficit_max_k = np.zeros(config.horizon)
+    hours = np.arange(config.horizon) * config.delta_t
+    site.grid.import_tariff_k = np.where(
+        hours < 6, 20.0, np.where(hours >= 17, 90.0, 60.0)
+    )
+    site.grid.export_tariff_k = 10 * np.ones(config.horizon)
+    return site
+
+
+def test_structure(example_enduser):
+    assert not is_single_storage(example_enduser)
+    site = get_site(example_enduser, 1)
+    assert is_single_storage(site)
+    site.consumers[0].energy_deficit_max_k[10] = 1
+    assert not is_single_storage(site)
+
+    # the solver is used for other structures
+    example_enduser.optimize()
+    assert example_enduser.solution
+
+
+@pytest.mark.parametrize("i", [0, 1])
+@pytest.mark.parametrize("loss_f", ["minimize_cost", "minimize_grid_supply"])
+def test_exact_first(example_enduser, i, loss_f):
+    # the exact network flow is preferred, its result is optimal
+    site = get_site(example_enduser, i)
+    site.grid.loss_f = loss_f
+    config.cross_check = True
+    site.optimize()
+
+    assert site.status == "Optimal"
+    assert abs(site.cross_check["gap"]) < 1e-6
+
+
+@pytest.mark.parametrize("i", [0, 1])
+@pytest.mark.parametrize("loss_f", ["minimize_cost", "minimize_grid_supply"])
+def test_dynamic(example_enduser, i, loss_f):
+    site = get_site(example_enduser, i)
+    site.grid.loss_f = loss_f
+    config.network_flow = False
+    config.cross_check = True
+    site.optimize()
+
+    # optimal up to the state of charge grid only
+    assert site.status == APPROXIMATE
+    assert not site.solution
+    assert site.cross_check["loss"] == site.loss
+    # not better than the exact optimum, close to it with the default tolerance
+    assert site.cross_check["gap"] > -1e-6
+    assert site.cross_check["gap"] < 1e-2
+
+    grid, storage = site.grid, site.storages[0]
+    balance = (
+        grid.power_import_k
+        - grid.power_export_k
+        + site.producers[0].power_actual_k
+        * (1 - site.producers[0].power_curtailment_factor_k)
+        - site.consumers[0].power_actual_k
+        - storage.power_charging_k
+        + storage.power_discharging_k
+    )
+    np.testing.assert_allclose(balance, 0, atol=1e-6)
+    assert not np.any((grid.power_export_k > 0) & (storage.power_discharging_k > 0))
+    assert storage.energy_k[-1] == pytest.approx(
+        storage.energy_capacity * storage.state_of_charge_final_k[-1]
+    )
+    assert np.all(storage.energy_k[storage.available_k == 0] == 0)
+
+
+def test_tolerance(example_enduser):
+    site = get_site(example_enduser, 1)
+    losses = []
+    for tolerance in [0.05, 0.01]:
+        enduser = copy.deepcopy(site)
+        dp = StorageDP(enduser)
+        dp.tolerance = tolerance
+        assert dp.run()
+        losses.append(enduser.loss)
+    assert losses[1] <= losses[0]
+
+    config.dynamic_programming = False
+    config.network_flow = False
+    site.optimize()
+    assert site.solution
+    assert site.loss <= losses[1]
+
+
+def test_infeasible(example_enduser):
+    # the storage cannot reach its final state of charge, left to the solver
+    site = get_site(example_enduser, 1)
+    site.storages[0].power_charge_max = 0
+    site.storages[0].state_of_charge_final_k = 0.9 * np.ones(config.horizon)
+    config.precheck = False
+    assert not StorageDP(copy.deepcopy(site)).run()
+    site.optimize()
+    assert site.status == "Infeasible"
+
+
+def test_network_flow_fails(example_enduser):
+    # exporting pays more than importing: the network flow imports and exports
+    # at once, the exact solver is used, not the dynamic program
+    site = get_site(example_enduser, 1)
+    site.grid.export_tariff_k = 100 * np.ones(config.horizon)
+    assert not NetworkFlow(copy.deepcopy(site)).run()
+    site.optimize()
+    assert site.status == "Optimal"
+    assert site.solution
+
+    reference = copy.deepcopy(site)
+    config.network_flow = False
+    config.dynamic_programming = False
+    reference.optimize()
+    assert reference.status == "Optimal"
+    assert site.loss == pytest.approx(reference.loss, rel=1e-6)
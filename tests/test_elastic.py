@@ -0,0 +1,58 @@
+import numpy as np
+
+from enduseroptimizer import config
+
+
+def test_feasible(example_enduser):
+    example_enduser.optimize(elastic=True)
+    assert example_enduser.status == "Optimal"
+    assert example_enduser.relaxations == []
+
+
+def test_unsolvable(example_enduser):
+    example_enduser.grid.power_import_max_k = 1.0 * np.ones(config.horizon)
+    example_enduser.optimize(elastic=True)
+    assert example_enduser.status == "Optimal"
+    assert example_enduser.infeasibilities == []
+
+    constraints = {
+        relaxation["constraint"] for relaxation in example_enduser.relaxations
+    }
+    assert "power_balance" in constraints
+    for relaxation in example_enduser.relaxations:
+        assert len(relaxation["k"]) == len(relaxation["amount"])
+        assert np.all(relaxation["amount"] != 0)
+
+
+def test_state_of_charge(example_enduser):
+    storage = example_enduser.storages[1]
+    storage.state_of_charge_final_k[:] = 0.0
+    example_enduser.optimize(elastic=True)
+    assert example_enduser.status == "Optimal"
+
+    (relaxation,) = example_enduser.relaxations
+    assert relaxation["constraint"] == "state_of_charge_final"
+    assert relaxation["asset"] == "storages[1]"
+    assert relaxation["k"].tolist() == [config.horizon - 1]
+    # the storage ends at its minimum state of charge, above the target
+    np.testing.assert_allclose(
+        relaxation["amount"],
+        [storage.energy_capacity * storage.state_of_charge_min],
+        atol=1e-6,
+    )
+
+
+def test_temperature(example_enduser):
+    example_enduser.heatnodes[0].heatstorages[0].temperature_final = 90
+    example_enduser.optimize(elastic=True)
+    assert example_enduser.status == "Optimal"
+
+    relaxed = {
+        (relaxation["constraint"], relaxation["asset"])
+        for relaxation in example_enduser.relaxations
+    }
+    assert relaxed <= {
+        ("temperature_final", "heatnodes[0].heatstorages[0]"),
+        ("temperature_max", "heatnodes[0].heatstorages[0]"),
+    }
+    assert relaxed
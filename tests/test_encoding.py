@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+import pytest
+
+from enduseroptimizer.encoding import decode_k, encode_k
+
+
+@pytest.mark.parametrize(
+    "values, dtype, enc",
+    [
+        (np.full(96, 3.5), float, "const"),
+        (np.repeat([0.0, 2.0, np.nan, 1.5], 24), float, "rle"),
+        (np.random.default_rng(0).integers(0, 2, 96), int, "bits"),
+        (np.arange(96) / 4, float, "b64"),
+        (np.random.default_rng(0).random(96), float, "b64"),
+        (np.array([-0.0] * 10), float, "const"),
+        (np.array([0.0] * 10 + [-0.0] * 10 + [1.0] * 10), float, "rle"),
+    ],
+)
+def test_round_trip(values, dtype, enc):
+    data = encode_k(values, compact=True)
+    assert data["enc"] == enc
+    assert len(json.dumps(data)) <= len(json.dumps(values.tolist()))
+
+    decoded = decode_k(json.loads(json.dumps(data)), dtype=dtype)
+    assert decoded.dtype == np.dtype(dtype)
+    np.testing.assert_array_equal(decoded, values)
+    # solvers return -0.0, its sign is kept
+    np.testing.assert_array_equal(np.signbit(decoded), np.signbit(values))
+
+
+def test_plain_list():
+    values = np.array([1.0, 2.0, 3.0])
+    assert encode_k(values) == [1.0, 2.0, 3.0]
+    np.testing.assert_array_equal(decode_k([1.0, 2.0, 3.0]), values)
+    assert encode_k(np.array([]), compact=True) == []
@@ -0,0 +1,53 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import config
+
+
+def get_binaries(enduser) -> list[str]:
+    return [name for name in enduser.solution if name.startswith("exporting_to_grid_k")]
+
+
+def check_exclusivity(enduser):
+    grid = enduser.grid
+    exporting = grid.power_export_k > 1e-6
+    assert not np.any(exporting & (grid.power_import_k > 1e-6))
+    discharging = sum(storage.power_discharging_k for storage in enduser.storages)
+    assert not np.any(exporting & (discharging > 1e-6))
+
+
+def test_lazy(example_enduser):
+    enduser = copy.deepcopy(example_enduser)
+    config.lazy_exclusivity = True
+    enduser.optimize()
+    config.lazy_exclusivity = False
+    example_enduser.optimize()
+
+    assert enduser.status == "Optimal"
+    assert enduser.loss == pytest.approx(example_enduser.loss, rel=1e-4)
+    assert len(get_binaries(example_enduser)) == config.horizon
+    assert len(get_binaries(enduser)) < config.horizon
+    check_exclusivity(enduser)
+
+
+def test_cuts(example_enduser):
+    # a high feed-in tariff in the evening pays for discharging to the grid,
+    # which discharge_to_grid = False forbids
+    hours = np.arange(config.horizon) * config.delta_t
+    example_enduser.grid.export_tariff_k = np.where(
+        (hours >= 18) & (hours < 19), 120.0, 10.0
+    )
+    example_enduser.grid.power_export_max_k = 100 * np.ones(config.horizon)
+    enduser = copy.deepcopy(example_enduser)
+    config.lazy_exclusivity = True
+    enduser.optimize()
+    config.lazy_exclusivity = False
+    example_enduser.optimize()
+
+    binaries = get_binaries(enduser)
+    assert 0 < len(binaries) < config.horizon
+    assert np.isnan(enduser.grid.exporting_to_grid_k[:4]).all()
+    assert enduser.loss == pytest.approx(example_enduser.loss, rel=1e-4)
+    check_exclusivity(enduser)
@@ -3,15 +3,27 @@ from enduseroptimizer import EndUser
 from deepdiff import DeepDiff
 
 
+@pytest.mark.parametrize("compact", [False, True])
 @pytest.mark.parametrize("include_results", [False, True])
-def test_dict(example_enduser, include_results):
+def test_dict(example_enduser, include_results, compact):
     if include_results:
         example_enduser.include_results = True
         example_enduser.optimize()
-    exp = example_enduser.to_dict()
+    exp = example_enduser.to_dict(compact=compact)
 
     mdl = EndUser()
     mdl.from_dict(exp)
-    imp = mdl.to_dict()
+    imp = mdl.to_dict(compact=compact)
 
-    assert len(DeepDiff(imp, exp, ignore_nan_inequality=True)) == 0
+    diff = DeepDiff(
+        imp, exp, ignore_nan_inequality=True, ignore_numeric_type_changes=True
+    )
+    assert len(diff) == 0
+    assert (
+        len(
+            DeepDiff(
+                mdl.to_dict(), example_enduser.to_dict(), ignore_nan_inequality=True
+            )
+        )
+        == 0
+    )
@@ -0,0 +1,86 @@
+import numpy as np
+import pulp as pl
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.feasibility import check_feasibility
+
+
+def test_feasible(example_enduser):
+    assert check_feasibility(example_enduser) == []
+
+
+def test_unsolvable(example_enduser):
+    example_enduser.grid.power_import_max_k = 1.0 * np.ones(config.horizon)
+    example_enduser.optimize()
+    assert example_enduser.status == "Infeasible"
+    assert [problem["check"] for problem in example_enduser.infeasibilities] == [
+        "energy_supply"
+    ]
+
+    config.precheck = False
+    example_enduser.optimize()
+    assert example_enduser.infeasibilities == []
+    assert example_enduser.status != "Optimal"
+
+
+def test_disconnection(example_enduser):
+    # the final state of charge only applies at the end of the horizon, not
+    # when the storage disconnects before
+    storage = example_enduser.storages[1]
+    storage.available_k = np.zeros(config.horizon)
+    storage.available_k[:40] = 1
+    storage.state_of_charge_initial_k = 0.5 * np.ones(config.horizon)
+    storage.state_of_charge_final_k = np.zeros(config.horizon)
+    assert check_feasibility(example_enduser) == []
+
+    example_enduser.optimize()
+    assert example_enduser.status == "Optimal"
+
+
+def modify_storage(enduser):
+    enduser.storages[1].state_of_charge_final_k[:] = 0.0
+    return "storages[1]", "state_of_charge", [config.horizon - 1]
+
+
+def modify_consumer(enduser):
+    enduser.consumers[0].power_min = 10
+    enduser.consumers[0].available_k[40:44] = 0
+    return "consumers[0]", "consumer_bounds", list(range(40, 44))
+
+
+def modify_excess(enduser):
+    enduser.grid.power_export_max_k = np.zeros(config.horizon)
+    enduser.producers[0].power_actual_k = enduser.producers[0].power_actual_k * 10
+    return "enduser", "power_excess", None
+
+
+def modify_heat(enduser):
+    enduser.heatnodes[0].heatconsumers[0].power_actual_k *= 3
+    return "heatnodes[0]", "heat_supply", None
+
+
+def modify_temperature(enduser):
+    enduser.heatnodes[0].heatstorages[0].temperature_final = 90
+    return "heatnodes[0].heatstorages[0]", "temperature_final", [config.horizon - 1]
+
+
+@pytest.mark.parametrize(
+    "modify",
+    [modify_storage, modify_consumer, modify_excess, modify_heat, modify_temperature],
+)
+def test_report(example_enduser, modify):
+    asset, check, k = modify(example_enduser)
+    problems = check_feasibility(example_enduser)
+    found = [p for p in problems if p["asset"] == asset and p["check"] == check]
+    assert len(found) == 1
+    if k is not None:
+        assert found[0]["k"].tolist() == k
+
+    # the screen only rejects problems that the solver cannot solve either
+    config.precheck = False
+    try:
+        example_enduser.optimize()
+    except pl.PulpSolverError:  # CBC fails on inconsistent variable bounds
+        return
+    assert example_enduser.status != "Optimal"
@@ -0,0 +1,61 @@
+import copy
+import gc
+
+import numpy as np
+import pulp as pl
+import pytest
+
+from enduseroptimizer import Results, config
+
+
+def count_variables() -> int:
+    gc.collect()
+    return sum(isinstance(item, pl.LpVariable) for item in gc.get_objects())
+
+
+def get_inputs(enduser) -> list:
+    return [asset.to_dict() for _, asset in enduser.iter_assets()]
+
+
+def test_inputs(example_enduser):
+    inputs = copy.deepcopy(get_inputs(example_enduser))
+    variables = count_variables()
+    example_enduser.optimize()
+
+    assert example_enduser.status == "Optimal"
+    # the problem is released, the inputs are unchanged
+    assert count_variables() == variables
+    assert get_inputs(example_enduser) == inputs
+    for key, asset in example_enduser.iter_assets():
+        for value in vars(asset).values():
+            assert not isinstance(value, list), key
+
+
+def test_repeated(example_enduser):
+    enduser = copy.deepcopy(example_enduser)
+    example_enduser.optimize()
+    loss = example_enduser.loss
+    example_enduser.optimize()
+    assert example_enduser.loss == pytest.approx(loss, rel=1e-6)
+
+    enduser.grid.import_tariff_k = 2 * enduser.grid.import_tariff_k
+    enduser.optimize()
+    example_enduser.grid.import_tariff_k = enduser.grid.import_tariff_k
+    example_enduser.optimize()
+    assert example_enduser.loss == pytest.approx(enduser.loss, rel=1e-6)
+
+
+def test_results(example_enduser):
+    example_enduser.optimize()
+    results = example_enduser.results
+
+    assert results.loss == example_enduser.loss
+    assert results.status == "Optimal"
+    assert results["grid.power_import_k"] is example_enduser.grid.power_import_k
+    assert results["heatnodes[0].heatproducers[0].running_k"].dtype == int
+    assert all(len(results[key]) == config.horizon for key in results.keys())
+
+    enduser = copy.deepcopy(example_enduser)
+    Results({key: np.zeros(config.horizon) for key in results.keys()}).apply(enduser)
+    assert not enduser.storages[0].energy_k.any()
+    assert example_enduser.storages[0].energy_k.any()
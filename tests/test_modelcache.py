@@ -0,0 +1,105 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import ModelCache, config
+from enduseroptimizer.modelcache import CompiledModel, _Affine, get_fingerprint
+
+
+def get_variant(enduser, factor: float):
+    """Copy of an enduser with other tariffs and PV production"""
+    enduser = copy.deepcopy(enduser)
+    enduser.grid.import_tariff_k = enduser.grid.import_tariff_k * factor
+    enduser.producers[0].power_actual_k = enduser.producers[0].power_actual_k * factor
+    return enduser
+
+
+def test_cache(example_enduser):
+    endusers = [get_variant(example_enduser, factor) for factor in [1.0, 1.2, 0.8]]
+    references = copy.deepcopy(endusers)
+    for reference in references:
+        reference.optimize()
+
+    cache = ModelCache()
+    config.model_cache = cache
+    for enduser, reference in zip(endusers, references):
+        enduser.optimize()
+        assert enduser.status == "Optimal"
+        assert enduser.loss == pytest.approx(reference.loss, rel=1e-4)
+        assert len(enduser.grid.power_import_k) == config.horizon
+        assert enduser.heatnodes[0].heatproducers[0].running_k.dtype == int
+        np.testing.assert_array_equal(
+            enduser.storages[0].event_connect_k, reference.storages[0].event_connect_k
+        )
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # warm started from the solution of a similar enduser
+    enduser = get_variant(example_enduser, 1.2)
+    enduser.optimize(warm_start=endusers[0].solution)
+    assert enduser.status == "Optimal"
+    assert enduser.loss == pytest.approx(references[1].loss, rel=1e-4)
+    assert cache.hits == 3
+
+
+def test_fingerprint(example_enduser):
+    delta_t_k = config.get_delta_t_k()
+
+    def get_key(enduser):
+        return get_fingerprint(enduser, config.horizon, delta_t_k, True)
+
+    key = get_key(example_enduser)
+    assert get_key(get_variant(example_enduser, 1.5)) == key
+    enduser = copy.deepcopy(example_enduser)
+    enduser.storages[0].energy_capacity = 70
+    assert get_key(enduser) != key
+    enduser = copy.deepcopy(example_enduser)
+    enduser.storages[0].available_k[10:20] = 0
+    assert get_key(enduser) != key
+
+
+def test_disk(example_enduser, tmp_path):
+    enduser = copy.deepcopy(example_enduser)
+    config.model_cache = ModelCache(tmp_path)
+    example_enduser.optimize()
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+    # cold start: the model is loaded instead of compiled
+    cache = ModelCache(tmp_path)
+    config.model_cache = cache
+    enduser.optimize()
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert enduser.loss == pytest.approx(example_enduser.loss, rel=1e-4)
+
+    path = next(tmp_path.glob("*.npz"))
+    model = CompiledModel.load(path)
+    coefficients = model.fill(enduser)
+    model.save(tmp_path / "copy.npz")
+    for name, values in CompiledModel.load(tmp_path / "copy.npz").fill(enduser).items():
+        np.testing.assert_array_equal(values, coefficients[name])
+
+
+def test_eviction(example_enduser):
+    cache = ModelCache(size=1)
+    config.model_cache = cache
+    enduser = copy.deepcopy(example_enduser)
+    enduser.storages[0].energy_capacity = 70
+    example_enduser.optimize()
+    enduser.optimize()
+    example_enduser.optimize()
+    assert (cache.hits, cache.misses) == (0, 3)
+
+
+def test_affine():
+    a = _Affine(2.0, {0: 1.0}, 0.0)
+    b = _Affine(3.0, {1: 1.0}, 0.0)
+    c = (2 * a - b / 4 + 1) * np.float64(0.5)
+    assert float(c) == 2.125
+    assert c.terms == {0: 1.0, 1: -0.125}
+    assert c.constant == 0.5
+    with pytest.raises(TypeError):
+        a * b
+    with pytest.raises(TypeError):
+        a < 1
+    with pytest.raises(TypeError):
+        1 / a
@@ -0,0 +1,80 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.network import NetworkFlow, is_network
+
+
+@pytest.fixture
+def site(example_enduser):
+    """Example enduser without its heatnode, with cheap nights, expensive
+    evenings and a low feed-in tariff
+    """
+    example_enduser.heatnodes = []
+    hours = np.arange(config.horizon) * config.delta_t
+    example_enduser.grid.import_tariff_k = np.where(
+        hours < 6, 20.0, np.where(hours >= 17, 90.0, 60.0)
+    )
+    example_enduser.grid.export_tariff_k = 10 * np.ones(config.horizon)
+    return example_enduser
+
+
+def test_structure(example_enduser, site):
+    assert is_network(site)
+    example_enduser = copy.deepcopy(example_enduser)
+    example_enduser.heatnodes = [None]
+    assert not is_network(example_enduser)
+
+
+@pytest.mark.parametrize("loss_f", ["minimize_cost", "minimize_grid_supply"])
+@pytest.mark.parametrize("discharge_to_grid", [False, True])
+def test_network(site, loss_f, discharge_to_grid):
+    site.grid.loss_f = loss_f
+    site.grid.discharge_to_grid = discharge_to_grid
+    config.cross_check = True
+    site.optimize()
+
+    assert site.status == "Optimal"
+    assert not site.solution
+    assert site.cross_check["loss_solver"] == pytest.approx(site.loss, rel=1e-6)
+
+    grid = site.grid
+    balance = grid.power_import_k - grid.power_export_k
+    for producer in site.producers:
+        balance += producer.power_actual_k * (1 - producer.power_curtailment_factor_k)
+    for consumer in site.consumers:
+        balance -= consumer.power_actual_k
+        np.testing.assert_allclose(
+            consumer.energy_deficit_k - np.roll(consumer.energy_deficit_k, 1),
+            (consumer.power_desired_k - consumer.power_actual_k) * config.delta_t,
+            atol=1e-6,
+        )
+    for storage in site.storages:
+        balance -= storage.power_charging_k - storage.power_discharging_k
+        assert storage.energy_k[-1] == pytest.approx(
+            storage.energy_capacity * storage.state_of_charge_final_k[-1]
+        )
+    np.testing.assert_allclose(balance, 0, atol=1e-6)
+
+
+def test_resolution(site):
+    config.resolution_schedule = [(0.25, 16), (1, None)]
+    enduser = copy.deepcopy(site)
+    enduser.optimize()
+    config.network_flow = False
+    site.optimize()
+    assert site.solution
+    assert enduser.loss == pytest.approx(site.loss, rel=1e-6)
+    assert len(enduser.storages[1].energy_k) == config.horizon
+
+
+def test_exclusivity(site):
+    # importing and exporting at once pays off, the solver is needed
+    site.grid.export_tariff_k = 100 * np.ones(config.horizon)
+    site.grid.power_export_max_k = 1000 * np.ones(config.horizon)
+    assert not NetworkFlow(copy.deepcopy(site)).run()
+    site.optimize()
+    assert site.status == "Optimal"
+    assert site.solution
@@ -0,0 +1,68 @@
+import copy
+import multiprocessing
+import time
+
+import pytest
+
+from enduseroptimizer import Portfolio, ResourceManager, config
+from enduseroptimizer.portfolio import _kill
+
+
+def test_portfolio(example_enduser):
+    enduser = copy.deepcopy(example_enduser)
+    enduser.optimize()
+    portfolio = Portfolio()
+    config.portfolio = portfolio
+    config.resources = ResourceManager(cores=3)
+    example_enduser.optimize()
+
+    assert example_enduser.status == "Optimal"
+    assert example_enduser.loss == pytest.approx(enduser.loss, rel=1e-4)
+    statistics = portfolio.get_statistics()
+    assert list(statistics.columns) == ["runs", "wins", "win_rate", "mean_time"]
+    assert (statistics["runs"] >= 1).all()
+    assert statistics["wins"].sum() == statistics["runs"].iloc[0]
+
+
+def test_highs(example_enduser):
+    enduser = copy.deepcopy(example_enduser)
+    enduser.optimize()
+    config.portfolio = Portfolio({"highs": {"solver": "highs"}})
+    example_enduser.optimize()
+
+    assert example_enduser.status == "Optimal"
+    assert example_enduser.loss == pytest.approx(enduser.loss, rel=1e-4)
+
+
+def test_prune():
+    portfolio = Portfolio()
+    portfolio.statistics = {
+        "cbc": {"runs": 20, "wins": 18, "time": 1.0},
+        "cbc-aggressive": {"runs": 20, "wins": 0, "time": 0.0},
+        "highs": {"runs": 20, "wins": 2, "time": 1.0},
+    }
+    assert portfolio.prune(min_win_rate=0.2) == ["cbc-aggressive", "highs"]
+    assert list(portfolio.configurations) == ["cbc"]
+    assert portfolio.prune(min_win_rate=1) == []
+
+
+def test_racers():
+    portfolio = Portfolio()
+    portfolio.statistics = {"highs": {"runs": 2, "wins": 2, "time": 1.0}}
+    assert portfolio._get_racers(2) == ["highs", "cbc"]
+
+
+def test_kill():
+    # a process that has no process group of its own (yet)
+    process = multiprocessing.Process(target=time.sleep, args=(60,))
+    process.start()
+    start = time.perf_counter()
+    _kill(process)
+    assert not process.is_alive()
+    assert time.perf_counter() - start < 10
+
+
+def test_unknown_solver(example_enduser):
+    config.portfolio = Portfolio({"gurobi": {"solver": "gurobi"}})
+    with pytest.raises(ValueError):
+        example_enduser.optimize()
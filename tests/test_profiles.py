@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from enduseroptimizer import (
+    Consumer,
+    EndUser,
+    Grid,
+    ProfileStore,
+    Producer,
+    config,
+)
+
+
+def test_profile_store(tmp_path):
+    config.horizon = int(24 * 60 / 15)
+    config.delta_t = 15 / 60
+    config.resolution_schedule = None
+
+    store = ProfileStore(tmp_path)
+    store.create(
+        "site_a", ["PV", "House"], datetime(2023, 1, 1), datetime(2023, 1, 4)
+    )
+    assert store.sites() == ["site_a"]
+
+    index = pd.date_range(datetime(2023, 1, 1), datetime(2023, 1, 4), freq="15min")
+    frame = pd.DataFrame(
+        {"PV": np.arange(len(index)) / 10, "House": 5 * np.ones(len(index))},
+        index=index,
+    )
+    # chunks written in any order
+    store.write("site_a", frame.iloc[150:])
+    store.write("site_a", frame.iloc[:150])
+
+    profiles = store.open("site_a")
+    assert len(profiles) == 3 * 96
+    pv = profiles.get("PV", datetime(2023, 1, 2))
+    assert isinstance(pv, np.memmap)
+    assert np.allclose(pv, np.arange(96, 2 * 96) / 10)
+
+    mdl = EndUser()
+    mdl.start_time = datetime(2023, 1, 2)
+    mdl.grid = Grid()
+    producer = Producer()
+    producer.power_actual_k = pv
+    mdl.producers.append(producer)
+    consumer = Consumer()
+    consumer.power_desired_k = profiles.get("House", mdl.start_time)
+    mdl.consumers.append(consumer)
+    mdl.optimize()
+    assert mdl.status == "Optimal"
+    assert np.allclose(consumer.power_actual_k, 5.0)
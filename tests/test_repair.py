@@ -0,0 +1,75 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import HeatProducer, config
+from enduseroptimizer.repair import get_starting, repair_running, round_running
+
+
+@pytest.fixture
+def heat_plant(example_enduser):
+    """Example enduser with four heat producers and a larger heat demand"""
+    heatnode = example_enduser.heatnodes[0]
+    for efficiency, power_max, minimum_power_factor in [(3.0, 2.0, 0.3), (2.5, 3, 0.4)]:
+        heatproducer = HeatProducer()
+        heatproducer.efficiency = efficiency
+        heatproducer.power_max = power_max
+        heatproducer.minimum_power_factor = minimum_power_factor
+        heatproducer.power_loss_startup = 0.5
+        heatnode.heatproducers.append(heatproducer)
+    heatnode.heatconsumers[0].power_actual_k = 6 * (
+        np.sin(np.linspace(-np.pi, 2 * np.pi, config.horizon)) + 2
+    )
+    return example_enduser
+
+
+def test_schedules():
+    running = round_running([[0.2, 0.7, 0.5, 1.0], [0.0, 0.0, 1.0, 0.4]])
+    np.testing.assert_array_equal(running, [[0, 1, 1, 1], [0, 0, 1, 0]])
+    np.testing.assert_array_equal(get_starting(running), [[0, 1, 0, 0], [0, 0, 1, 0]])
+
+
+def test_approximate(heat_plant):
+    config.cross_check = True
+    heat_plant.optimize(approximate=True)
+
+    assert heat_plant.status == "Optimal"
+    assert -1e-4 < heat_plant.cross_check["gap"] < 1e-2
+    for heatproducer in heat_plant.heatnodes[0].heatproducers:
+        running = heatproducer.running_k
+        assert np.all(
+            heatproducer.power_k
+            >= running * heatproducer.minimum_power_factor * heatproducer.power_max
+            - 1e-6
+        )
+        np.testing.assert_array_equal(
+            heatproducer.starting_k, get_starting([running])[0]
+        )
+    heatstorage = heat_plant.heatnodes[0].heatstorages[0]
+    assert np.all(heatstorage.temperature_k >= heatstorage.temperature_min - 1e-6)
+    assert np.all(heatstorage.temperature_k <= heatstorage.temperature_max + 1e-6)
+
+
+@pytest.mark.parametrize("value", [0, 1])
+def test_repair(heat_plant, value):
+    # every producer off lacks heat, every producer on at a high minimum
+    # power overheats
+    heatnode = heat_plant.heatnodes[0]
+    for heatproducer in heatnode.heatproducers:
+        heatproducer.minimum_power_factor = 0.8
+    running = np.full((len(heatnode.heatproducers), config.horizon), value)
+    repaired = repair_running(
+        heatnode, running, np.full(config.horizon, config.delta_t), 1.0
+    )
+    assert np.any(repaired != value)
+
+    fixed = {}
+    for j, (schedule, starting) in enumerate(zip(repaired, get_starting(repaired))):
+        fixed[f"heatnodes[0].heatproducers[{j}].running_k"] = schedule
+        fixed[f"heatnodes[0].heatproducers[{j}].starting_k"] = starting
+    enduser = copy.deepcopy(heat_plant)
+    enduser._optimize(
+        config.horizon, np.full(config.horizon, config.delta_t), fixed=fixed
+    )
+    assert enduser.status == "Optimal"
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.resolution import aggregate_k, expand_k
+
+
+def test_step_bounds():
+    config.horizon = 96
+    config.resolution_schedule = [(0.25, 4), (1, 8), (4, None)]
+    bounds = config.get_step_bounds()
+    config.resolution_schedule = None
+
+    assert bounds[0] == 0 and bounds[-1] == 96
+    assert len(bounds) - 1 == 16 + 8 + 3
+    assert np.all(np.diff(bounds)[:16] == 1)
+    assert np.all(np.diff(bounds)[16:24] == 4)
+    assert np.all(np.diff(bounds)[24:] == 16)
+
+
+def test_step_bounds_invalid():
+    config.resolution_schedule = [(0.3, None)]
+    with pytest.raises(ValueError):
+        config.get_step_bounds()
+    config.resolution_schedule = None
+
+
+def test_aggregate_expand():
+    bounds = np.array([0, 1, 3, 6])
+    values = np.array([1.0, 2.0, 4.0, 3.0, 6.0, 0.0])
+
+    assert np.allclose(aggregate_k(values, bounds, "mean"), [1.0, 3.0, 3.0])
+    assert np.allclose(aggregate_k(values, bounds, "min"), [1.0, 2.0, 0.0])
+    assert np.allclose(aggregate_k(values, bounds, "first"), [1.0, 2.0, 3.0])
+    assert np.allclose(aggregate_k(values, bounds, "last"), [1.0, 4.0, 0.0])
+
+    coarse = np.array([1.0, 2.0, 3.0])
+    assert np.allclose(expand_k(coarse, bounds, "repeat"), [1, 2, 2, 3, 3, 3])
+    assert np.allclose(expand_k(coarse, bounds, "split"), [1, 1, 1, 1, 1, 1])
+    assert np.allclose(expand_k(coarse, bounds, "event"), [1, 2, 0, 3, 0, 0])
+
+
+def test_adaptive_resolution(example_enduser):
+    config.resolution_schedule = [(0.25, 4), (1, 8), (4, None)]
+    example_enduser.optimize()
+    config.resolution_schedule = None
+
+    assert example_enduser.status == "Optimal"
+    assert len(example_enduser.grid.power_import_k) == config.horizon
+    for storage in example_enduser.storages:
+        assert len(storage.energy_k) == config.horizon
+        assert np.nanmax(storage.energy_k) <= storage.energy_capacity + 1e-6
+    for heatnode in example_enduser.heatnodes:
+        for heatstorage in heatnode.heatstorages:
+            assert np.isclose(heatstorage.temperature_k[-1], heatstorage.temperature_final)
+
+
+def test_adaptive_resolution_limits(example_enduser):
+    # limits changing inside the coarse steps
+    limits = np.where(np.arange(config.horizon) % 2, 80.0, 150.0)
+    example_enduser.grid.power_import_max_k = limits
+    example_enduser.grid.power_export_max_k = limits
+    config.resolution_schedule = [(0.25, 4), (1, 8), (4, None)]
+    example_enduser.optimize()
+    config.resolution_schedule = None
+
+    assert example_enduser.status == "Optimal"
+    assert np.all(example_enduser.grid.power_import_k <= limits + 1e-6)
+    assert np.all(example_enduser.grid.power_export_k <= limits + 1e-6)
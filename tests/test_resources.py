@@ -0,0 +1,54 @@
+import threading
+import time
+
+import numpy as np
+
+from enduseroptimizer import ResourceManager, config
+from enduseroptimizer.scenarios import ScenarioSweep
+
+
+def test_threads():
+    resources = ResourceManager(cores=8)
+    assert resources.get_threads(0) == 1
+    assert resources.get_threads(100) == 1
+    assert resources.get_threads(2000) == 4
+    resources.max_threads = 2
+    assert resources.get_threads(2000) == 2
+
+
+def test_budget():
+    resources = ResourceManager(cores=2)
+    with resources.acquire(3) as threads:
+        assert threads == 2
+        assert resources.get_utilization()["in_use"] == 2
+
+    def solve():
+        with resources.acquire() as threads:
+            assert threads == 1
+            time.sleep(0.05)
+
+    workers = [threading.Thread(target=solve) for _ in range(6)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    utilization = resources.get_utilization()
+    assert utilization["jobs"] == 7
+    assert utilization["peak"] == 2
+    assert utilization["running"] == utilization["waiting"] == 0
+    assert 0 < utilization["utilization"] <= 1
+
+
+def test_sweep(example_enduser):
+    config.resources = ResourceManager(cores=2)
+    scenarios = [
+        {"grid.import_tariff_k": factor * np.full(config.horizon, 60.0)}
+        for factor in [1, 2, 3, 4]
+    ]
+    results = ScenarioSweep(example_enduser, scenarios, workers=4).run()
+
+    assert np.all(results["status"] == "Optimal")
+    utilization = config.resources.get_utilization()
+    assert utilization["jobs"] == 4
+    assert utilization["peak"] <= 2
@@ -0,0 +1,80 @@
+import copy
+import pickle
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import Results, config
+from enduseroptimizer.results import stack_results
+
+
+def test_buffer(example_enduser):
+    example_enduser.optimize()
+    results = example_enduser.results
+
+    assert results.buffer.flags["C_CONTIGUOUS"]
+    for key, asset in example_enduser.iter_assets():
+        for attribute in ["energy_k", "power_import_k", "running_k"]:
+            if hasattr(type(asset), attribute):
+                assert np.shares_memory(getattr(asset, attribute), results.buffer)
+    matrix = results.get_matrix()
+    assert matrix.shape == (len(results.keys()), config.horizon)
+    n = results.keys().index("grid.power_export_k")
+    np.testing.assert_array_equal(matrix[n], example_enduser.grid.power_export_k)
+
+
+def test_packing(example_enduser):
+    example_enduser.optimize(heuristic=True)
+    assert example_enduser.status == "Heuristic"
+    power = example_enduser.grid.power_import_k
+    results = example_enduser.results
+
+    # attributes set by another engine are packed into the buffer
+    np.testing.assert_array_equal(results["grid.power_import_k"], power)
+    assert example_enduser.grid.power_import_k is results["grid.power_import_k"]
+    assert example_enduser.results is results
+    example_enduser.grid.power_import_k = np.zeros(config.horizon)
+    assert example_enduser.results is not results
+    assert not example_enduser.results["grid.power_import_k"].any()
+
+
+def test_serialization(example_enduser):
+    example_enduser.optimize()
+    results = example_enduser.results
+
+    for copied in [
+        Results.from_bytes(results.to_bytes()),
+        pickle.loads(pickle.dumps(results)),
+        Results.from_arrow(results.to_arrow()),
+    ]:
+        assert copied.keys() == results.keys()
+        assert copied.loss == results.loss
+        assert copied.status == results.status
+        for key in results.keys():
+            np.testing.assert_array_equal(copied[key], results[key])
+            assert copied[key].dtype == results[key].dtype
+
+    enduser = copy.deepcopy(example_enduser)
+    enduser.grid.power_import_k = np.zeros(config.horizon)
+    Results.from_bytes(results.to_bytes()).apply(enduser)
+    for key in results.keys():
+        np.testing.assert_array_equal(enduser.results[key], results[key])
+
+
+def test_stack(example_enduser):
+    endusers = [copy.deepcopy(example_enduser) for _ in range(2)]
+    endusers[1].grid.import_tariff_k = 2 * endusers[1].grid.import_tariff_k
+    for enduser in endusers:
+        enduser.optimize()
+
+    stacked = stack_results([enduser.results for enduser in endusers])
+    assert stacked["grid.power_import_k"].shape == (2, config.horizon)
+    np.testing.assert_allclose(
+        stacked["grid.power_import_k"].sum(axis=0),
+        sum(enduser.grid.power_import_k for enduser in endusers),
+    )
+
+    other = copy.deepcopy(example_enduser)
+    other.storages = []
+    with pytest.raises(ValueError):
+        stack_results([endusers[0].results, other.results])
@@ -0,0 +1,113 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from enduseroptimizer import (
+    Consumer,
+    EndUser,
+    Grid,
+    Producer,
+    ResultStore,
+    Storage,
+    config,
+)
+
+
+def optimized_enduser(start_time: datetime) -> EndUser:
+    mdl = EndUser()
+    mdl.start_time = start_time
+    mdl.grid = Grid()
+    mdl.grid.import_tariff_k = 0.3 * np.ones(config.horizon)
+    producer = Producer()
+    fake_pv = np.sin(np.linspace(-np.pi / 2, 3 / 2 * np.pi, config.horizon))
+    producer.power_actual_k = 50 * np.where(fake_pv > 0, fake_pv, 0)
+    mdl.producers.append(producer)
+    consumer = Consumer()
+    consumer.power_desired_k = 20 * np.ones(config.horizon)
+    mdl.consumers.append(consumer)
+    storage = Storage()
+    storage.state_of_charge_initial_k = 0.5 * np.ones(config.horizon)
+    storage.state_of_charge_final_k = 0.5 * np.ones(config.horizon)
+    mdl.storages.append(storage)
+    mdl.optimize()
+    return mdl
+
+
+def test_result_store(tmp_path):
+    config.horizon = int(24 * 60 / 15)
+    config.delta_t = 15 / 60
+    config.resolution_schedule = None
+
+    store = ResultStore(tmp_path)
+    days = [datetime(2023, 1, 31), datetime(2023, 2, 1)]
+    endusers = [optimized_enduser(day) for day in days]
+    for enduser in endusers:
+        store.append(enduser, site="a")
+    store.append(endusers[0], site="b")
+    assert not (tmp_path / "results").exists()  # batched until flushed
+    store.flush()
+
+    assert sorted(p.name for p in (tmp_path / "results" / "site=a").iterdir()) == [
+        "date=2023-01",
+        "date=2023-02",
+    ]
+
+    # one series across months
+    series = store.read_series("grid", "power_import_k", site="a")
+    assert len(series) == 2 * config.horizon
+    assert np.allclose(
+        series.to_numpy(),
+        np.concatenate([enduser.grid.power_import_k for enduser in endusers]),
+    )
+
+    february = store.read(site="a", asset="storages[0]", start_time=days[1])
+    assert set(february["variable"]) == {
+        "energy_k",
+        "event_connect_k",
+        "event_disconnect_k",
+        "power_charging_k",
+        "power_discharging_k",
+    }
+    assert february["timestamp"].min() == pd.Timestamp(days[1])
+
+    runs = store.read_runs()
+    assert list(runs["site"]) == ["a", "a", "b"]
+    assert list(runs["status"]) == ["Optimal"] * 3
+    assert np.isclose(runs["loss"].iloc[0], endusers[0].loss)
+
+
+def test_result_store_sink(tmp_path):
+    store = ResultStore(tmp_path, site="a")
+    index = pd.date_range(datetime(2023, 1, 1), periods=4, freq="15min", tz="UTC")
+    store.write("power_kW", pd.DataFrame({"grid": [1.0, 2, 3, 4]}, index=index))
+    store.close()
+    series = store.read_series(
+        "grid", "power_kW", stop_time=datetime(2023, 1, 1) + timedelta(minutes=30)
+    )
+    assert list(series) == [1.0, 2.0]
+
+
+def test_result_store_threads(tmp_path):
+    # writers sharing a store, flushing while the others append
+    store = ResultStore(tmp_path, site="a")
+    store.batch_size = 8
+    index = pd.date_range(datetime(2023, 1, 1), periods=4, freq="15min")
+
+    def write(n: int) -> None:
+        for m in range(50):
+            frame = pd.DataFrame({f"writer{n}": [100.0 * m + k for k in range(4)]})
+            store.write("power_kW", frame.set_index(index + timedelta(days=m)))
+        store.close()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(write, range(4)))
+
+    results = store.read(site="a")
+    assert len(results) == 4 * 50 * 4
+    for n in range(4):
+        values = results.loc[results["asset"] == f"writer{n}", "value"]
+        assert sorted(values) == sorted(
+            100.0 * m + k for m in range(50) for k in range(4)
+        )
@@ -0,0 +1,60 @@
+import numpy as np
+import pulp as pl
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.scaling import OBJECTIVE_MAX, Scaling, get_coefficient_ranges
+
+
+def test_round_trip():
+    x = pl.LpVariable("x", lowBound=0, upBound=5e4)
+    y = pl.LpVariable("y", lowBound=1e-3)
+    z = pl.LpVariable("z", cat="Binary")
+    problem = pl.LpProblem("test", pl.LpMinimize)
+    problem += 1e-4 * x - 200 * y + 3 * z
+    problem += 1e-3 * x + 2e3 * y <= 4e3, "first"
+    problem += x - 5e4 * z <= 0, "second"
+    coefficients = {
+        name: (dict(constraint), constraint.constant)
+        for name, constraint in problem.constraints.items()
+    }
+
+    scaling = Scaling(problem)
+    scaling.scale()
+    assert get_coefficient_ranges(problem) == scaling.ranges_after
+    assert scaling.ranges_before["matrix"] == (1e-3, 5e4)
+    low, high = scaling.ranges_after["matrix"]
+    assert high / low < 1e2
+    problem.solve(pl.PULP_CBC_CMD(msg=0))
+    scaling.unscale()
+
+    assert pl.LpStatus[problem.status] == "Optimal"
+    assert y.varValue == pytest.approx(2.0)
+    assert pl.value(problem.objective) == pytest.approx(-400, abs=1e-3)
+    for name, constraint in problem.constraints.items():
+        assert (dict(constraint), constraint.constant) == coefficients[name]
+    assert x.upBound == 5e4
+
+
+def test_ranges(example_enduser):
+    example_enduser.optimize()
+    ranges = example_enduser.coefficient_ranges
+    for name in ["matrix", "bounds"]:
+        low, high = ranges["before"][name]
+        low_scaled, high_scaled = ranges["after"][name]
+        assert high_scaled / low_scaled < high / low
+    assert max(ranges["after"]["objective"]) <= OBJECTIVE_MAX
+
+
+@pytest.mark.parametrize("factor", [0.01, 1000])
+def test_same_solution(example_enduser, factor):
+    example_enduser.grid.import_tariff_k *= factor
+    example_enduser.grid.export_tariff_k *= factor
+    example_enduser.optimize()
+    assert example_enduser.status == "Optimal"
+    loss = example_enduser.loss
+
+    config.scaling = False
+    example_enduser.optimize()
+    assert example_enduser.status == "Optimal"
+    assert example_enduser.loss == pytest.approx(loss, rel=1e-6)
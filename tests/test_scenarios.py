@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from enduseroptimizer import ModelCache, config
+from enduseroptimizer.scenarios import ScenarioSweep
+
+
+def test_sweep(example_enduser):
+    scenarios = pd.DataFrame(
+        [
+            {
+                "grid.import_tariff_k": factor * np.full(config.horizon, 60.0),
+                "grid.export_tariff_k*": factor,
+                "grid.loss_f": loss,
+                "producers[0].power_actual_k*": scale,
+            }
+            for factor in [1, 10]
+            for loss in ["minimize_cost", "minimize_grid_supply"]
+            for scale in [1.0, 1.5]
+        ],
+        index=pd.RangeIndex(8, name="case"),
+    )
+    sweep = ScenarioSweep(example_enduser, scenarios, workers=2)
+    sweep.keep_endusers = True
+    sweep.model_cache = ModelCache()
+    results = sweep.run()
+
+    # one compiled model per loss function, the other overrides are profiles
+    assert sweep.model_cache.misses == 2
+    assert sweep.model_cache.hits == 6
+    assert config.model_cache is None
+
+    assert list(results.index) == list(range(8))
+    assert list(results.columns) == [
+        "grid.export_tariff_k*",
+        "grid.loss_f",
+        "producers[0].power_actual_k*",
+        "status",
+        "loss",
+        "energy_import_kWh",
+        "energy_export_kWh",
+        "time_s",
+    ]
+    assert np.all(results["status"] == "Optimal")
+
+    # same result as a single optimization of the scenario
+    enduser = sweep.get_enduser(sweep.get_overrides()[7])
+    assert enduser.grid.loss_f == "minimize_grid_supply"
+    np.testing.assert_allclose(
+        enduser.producers[0].power_actual_k,
+        1.5 * example_enduser.producers[0].power_actual_k,
+    )
+    enduser.optimize()
+    assert results.loc[7, "loss"] == pytest.approx(enduser.loss, abs=1e-3)
+    assert sweep.endusers[7].loss == pytest.approx(enduser.loss, abs=1e-3)
+
+    # the base enduser is left unchanged
+    assert example_enduser.status == "Not Solved"
+    assert example_enduser.grid.loss_f == "minimize_cost"
+
+
+def test_model_cache(example_enduser):
+    # a compiled model per energy capacity would be used once
+    capacities = [{"storages[0].energy_capacity": 10.0 * n} for n in range(1, 5)]
+    sweep = ScenarioSweep(example_enduser, capacities)
+    assert sweep.get_model_cache(sweep.get_overrides()) is None
+
+    tariffs = [
+        {"grid.import_tariff_k*": factor, "storages[0].energy_capacity": capacity}
+        for factor in [1.0, 2.0]
+        for capacity in [10.0, 20.0]
+    ]
+    sweep = ScenarioSweep(example_enduser, tariffs)
+    assert isinstance(sweep.get_model_cache(sweep.get_overrides()), ModelCache)
+
+    config.model_cache = ModelCache()
+    assert sweep.get_model_cache(sweep.get_overrides()) is config.model_cache
+
+
+def test_unknown_key(example_enduser):
+    sweep = ScenarioSweep(example_enduser, [{"storages[5].energy_capacity": 10}])
+    with pytest.raises(KeyError):
+        sweep.run()
@@ -0,0 +1,62 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import EndUser
+from enduseroptimizer.schema import validate_dict
+
+
+@pytest.fixture
+def data(example_enduser):
+    example_enduser.include_results = True
+    example_enduser.optimize()
+    return example_enduser.to_dict(compact=True)
+
+
+def test_valid(data):
+    validate_dict(data)
+
+
+@pytest.mark.parametrize(
+    "change, message",
+    [
+        (lambda d: d["grid_d"]["0"].pop("import_tariff_k"), "import_tariff_k: missing"),
+        (
+            lambda d: d["consumers_d"][0].update(power_desired_k=[1.0] * 95),
+            "length 95 != horizon 96",
+        ),
+        (
+            lambda d: d["storages_d"][0].update(energy_capacity_i="100"),
+            "expected a number",
+        ),
+        (
+            lambda d: d["grid_d"]["0"].update(power_import_k={"enc": "zip"}),
+            "Unknown array encoding",
+        ),
+        (
+            lambda d: d["heatnodes_dd"][0]["heatproducers_d"][0].pop("power_max_i"),
+            "heatnodes_dd.0.heatproducers_d.0.power_max_i: missing",
+        ),
+    ],
+)
+def test_invalid(data, change, message):
+    data = copy.deepcopy(data)
+    change(data)
+    with pytest.raises(ValueError, match=message):
+        EndUser().from_dict(data)
+
+
+def test_lazy_results(data):
+    enduser = EndUser()
+    enduser.from_dict(data)
+    grid = enduser.grid
+    assert "power_import_k" not in vars(grid)
+
+    power_import_k = grid.power_import_k
+    assert isinstance(power_import_k, np.ndarray)
+    assert len(power_import_k) == 96
+    assert grid.power_import_k is power_import_k
+
+    grid.power_import_k = np.zeros(96)
+    assert not np.any(grid.power_import_k)
@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+
+from enduseroptimizer import config
+from enduseroptimizer.stochastic import StochasticOptimizer
+
+
+def get_scenarios(enduser) -> list[dict]:
+    return [
+        {
+            "producers[0].power_actual_k": pv * enduser.producers[0].power_actual_k,
+            "consumers[0].power_desired_k*": load,
+        }
+        for pv, load in [(0.8, 1.1), (1.0, 1.0), (1.2, 0.9)]
+    ]
+
+
+def test_stochastic(example_enduser):
+    scenarios = get_scenarios(example_enduser)
+    probabilities = [0.25, 0.5, 0.25]
+    expected = {}
+    for method in ["extensive", "decomposition"]:
+        optimizer = StochasticOptimizer(
+            example_enduser, scenarios, probabilities, first_stage=4, method=method
+        )
+        results = optimizer.run()
+
+        assert optimizer.status == "Optimal"
+        assert list(results.columns) == [
+            "probability",
+            "status",
+            "loss",
+            "energy_import_kWh",
+            "energy_export_kWh",
+        ]
+        assert optimizer.expected_loss == pytest.approx(
+            np.dot(probabilities, results["loss"])
+        )
+        expected[method] = optimizer.expected_loss
+
+        # the first stage is shared, the second stage adapts to each scenario
+        first, *others = optimizer.endusers
+        for enduser in others:
+            np.testing.assert_allclose(
+                enduser.grid.power_import_k[:4], first.grid.power_import_k[:4]
+            )
+            np.testing.assert_allclose(
+                enduser.grid.power_export_k[:4], first.grid.power_export_k[:4]
+            )
+            for storage, reference in zip(enduser.storages, first.storages):
+                np.testing.assert_allclose(
+                    storage.power_charging_k[:4], reference.power_charging_k[:4]
+                )
+                np.testing.assert_allclose(
+                    storage.power_discharging_k[:4], reference.power_discharging_k[:4]
+                )
+        assert not np.allclose(
+            others[-1].grid.power_export_k, first.grid.power_export_k
+        )
+
+        distribution = optimizer.get_distribution()
+        assert distribution["min"] <= distribution["p50"] <= distribution["max"]
+        assert distribution["min"] == results["loss"].min()
+
+    assert not optimizer.fallback
+
+    # wait and see <= extensive form <= decomposition, within the MIP gap
+    tolerance = 1e-4 * abs(expected["extensive"])
+    assert optimizer.wait_and_see_loss <= expected["extensive"] + tolerance
+    assert expected["extensive"] <= expected["decomposition"] + tolerance
+
+    # the base enduser is left unchanged
+    assert example_enduser.status == "Not Solved"
+
+
+def test_fallback(example_enduser):
+    # no import at the first step in scenario 0: the mean first stage of the
+    # decomposition imports, the extensive form is solved instead
+    scenarios = get_scenarios(example_enduser)
+    limit = example_enduser.grid.power_import_max_k.copy()
+    limit[0] = 0.0
+    scenarios[0]["grid.power_import_max_k"] = limit
+    optimizer = StochasticOptimizer(example_enduser, scenarios, method="decomposition")
+    optimizer.run()
+
+    assert optimizer.fallback
+    assert optimizer.status == "Optimal"
+    for enduser in optimizer.endusers:
+        assert enduser.grid.power_import_k[0] == pytest.approx(0.0, abs=1e-6)
+    assert optimizer.wait_and_see_loss <= optimizer.expected_loss + 1e-4 * abs(
+        optimizer.expected_loss
+    )
+
+
+def test_invalid(example_enduser):
+    scenarios = get_scenarios(example_enduser)
+    with pytest.raises(ValueError):
+        StochasticOptimizer(example_enduser, scenarios, [0.5, 0.5]).run()
+    with pytest.raises(ValueError):
+        StochasticOptimizer(example_enduser, scenarios, method="progressive").run()
+
+    config.resolution_schedule = [(0.25, 4), (1, None)]
+    with pytest.raises(ValueError):
+        StochasticOptimizer(example_enduser, scenarios).run()
+
+
+def test_precheck(example_enduser):
+    scenarios = get_scenarios(example_enduser)
+    scenarios[1]["storages[1].state_of_charge_final_k"] = 2 * np.ones(config.horizon)
+    optimizer = StochasticOptimizer(example_enduser, scenarios)
+    results = optimizer.run()
+
+    assert optimizer.status == "Infeasible"
+    assert list(optimizer.infeasibilities) == [1]
+    assert results.loc[1, "status"] == "Infeasible"
+    assert np.isnan(optimizer.expected_loss)
@@ -0,0 +1,53 @@
+import copy
+
+import numpy as np
+import pytest
+
+from enduseroptimizer import HeatProducer, config
+from enduseroptimizer.symmetry import get_groups
+
+
+@pytest.fixture
+def multi_unit(example_enduser):
+    """Example enduser with two identical batteries and two identical heat
+    pumps
+    """
+    enduser = copy.deepcopy(example_enduser)
+    enduser.storages = [copy.deepcopy(enduser.storages[1]) for _ in range(2)]
+    heatnode = enduser.heatnodes[0]
+    heatnode.heatproducers = []
+    for _ in range(2):
+        heatproducer = HeatProducer()
+        heatproducer.efficiency = 3.0
+        heatproducer.power_max = 1.5
+        heatproducer.minimum_power_factor = 0.5
+        heatproducer.power_loss_startup = 1
+        heatnode.heatproducers.append(heatproducer)
+    return enduser
+
+
+def test_groups(example_enduser, multi_unit):
+    assert get_groups(example_enduser.storages) == []
+    assert get_groups(multi_unit.storages) == [[0, 1]]
+    assert get_groups(multi_unit.heatnodes[0].heatproducers) == [[0, 1]]
+
+    multi_unit.storages.append(copy.deepcopy(multi_unit.storages[0]))
+    multi_unit.storages[1].energy_capacity = 50
+    assert get_groups(multi_unit.storages) == [[0, 2]]
+
+
+def test_symmetry(multi_unit):
+    enduser = copy.deepcopy(multi_unit)
+    enduser.optimize()
+    config.symmetry_breaking = False
+    multi_unit.optimize()
+
+    assert enduser.status == "Optimal"
+    assert enduser.loss == pytest.approx(multi_unit.loss, rel=1e-4)
+
+    # the interchangeable assets are ordered
+    weights = config.horizon - np.arange(config.horizon)
+    first, second = enduser.storages
+    assert weights @ first.energy_k >= weights @ second.energy_k - 1e-6
+    first, second = enduser.heatnodes[0].heatproducers
+    assert weights @ first.running_k >= weights @ second.running_k
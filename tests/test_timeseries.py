@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from enduseroptimizer import TimeSeriesStore, config
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    config.horizon = int(24 * 60 / 15)
+    config.delta_t = 15 / 60
+    index = pd.date_range(datetime(2023, 1, 1), periods=3 * 48, freq="30min")
+    return pd.DataFrame(
+        {"PV": np.arange(3 * 48, dtype=float), "House": np.ones(3 * 48)},
+        index=index,
+    )
+
+
+def test_from_frame(frame):
+    store = TimeSeriesStore()
+    store.from_frame(frame, stop_time=datetime(2023, 1, 4))
+    assert len(store) == 3 * 96
+    assert store.columns == ["PV", "House"]
+
+    # 30 min data interpolated at 15 min
+    pv = store.get("PV", datetime(2023, 1, 2))
+    assert len(pv) == config.horizon
+    assert np.allclose(pv[:3], [48.0, 48.5, 49.0])
+    # window is a view of the stored data
+    assert np.shares_memory(pv, store.values)
+    assert not pv.flags.writeable
+
+    window = store.window(datetime(2023, 1, 3))
+    assert np.allclose(window["House"], 1.0)
+
+    with pytest.raises(ValueError):
+        store.get("PV", datetime(2023, 1, 3, 12))
+    with pytest.raises(ValueError):
+        store.get("PV", datetime(2023, 1, 2, 0, 5))
+
+
+def test_downsampling(frame):
+    fine = frame.resample("5min").ffill()
+    store = TimeSeriesStore()
+    store.from_frame(fine, start_time=datetime(2023, 1, 1), stop_time=datetime(2023, 1, 2))
+    assert len(store) == 96
+    assert np.allclose(store.get("House", datetime(2023, 1, 1)), 1.0)
+
+
+def test_from_files(frame, tmp_path):
+    frame.to_parquet(tmp_path / "profiles.parquet")
+    store = TimeSeriesStore()
+    store.from_parquet(tmp_path / "profiles.parquet", columns=["PV"])
+    assert store.columns == ["PV"]
+
+    np.save(tmp_path / "profiles.npy", store.values)
+    mapped = TimeSeriesStore()
+    mapped.from_npy(tmp_path / "profiles.npy", ["PV"], store.start_time)
+    assert isinstance(mapped.values, np.memmap)
+    start = datetime(2023, 1, 1) + timedelta(hours=6)
+    assert np.allclose(mapped.get("PV", start), store.get("PV", start))